@@ -6,6 +6,7 @@ Main application entry point
 
 import sys
 import os
+import multiprocessing
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -29,4 +30,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Lets the duplicate scan's worker processes start from a frozen executable
+    multiprocessing.freeze_support()
     main()
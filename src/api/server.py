@@ -0,0 +1,454 @@
+"""
+Local JSON API server for BookKeeper
+
+A small, stdlib-only asyncio HTTP server exposing books, search, lending,
+notes and statistics, so several clients can share one catalog:
+
+    python -m src.api.server --db data/bookkeeper.db --port 8765
+
+Reads run on a pool of read-only connections in a thread executor, and all
+writes go through a single writer connection, one at a time. GET responses
+carry an ETag built from the versions of the tables they read, so a client
+sending If-None-Match gets 304 Not Modified without the query running.
+Book lists are paged with opaque keyset cursors (``next`` in the response,
+``after`` in the next request).
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+from datetime import date
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ..models.async_database import DatabasePool
+from ..models.database import BOOK_FILTERS, DEFAULT_BOOK_SORT, Database
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BODY_SIZE = 1024 * 1024
+
+# Book fields clients may set; anything else is rejected
+BOOK_FIELDS = {
+    'title', 'author', 'isbn', 'year', 'publisher', 'pages', 'language', 'description',
+    'rating', 'category_id', 'purchase_date', 'purchase_price', 'purchase_store',
+    'cover_image_path',
+}
+
+# Query string parsers for filter_books() filters; others are passed as text
+FILTER_TYPES = {
+    'category_id': int,
+    'year_min': int,
+    'year_max': int,
+    'min_rating': float,
+    'price_min': float,
+    'price_max': float,
+}
+
+
+class HTTPError(Exception):
+    """Error answered with the given HTTP status and a JSON error message"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """A parsed HTTP request"""
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.target = target
+        self.headers = headers
+        self.body = body
+        url = urlsplit(target)
+        self.path = url.path.rstrip('/') or '/'
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    def json(self) -> Dict:
+        """Parse the body as a JSON object"""
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return data
+
+    def int_param(self, name: str, default: Optional[int] = None,
+                  maximum: Optional[int] = None, minimum: int = 0) -> Optional[int]:
+        """Get an integer query parameter, at least minimum and capped at maximum"""
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+        if number < minimum:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be at least {minimum}")
+        return min(number, maximum) if maximum else number
+
+
+def encode_cursor(cursor: Tuple) -> str:
+    """Turn a keyset cursor into an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, length: int) -> Tuple:
+    """Turn a token from encode_cursor() back into a keyset cursor of length values"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        cursor = None
+    if (not isinstance(cursor, list) or len(cursor) != length
+            or not all(isinstance(value, (str, int, float)) for value in cursor)):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid 'after' cursor")
+    return tuple(cursor)
+
+
+class APIServer:
+    """HTTP/JSON front end mapping routes to Database calls"""
+
+    def __init__(self, pool: DatabasePool):
+        self.pool = pool
+        # (method, path pattern, handler, tables a GET response depends on)
+        self.routes: List[Tuple[str, re.Pattern, Callable, Tuple[str, ...]]] = []
+        self.route('GET', r'/books', self.list_books, ('books', 'categories', 'lending'))
+        self.route('POST', r'/books', self.create_book)
+        self.route('GET', r'/books/(?P<book_id>\d+)', self.get_book, ('books', 'categories'))
+        self.route('PATCH', r'/books/(?P<book_id>\d+)', self.update_book)
+        self.route('DELETE', r'/books/(?P<book_id>\d+)', self.delete_book)
+        self.route('POST', r'/books/(?P<book_id>\d+)/restore', self.restore_book)
+        self.route('GET', r'/books/(?P<book_id>\d+)/notes', self.list_notes, ('notes',))
+        self.route('POST', r'/books/(?P<book_id>\d+)/notes', self.create_note)
+        self.route('DELETE', r'/notes/(?P<note_id>\d+)', self.delete_note)
+        self.route('GET', r'/notes/search', self.search_notes, ('notes', 'books'))
+        self.route('GET', r'/categories', self.list_categories, ('categories', 'books'))
+        self.route('GET', r'/lending', self.list_borrowed, ('lending', 'books'))
+        self.route('GET', r'/lending/history', self.lending_history, ('lending', 'books'))
+        self.route('POST', r'/lending', self.lend_book)
+        self.route('POST', r'/lending/(?P<lending_id>\d+)/return', self.return_book)
+        self.route('GET', r'/stats', self.statistics, ('books', 'categories', 'lending'))
+
+    def route(self, method: str, pattern: str, handler: Callable, tables: Tuple[str, ...] = ()):
+        """Register a handler for a method and full-path regular expression"""
+        self.routes.append((method, re.compile(pattern + '$'), handler, tables))
+
+    # ==================== HTTP ====================
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one client connection until it closes"""
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                status, headers, body = await self.dispatch(request)
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                self.write_response(writer, status, headers, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            # Malformed request: answer and drop the connection
+            self.write_response(writer, e.status, {}, self.error_body(e.message), False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        """Read one request, or None when the client closed the connection"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length header")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), target, headers, body)
+
+    def write_response(self, writer: asyncio.StreamWriter, status: int,
+                       headers: Dict[str, str], body: bytes, keep_alive: bool):
+        """Write a response with the given status, headers and body"""
+        status = HTTPStatus(status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        headers = dict(headers)
+        headers['Content-Length'] = str(len(body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        if body:
+            headers.setdefault('Content-Type', 'application/json; charset=utf-8')
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+    def error_body(self, message: str) -> bytes:
+        """JSON body for an error response"""
+        return json.dumps({'error': message}).encode()
+
+    async def dispatch(self, request: Request) -> Tuple[int, Dict[str, str], bytes]:
+        """Route a request and build the response status, headers and body"""
+        allowed = []
+        for method, pattern, handler, tables in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            try:
+                headers = {}
+                if method == 'GET':
+                    etag = await self.etag(request, tables)
+                    headers['ETag'] = etag
+                    if etag in self.client_etags(request):
+                        return HTTPStatus.NOT_MODIFIED, headers, b''
+                status, payload = await handler(request, **{
+                    name: int(value) for name, value in match.groupdict().items()
+                })
+                return status, headers, json.dumps(payload, ensure_ascii=False).encode()
+            except HTTPError as e:
+                return e.status, {}, self.error_body(e.message)
+            except ValueError as e:
+                return HTTPStatus.BAD_REQUEST, {}, self.error_body(str(e))
+            except Exception as e:
+                print(f"API error on {request.method} {request.target}: {e}")
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {}, self.error_body("Internal server error")
+
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'Allow': ', '.join(allowed)}, \
+                self.error_body("Method not allowed")
+        return HTTPStatus.NOT_FOUND, {}, self.error_body("Not found")
+
+    async def etag(self, request: Request, tables: Tuple[str, ...]) -> str:
+        """
+        Entity tag for a GET response: changes whenever one of the tables it
+        reads is written, or the date changes (due dates are relative to today).
+        """
+        versions = await self.pool.read(lambda db: db.get_table_version(*tables))
+        digest = hashlib.sha1(f"{request.target}|{versions}|{date.today()}".encode()).hexdigest()
+        return f'"{digest[:20]}"'
+
+    def client_etags(self, request: Request) -> List[str]:
+        """Entity tags listed in the request's If-None-Match header"""
+        header = request.headers.get('if-none-match', '')
+        return [tag.strip().removeprefix('W/') for tag in header.split(',') if tag.strip()]
+
+    # ==================== BOOKS ====================
+
+    async def list_books(self, request: Request):
+        """GET /books?query=&author=...&sort=-rating,title&limit=&after="""
+        filters = {}
+        for name in list(BOOK_FILTERS) + ['lent']:
+            value = request.query.get(name)
+            if value is None or value == '':
+                continue
+            if name == 'lent':
+                filters[name] = value.lower() in ('1', 'true', 'yes')
+            elif name in FILTER_TYPES:
+                try:
+                    filters[name] = FILTER_TYPES[name](value)
+                except ValueError:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a number")
+            else:
+                filters[name] = value
+
+        sort = tuple(request.query['sort'].split(',')) if request.query.get('sort') else None
+        limit = request.int_param('limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, minimum=1)
+        # A cursor holds one value per sort key plus the book id
+        after = None
+        if request.query.get('after'):
+            after = decode_cursor(request.query['after'], len(sort or DEFAULT_BOOK_SORT) + 1)
+
+        def query(db: Database):
+            # Fetch one extra row to know whether another page follows
+            books = db.filter_books(sort=sort, limit=limit + 1, after=after, **filters)
+            next_cursor = None
+            if len(books) > limit:
+                books = books[:limit]
+                next_cursor = encode_cursor(db.book_sort_cursor(books[-1], sort))
+            return {'books': books, 'next': next_cursor}
+
+        return HTTPStatus.OK, await self.pool.read(query)
+
+    async def get_book(self, request: Request, book_id: int):
+        """GET /books/{id}"""
+        book = await self.pool.read(lambda db: db.get_book_by_id(book_id))
+        if book is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Book not found")
+        return HTTPStatus.OK, book
+
+    def book_fields(self, request: Request) -> Dict:
+        """Book fields from a request body, rejecting unknown ones"""
+        data = request.json()
+        unknown = set(data) - BOOK_FIELDS
+        if unknown:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown book field(s): {', '.join(sorted(unknown))}")
+        return data
+
+    async def create_book(self, request: Request):
+        """POST /books with the book fields as a JSON object"""
+        data = self.book_fields(request)
+        if not data.get('title') or not data.get('author'):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Title and author are required")
+        book_id = await self.pool.write(lambda db: db.add_book(**data))
+        return HTTPStatus.CREATED, {'id': book_id}
+
+    async def update_book(self, request: Request, book_id: int):
+        """PATCH /books/{id} with the fields to change"""
+        data = self.book_fields(request)
+        if not data:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No fields to update")
+
+        def update(db: Database):
+            if db.get_book_by_id(book_id) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Book not found")
+            db.update_book(book_id, **data)
+            return db.get_book_by_id(book_id)
+
+        return HTTPStatus.OK, await self.pool.write(update)
+
+    async def delete_book(self, request: Request, book_id: int):
+        """DELETE /books/{id} (restorable with POST /books/{id}/restore)"""
+        await self.pool.write(lambda db: db.delete_book(book_id))
+        return HTTPStatus.OK, {'deleted': book_id}
+
+    async def restore_book(self, request: Request, book_id: int):
+        """POST /books/{id}/restore"""
+        if not await self.pool.write(lambda db: db.restore_book(book_id)):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "No deleted book with this id")
+        return HTTPStatus.OK, {'restored': book_id}
+
+    # ==================== NOTES ====================
+
+    async def list_notes(self, request: Request, book_id: int):
+        """GET /books/{id}/notes?limit=, newest first"""
+        limit = request.int_param('limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, minimum=1)
+        notes = await self.pool.read(lambda db: db.get_book_notes(book_id, limit=limit))
+        return HTTPStatus.OK, {'notes': notes}
+
+    async def create_note(self, request: Request, book_id: int):
+        """POST /books/{id}/notes with {"note_text": ...}"""
+        text = request.json().get('note_text')
+        if not text:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "note_text is required")
+        note_id = await self.pool.write(lambda db: db.add_note(book_id, text))
+        return HTTPStatus.CREATED, {'id': note_id}
+
+    async def delete_note(self, request: Request, note_id: int):
+        """DELETE /notes/{id}"""
+        await self.pool.write(lambda db: db.delete_note(note_id))
+        return HTTPStatus.OK, {'deleted': note_id}
+
+    async def search_notes(self, request: Request):
+        """GET /notes/search?q=&limit=&offset="""
+        query = request.query.get('q', '')
+        limit = request.int_param('limit', 20, MAX_PAGE_SIZE, minimum=1)
+        offset = request.int_param('offset', 0)
+        notes = await self.pool.read(lambda db: db.search_notes(query, limit=limit, offset=offset))
+        return HTTPStatus.OK, {'notes': notes}
+
+    # ==================== CATEGORIES, LENDING & STATISTICS ====================
+
+    async def list_categories(self, request: Request):
+        """GET /categories with book counts"""
+        return HTTPStatus.OK, {'categories': await self.pool.read(lambda db: db.get_category_stats())}
+
+    async def list_borrowed(self, request: Request):
+        """GET /lending: books currently lent out"""
+        return HTTPStatus.OK, {'lending': await self.pool.read(lambda db: db.get_borrowed_books())}
+
+    async def lending_history(self, request: Request):
+        """GET /lending/history?book_id=&status=&borrower=&date_from=&date_to=&limit=&offset="""
+        options = {
+            'book_id': request.int_param('book_id'),
+            'status': request.query.get('status'),
+            'borrower': request.query.get('borrower'),
+            'date_from': request.query.get('date_from'),
+            'date_to': request.query.get('date_to'),
+            'limit': request.int_param('limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, minimum=1),
+            'offset': request.int_param('offset', 0),
+        }
+        history = await self.pool.read(lambda db: db.get_lending_history(**options))
+        return HTTPStatus.OK, {'lending': history}
+
+    async def lend_book(self, request: Request):
+        """POST /lending with {"book_id", "borrower_name", ...}"""
+        data = request.json()
+        if not data.get('book_id') or not data.get('borrower_name'):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "book_id and borrower_name are required")
+
+        def lend(db: Database):
+            if db.get_book_by_id(data['book_id']) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Book not found")
+            return db.lend_book(
+                data['book_id'], data['borrower_name'], data.get('borrower_contact', ''),
+                data.get('expected_return_date', ''), data.get('notes', '')
+            )
+
+        return HTTPStatus.CREATED, {'id': await self.pool.write(lend)}
+
+    async def return_book(self, request: Request, lending_id: int):
+        """POST /lending/{id}/return"""
+        await self.pool.write(lambda db: db.return_book(lending_id))
+        return HTTPStatus.OK, {'returned': lending_id}
+
+    async def statistics(self, request: Request):
+        """GET /stats"""
+        return HTTPStatus.OK, await self.pool.read(lambda db: db.get_statistics())
+
+
+async def serve(db_path: str, host: str = '127.0.0.1', port: int = 8765, readers: int = 4):
+    """Run the API server until cancelled"""
+    pool = DatabasePool(db_path, readers)
+    api = APIServer(pool)
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    print(f"BookKeeper API listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="BookKeeper JSON API server")
+    parser.add_argument('--db', default='data/bookkeeper.db', help="Database file")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    parser.add_argument('--readers', type=int, default=4, help="Number of read connections")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+asyncio facade for the BookKeeper database
+
+AsyncDatabase offers the Database API as coroutines, so scripts, importers
+and services can run many queries concurrently without blocking their
+event loop:
+
+    async with AsyncDatabase("data/bookkeeper.db") as db:
+        books, stats = await asyncio.gather(db.search_books("tolkien"), db.get_statistics())
+        async for book in db.iter_books(sort=('author',)):
+            ...
+
+Reads run on a pool of read-only connections in a thread executor, and all
+writes go through a single writer connection, one at a time.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from .database import Database
+
+# Database methods that only read, run concurrently on the reader connections
+READ_METHODS = (
+    'get_all_books', 'get_book_by_id', 'search_books', 'fuzzy_search_books', 'filter_books',
+    'book_sort_cursor',
+    'get_all_categories', 'get_category_stats',
+    'get_media', 'get_unreferenced_media', 'get_media_paths',
+    'get_borrowed_books', 'get_overdue', 'get_due_within', 'get_due_status', 'has_due_dates',
+    'get_lending_history',
+    'get_book_notes', 'count_book_notes', 'search_notes',
+    'changes_since', 'get_change_seq', 'get_book_changes', 'get_export_watermark',
+    'get_duplicate_candidates',
+    'get_similar_books', 'get_term_doc_counts', 'count_books',
+    'get_file_size',
+    'get_statistics', 'get_table_version', 'get_data_version',
+    'get_borrower_leaderboard', 'get_loan_duration_stats', 'get_most_circulated_books',
+    'get_overdue_rate_by_month',
+    'get_books_added_per_month', 'get_loans_per_month', 'get_rating_distribution',
+)
+
+# Database methods that write, run one at a time on the writer connection
+WRITE_METHODS = (
+    'add_book', 'update_book', 'delete_book', 'restore_book',
+    'add_category',
+    'register_media', 'delete_media',
+    'lend_book', 'return_book',
+    'add_note', 'delete_note',
+    'compact_changes', 'set_export_watermark',
+    'add_duplicate_candidates', 'dismiss_duplicate', 'merge_books',
+    'replace_similarity_index', 'update_book_similarity',
+    'purge_deleted_books', 'clean_orphans', 'compact',
+)
+
+# Rows fetched per query by the async iterators
+PAGE_SIZE = 500
+
+
+class DatabasePool:
+    """
+    Read-only connections on a thread pool plus one serialized writer.
+
+    Each reader thread opens its own connection on first use. Writes run on
+    a single thread with its own connection, so they never contend with
+    each other inside the process.
+
+    The journal mode of the file is left as it is. Readers only run
+    alongside a committing writer when the file is in WAL mode
+    (``PRAGMA journal_mode = WAL``, set once by the owner of the file);
+    otherwise they wait out commits within the busy timeout.
+    """
+
+    def __init__(self, db_path: str, readers: int = 4):
+        self.db_path = db_path
+        # Run migrations once, before any reader opens the file
+        Database(db_path).close()
+
+        self.local = threading.local()
+        self.connections: List[Database] = []
+        self.lock = threading.Lock()
+        self.read_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    def _connection(self, read_only: bool) -> Database:
+        """Get the calling thread's connection, opening it on first use"""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = Database(self.db_path, check_same_thread=False)
+            if read_only:
+                db.conn.execute("PRAGMA query_only = ON")
+            self.local.db = db
+            with self.lock:
+                self.connections.append(db)
+        return db
+
+    async def read(self, operation: Callable[[Database], Any]) -> Any:
+        """Run operation(db) on a read-only connection"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.read_executor, lambda: operation(self._connection(read_only=True))
+        )
+
+    async def write(self, operation: Callable[[Database], Any]) -> Any:
+        """Run operation(db) on the writer connection, after earlier writes"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.write_executor, lambda: operation(self._connection(read_only=False))
+        )
+
+    def close(self):
+        """Stop the executors and close all connections"""
+        self.read_executor.shutdown(wait=True)
+        self.write_executor.shutdown(wait=True)
+        with self.lock:
+            for db in self.connections:
+                db.close()
+            self.connections.clear()
+
+
+def _delegate(name: str, write: bool):
+    """Build a coroutine method running Database.<name> on the pool"""
+    method = getattr(Database, name)
+
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        run = self.pool.write if write else self.pool.read
+        return await run(lambda db: getattr(db, name)(*args, **kwargs))
+
+    return call
+
+
+class AsyncDatabase:
+    """
+    Database API as awaitables on a connection pool.
+
+    Every method in READ_METHODS and WRITE_METHODS takes the same arguments
+    as on Database and returns the same result when awaited. Writes keep
+    their order; reads run concurrently and see all committed writes.
+    """
+
+    def __init__(self, db_path: str = "data/bookkeeper.db", readers: int = 4):
+        self.pool = DatabasePool(db_path, readers)
+
+    async def __aenter__(self) -> "AsyncDatabase":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Wait for queued queries to finish and close all connections"""
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
+
+    async def run(self, operation: Callable[[Database], Any], write: bool = False) -> Any:
+        """Run operation(db) with a pooled Database, for calls not mirrored here"""
+        return await (self.pool.write if write else self.pool.read)(operation)
+
+    async def iter_books(self, sort: Optional[Sequence[str]] = None, page_size: int = PAGE_SIZE,
+                         **filters) -> AsyncIterator[Dict]:
+        """
+        Iterate over the books matching filter_books() filters, a page at a time.
+
+        Pages are fetched with keyset cursors, so memory use stays flat
+        however large the catalog is.
+        """
+        after = None
+        while True:
+            page = await self.pool.read(
+                lambda db: db.filter_books(sort=sort, limit=page_size, after=after, **filters)
+            )
+            for book in page:
+                yield book
+            if len(page) < page_size:
+                return
+            after = await self.pool.read(lambda db: db.book_sort_cursor(page[-1], sort))
+
+    async def iter_lending_history(self, page_size: int = PAGE_SIZE, **filters) -> AsyncIterator[Dict]:
+        """
+        Iterate over get_lending_history() results, newest first, a page at a time.
+
+        Pages are fetched with keyset cursors, so loans added meanwhile are
+        neither repeated nor cause others to be skipped.
+        """
+        before = None
+        while True:
+            page = await self.pool.read(
+                lambda db: db.get_lending_history(limit=page_size, before=before, **filters)
+            )
+            for loan in page:
+                yield loan
+            if len(page) < page_size:
+                return
+            before = (page[-1]['lend_date_epoch'], page[-1]['id'])
+
+    async def iter_changes(self, seq: int = 0, page_size: int = PAGE_SIZE) -> AsyncIterator[Dict]:
+        """Iterate over the change log after a sequence number, in order"""
+        while True:
+            page = await self.pool.read(lambda db: db.changes_since(seq, limit=page_size))
+            for change in page:
+                yield change
+            if len(page) < page_size:
+                return
+            seq = page[-1]['seq']
+
+
+for _name in READ_METHODS:
+    setattr(AsyncDatabase, _name, _delegate(_name, write=False))
+for _name in WRITE_METHODS:
+    setattr(AsyncDatabase, _name, _delegate(_name, write=True))
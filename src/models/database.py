@@ -4,113 +4,293 @@ Supports books, categories, lending, and more
 """
 
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import calendar
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Set, Tuple
 import os
+from .migrations import LATEST_VERSION, get_version, migrate
+from .names import (
+    author_sort_key, get_or_create_name, link_book_authors, name_key, prune_publishers,
+    title_sort_key,
+)
+from .trigrams import index_book_trigrams, trigrams
+
+
+# Structured predicates understood by Database.filter_books(). Each filter
+# name maps to the SQL fragment it compiles to; values are always bound as
+# parameters so user input never ends up in the statement text.
+BOOK_FILTERS = {
+    'query': "(b.title LIKE ? OR b.author LIKE ? OR b.isbn LIKE ? OR b.description LIKE ?)",
+    'category_id': "b.category_id = ?",
+    'author': ("b.id IN (SELECT ba.book_id FROM book_authors ba"
+               " JOIN authors a ON a.id = ba.author_id WHERE a.name_key = ?)"),
+    'year_min': "b.year >= ?",
+    'year_max': "b.year <= ?",
+    'min_rating': "b.rating >= ?",
+    'language': "b.language = ? COLLATE NOCASE",
+    'publisher': "b.publisher_id = (SELECT id FROM publishers WHERE name_key = ?)",
+    'price_min': "b.purchase_price >= ?",
+    'price_max': "b.purchase_price <= ?",
+    # Date ranges seek on the integer epoch columns; the added filters use
+    # the date_added sort expression so its index serves both
+    'added_from': "IFNULL(b.date_added_epoch, 0) >= ?",
+    'added_to': "IFNULL(b.date_added_epoch, 0) < ?",
+    'purchased_from': "b.purchase_date_epoch >= ?",
+    'purchased_to': "b.purchase_date_epoch < ?",
+}
+
+# The lent/not-lent filter takes no parameter, so its value is part of the shape
+LENT_FILTERS = {
+    True: "EXISTS (SELECT 1 FROM lending l WHERE l.book_id = b.id AND l.status = 'borrowed')",
+    False: "NOT EXISTS (SELECT 1 FROM lending l WHERE l.book_id = b.id AND l.status = 'borrowed')",
+}
+
+# Sort keys accepted by Database.filter_books(sort=...). Each maps to the SQL
+# expression it orders by (matching an index on that expression plus id), the
+# value that expression yields for NULL and the book column it is computed
+# from, the last two used to build keyset cursors.
+BOOK_SORT_KEYS = {
+    'title': ("b.sort_title", '', 'sort_title'),
+    'author': ("b.sort_author", '', 'sort_author'),
+    'year': ("IFNULL(b.year, 0)", 0, 'year'),
+    'rating': ("IFNULL(b.rating, 0)", 0, 'rating'),
+    'date_added': ("IFNULL(b.date_added_epoch, 0)", 0, 'date_added_epoch'),
+}
+
+DEFAULT_BOOK_SORT = ('title',)
+
+# Book columns computed from others on write, which callers never set directly
+DERIVED_BOOK_COLUMNS = ('publisher_id', 'sort_title', 'sort_author')
+
+# Filters matched against the normalized authors/publishers tables
+NAME_FILTERS = ('author', 'publisher')
+
+# Filters taking a date, bound as epoch_seconds() of that date plus the given
+# number of days (so the "to" filters include their whole last day)
+DATE_FILTERS = {'added_from': 0, 'added_to': 1, 'purchased_from': 0, 'purchased_to': 1}
+
+# Books deleted with delete_book() stay as tombstones until purged, and every
+# query leaves them out: book queries with "b.deleted_at IS NULL" (which also
+# lets SQLite use the partial book indexes), other tables with this subquery
+DELETED_BOOK_IDS = "(SELECT id FROM books WHERE deleted_at IS NOT NULL)"
+
+# Share of a fuzzy query's trigrams a book must contain to be a match
+FUZZY_THRESHOLD = 0.5
+
+# Neighbours kept per book for "similar books", and the lowest similarity kept
+SIMILAR_BOOKS = 10
+SIMILAR_MIN_SCORE = 0.05
+
+# Book details merge_books() copies from a duplicate when the kept book lacks them
+MERGE_FIELDS = (
+    'isbn', 'year', 'publisher', 'pages', 'description', 'rating', 'category_id',
+    'purchase_date', 'purchase_price', 'purchase_store', 'cover_image_path',
+)
+
+# Seconds a statement waits for another connection's lock before SQLite
+# reports the database as busy
+BUSY_TIMEOUT = 5.0
+
+# Attempts at a locked write before giving up, and the base delay (seconds)
+# of the jittered exponential backoff between them
+WRITE_ATTEMPTS = 5
+WRITE_RETRY_DELAY = 0.1
+
+# Free pages compact() releases per transaction, and rows ANALYZE samples per index
+COMPACT_PAGES = 1000
+ANALYSIS_LIMIT = 1000
+
+# Writes from all connections of this process to one database file queue on
+# one lock, so they wait their turn here instead of contending in SQLite
+_write_locks: Dict[str, threading.RLock] = {}
+_write_locks_guard = threading.Lock()
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """Raised when another program keeps the database locked for too long"""
+
+
+def _write_lock(db_path: str) -> threading.RLock:
+    """Get the lock serializing this process's writes to a database file"""
+    with _write_locks_guard:
+        return _write_locks.setdefault(os.path.realpath(db_path), threading.RLock())
+
+
+def normalize_date(value) -> Optional[str]:
+    """
+    Normalize a date to the sortable 'YYYY-MM-DD' form stored in the database.
+
+    Accepts date/datetime objects and ISO 8601 strings (with or without a
+    time part). Empty values become None.
+
+    Raises:
+        ValueError: If the value is not a recognizable date
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date: {text!r} (expected YYYY-MM-DD)")
+
+
+def normalize_purchase_date(value) -> Optional[str]:
+    """
+    Normalize a purchase date like normalize_date(), keeping text that is not
+    a recognizable date as entered (its purchase_date_epoch stays NULL), the
+    same way the epoch_dates migration left such values in existing rows.
+    """
+    try:
+        return normalize_date(value)
+    except ValueError:
+        return str(value).strip()
+
+
+def epoch_seconds(value, days: int = 0) -> Optional[int]:
+    """
+    Convert a date to the integer form of the *_epoch columns.
+
+    The columns hold local wall-clock times counted as if they were UTC, so
+    the result is the start of the given day (plus days) counted the same way.
+    Datetimes keep their time of day.
+    """
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        day = normalize_date(value)
+        if day is None:
+            return None
+        moment = datetime.fromisoformat(day)
+    return calendar.timegm((moment + timedelta(days=days)).timetuple())
 
 
 class Database:
     """Main database class for BookKeeper application"""
 
-    def __init__(self, db_path: str = "data/bookkeeper.db"):
-        """Initialize database connection and create tables if they don't exist"""
+    def __init__(self, db_path: str = "data/bookkeeper.db", check_same_thread: bool = True,
+                 timeout: float = BUSY_TIMEOUT):
+        """
+        Initialize database connection and create tables if they don't exist.
+
+        Pass check_same_thread=False for connections that are handed between
+        threads (e.g. by a pool), which must then serialize their own use.
+        timeout is how long a statement waits for another program's lock,
+        and how long a write waits for another write of this process.
+        """
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=check_same_thread)
+        self._write_lock = _write_lock(db_path)
+        self.timeout = timeout
         self.conn.row_factory = sqlite3.Row
+        # Enforce references so purging a book cascades to its loans and notes
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        # Full-text search needs SQLite's FTS5 extension; notes search falls back to LIKE without it
+        self.has_fts = False
+        # Statement text for filter_books(), keyed by predicate shape
+        self._filter_sql_cache: Dict[Tuple, str] = {}
+        # Aggregate results keyed by name, stored with the table versions they were computed at
+        self._stats_cache: Dict[str, Tuple[Tuple[int, ...], object]] = {}
         self.create_tables()
 
     def create_tables(self):
-        """Create all necessary database tables"""
+        """Create the database schema or upgrade it to the latest version"""
+        # Only an upgrade needs the write lock; up-to-date files skip the wait
+        if get_version(self.conn) < LATEST_VERSION:
+            with self._write_lock:
+                migrate(self.conn)
         cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'")
+        self.has_fts = cursor.fetchone() is not None
 
-        # Books table with extended fields
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                author TEXT NOT NULL,
-                isbn TEXT UNIQUE,
-                year INTEGER,
-                publisher TEXT,
-                pages INTEGER,
-                language TEXT DEFAULT 'English',
-                description TEXT,
-                rating REAL DEFAULT 0,
-                category_id INTEGER,
-                purchase_date TEXT,
-                purchase_price REAL,
-                purchase_store TEXT,
-                cover_image_path TEXT,
-                date_added TEXT DEFAULT CURRENT_TIMESTAMP,
-                last_modified TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (category_id) REFERENCES categories(id)
-            )
-        """)
+    def close(self):
+        """Close database connection"""
+        if self.conn:
+            self.conn.close()
 
-        # Categories table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                color TEXT DEFAULT '#3498db'
-            )
-        """)
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Run a block in a write transaction, committing at the end or rolling back on errors.
 
-        # Lending table to track who borrowed books
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS lending (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                book_id INTEGER NOT NULL,
-                borrower_name TEXT NOT NULL,
-                borrower_contact TEXT,
-                lend_date TEXT NOT NULL,
-                expected_return_date TEXT,
-                actual_return_date TEXT,
-                notes TEXT,
-                status TEXT DEFAULT 'borrowed',
-                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
-            )
-        """)
+        Writes from this process queue on a per-file lock, and the transaction
+        starts with BEGIN IMMEDIATE so it holds SQLite's write lock from the
+        start instead of failing halfway through. Locks held by other programs
+        are waited out (busy timeout, then jittered retries). Nested calls
+        join the outer transaction.
 
-        # Notes/Reviews table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                book_id INTEGER NOT NULL,
-                note_text TEXT NOT NULL,
-                date_created TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
-            )
-        """)
+        Raises:
+            DatabaseBusyError: If the database stayed locked
+        """
+        with self._holding_write_lock():
+            if self.conn.in_transaction:
+                yield self.conn.cursor()
+                return
+            self._retry_busy(lambda: self.conn.execute("BEGIN IMMEDIATE"))
+            try:
+                yield self.conn.cursor()
+                self._retry_busy(self.conn.commit)
+            except BaseException:
+                self.conn.rollback()
+                raise
 
-        # Add some default categories
-        default_categories = [
-            ('Fiction', 'Fictional literature', '#e74c3c'),
-            ('Non-Fiction', 'Non-fictional works', '#3498db'),
-            ('Science', 'Scientific literature', '#2ecc71'),
-            ('Technology', 'Technology and computing', '#9b59b6'),
-            ('Biography', 'Biographies and memoirs', '#f39c12'),
-            ('History', 'Historical works', '#1abc9c'),
-            ('Self-Help', 'Self-improvement books', '#e67e22'),
-            ('Children', 'Children literature', '#f1c40f'),
-            ('Reference', 'Reference materials', '#34495e'),
-            ('Other', 'Miscellaneous', '#95a5a6')
-        ]
+    @contextmanager
+    def _snapshot(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Run a block of reads against one consistent snapshot of the database.
 
-        for name, desc, color in default_categories:
-            cursor.execute(
-                "INSERT OR IGNORE INTO categories (name, description, color) VALUES (?, ?, ?)",
-                (name, desc, color)
-            )
+        Inside a transaction already open on this connection the reads join
+        it, seeing its uncommitted writes; otherwise a read transaction is
+        opened for the block and ended without committing anything.
+        """
+        if self.conn.in_transaction:
+            yield self.conn.cursor()
+            return
+        self.conn.execute("BEGIN")
+        try:
+            yield self.conn.cursor()
+        finally:
+            self.conn.rollback()
 
-        self.conn.commit()
+    @contextmanager
+    def _holding_write_lock(self) -> Iterator[None]:
+        """
+        Hold this process's write lock for the database file for a block.
 
-    def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        Raises:
+            DatabaseBusyError: If another write (e.g. background maintenance)
+                kept it longer than the timeout
+        """
+        if not self._write_lock.acquire(timeout=self.timeout):
+            raise DatabaseBusyError("The database is busy with another task. Please try again in a moment.")
+        try:
+            yield
+        finally:
+            self._write_lock.release()
+
+    def _retry_busy(self, action: Callable):
+        """Run action, retrying with jittered exponential backoff while the database is locked"""
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                return action()
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    raise
+                if attempt == WRITE_ATTEMPTS - 1:
+                    raise DatabaseBusyError(
+                        "The database is being used by another program. Please try again in a moment."
+                    ) from e
+                time.sleep(random.uniform(0, WRITE_RETRY_DELAY * 2 ** attempt))
 
     # ==================== BOOK OPERATIONS ====================
 
@@ -120,30 +300,31 @@ class Database:
         values = []
 
         for key, value in kwargs.items():
-            if value is not None and value != '':
+            if value is not None and value != '' and key not in DERIVED_BOOK_COLUMNS:
                 fields.append(key)
-                values.append(value)
+                values.append(normalize_purchase_date(value) if key == 'purchase_date' else value)
+
+        fields.extend(('sort_title', 'sort_author'))
+        values.extend((title_sort_key(kwargs.get('title')), author_sort_key(kwargs.get('author'))))
 
         if 'date_added' not in fields:
             fields.append('date_added')
             values.append(datetime.now().isoformat())
 
-        query = f"INSERT INTO books ({', '.join(fields)}) VALUES ({', '.join(['?']*len(values))})"
-        cursor = self.conn.cursor()
-        cursor.execute(query, values)
-        self.conn.commit()
+        with self.write() as cursor:
+            fields.append('publisher_id')
+            values.append(get_or_create_name(self.conn, 'publishers', kwargs.get('publisher')))
+            self._release_isbn(kwargs.get('isbn'))
+
+            query = f"INSERT INTO books ({', '.join(fields)}) VALUES ({', '.join(['?']*len(values))})"
+            cursor.execute(query, values)
+            link_book_authors(self.conn, cursor.lastrowid, kwargs.get('author'))
+            index_book_trigrams(self.conn, cursor.lastrowid, kwargs.get('title'), kwargs.get('author'))
         return cursor.lastrowid
 
-    def get_all_books(self) -> List[Dict]:
+    def get_all_books(self, sort: Optional[Sequence[str]] = None) -> List[Dict]:
         """Get all books from database"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT b.*, c.name as category_name, c.color as category_color
-            FROM books b
-            LEFT JOIN categories c ON b.category_id = c.id
-            ORDER BY b.title
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+        return self.filter_books(sort=sort)
 
     def get_book_by_id(self, book_id: int) -> Optional[Dict]:
         """Get a specific book by ID"""
@@ -152,7 +333,7 @@ class Database:
             SELECT b.*, c.name as category_name
             FROM books b
             LEFT JOIN categories c ON b.category_id = c.id
-            WHERE b.id = ?
+            WHERE b.id = ? AND b.deleted_at IS NULL
         """, (book_id,))
         result = cursor.fetchone()
         return dict(result) if result else None
@@ -163,49 +344,272 @@ class Database:
         values = []
 
         for key, value in kwargs.items():
-            if key != 'id':
+            if key != 'id' and key not in DERIVED_BOOK_COLUMNS:
                 fields.append(f"{key} = ?")
-                values.append(value)
+                values.append(normalize_purchase_date(value) if key == 'purchase_date' else value)
 
-        fields.append("last_modified = ?")
-        values.append(datetime.now().isoformat())
-        values.append(book_id)
+        if 'title' in kwargs:
+            fields.append("sort_title = ?")
+            values.append(title_sort_key(kwargs['title']))
+        if 'author' in kwargs:
+            fields.append("sort_author = ?")
+            values.append(author_sort_key(kwargs['author']))
 
-        query = f"UPDATE books SET {', '.join(fields)} WHERE id = ?"
-        cursor = self.conn.cursor()
-        cursor.execute(query, values)
-        self.conn.commit()
+        with self.write() as cursor:
+            old_publisher = None
+            if 'publisher' in kwargs:
+                cursor.execute("SELECT publisher_id FROM books WHERE id = ?", (book_id,))
+                row = cursor.fetchone()
+                old_publisher = row['publisher_id'] if row else None
+                fields.append("publisher_id = ?")
+                values.append(get_or_create_name(self.conn, 'publishers', kwargs['publisher']))
+
+            fields.append("last_modified = ?")
+            values.append(datetime.now().isoformat())
+            values.append(book_id)
+
+            if kwargs.get('isbn'):
+                self._release_isbn(kwargs['isbn'])
+
+            query = f"UPDATE books SET {', '.join(fields)} WHERE id = ?"
+            cursor.execute(query, values)
+            if 'author' in kwargs:
+                link_book_authors(self.conn, book_id, kwargs['author'])
+            if 'title' in kwargs or 'author' in kwargs:
+                cursor.execute("SELECT title, author FROM books WHERE id = ?", (book_id,))
+                row = cursor.fetchone()
+                if row:
+                    index_book_trigrams(self.conn, book_id, row['title'], row['author'])
+            prune_publishers(self.conn, [old_publisher])
 
     def delete_book(self, book_id: int):
-        """Delete a book from database"""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM books WHERE id = ?", (book_id,))
-        self.conn.commit()
+        """
+        Delete a book, keeping it as a tombstone that restore_book() can undo.
+
+        The book and its loans and notes are hidden at once; they are removed
+        for good by purge_deleted_books() once the undo window has passed.
+        """
+        with self.write() as cursor:
+            cursor.execute(
+                "UPDATE books SET deleted_at = ? WHERE id = ? AND deleted_at IS NULL",
+                (datetime.now().isoformat(), book_id)
+            )
+
+    def restore_book(self, book_id: int) -> bool:
+        """
+        Undo delete_book() for a book that has not been purged yet.
+
+        Returns:
+            bool: True if the book was restored
+        """
+        with self.write() as cursor:
+            cursor.execute(
+                "UPDATE books SET deleted_at = NULL WHERE id = ? AND deleted_at IS NOT NULL",
+                (book_id,)
+            )
+        return cursor.rowcount > 0
+
+    def _release_isbn(self, isbn: Optional[str]):
+        """
+        Clear an ISBN from a deleted book holding it, so a live book can take it over.
+
+        The deleted book keeps its loans, notes and covers and can still be
+        restored, just without the ISBN.
+        """
+        if isbn:
+            self.conn.execute("UPDATE books SET isbn = NULL WHERE isbn = ? AND deleted_at IS NOT NULL", (isbn,))
 
-    def search_books(self, query: str, category_id: Optional[int] = None) -> List[Dict]:
+    def search_books(self, query: str, category_id: Optional[int] = None,
+                     sort: Optional[Sequence[str]] = None) -> List[Dict]:
         """Search books by title, author, ISBN, or description"""
-        cursor = self.conn.cursor()
-        search_term = f"%{query}%"
+        return self.filter_books(query=query, category_id=category_id, sort=sort)
+
+    def fuzzy_search_books(self, query: str, limit: int = 50, category_id: Optional[int] = None,
+                           threshold: float = FUZZY_THRESHOLD) -> List[Dict]:
+        """
+        Search titles and authors tolerating typos, best matches first.
 
+        Args:
+            query: Text as typed, e.g. "Gatsbi" or "orwel"
+            limit: Maximum number of books to return
+            category_id: Only books in this category
+            threshold: Share of the query's trigrams a book must contain
+
+        Returns:
+            List[Dict]: Matching books with a ``similarity`` between 0 and 1
+        """
+        grams = sorted(trigrams(query))
+        if not grams:
+            return []
+
+        conditions = ["b.deleted_at IS NULL"]
+        params: List = grams + [max(1, math.ceil(len(grams) * threshold)), len(grams)]
         if category_id:
-            cursor.execute("""
-                SELECT b.*, c.name as category_name, c.color as category_color
-                FROM books b
-                LEFT JOIN categories c ON b.category_id = c.id
-                WHERE (b.title LIKE ? OR b.author LIKE ? OR b.isbn LIKE ? OR b.description LIKE ?)
-                AND b.category_id = ?
-                ORDER BY b.title
-            """, (search_term, search_term, search_term, search_term, category_id))
-        else:
-            cursor.execute("""
+            conditions.append("b.category_id = ?")
+            params.append(category_id)
+        params.append(limit)
+
+        cursor = self.conn.cursor()
+        # Shorter titles rank first among equal matches, being closer to the query
+        cursor.execute(f"""
+            WITH matches AS (
+                SELECT book_id, COUNT(*) as shared
+                FROM book_trigrams
+                WHERE trigram IN ({', '.join('?' * len(grams))})
+                GROUP BY book_id
+                HAVING COUNT(*) >= ?
+            )
+            SELECT b.*, c.name as category_name, c.color as category_color,
+                   ROUND(1.0 * m.shared / ?, 3) as similarity
+            FROM matches m
+            JOIN books b ON b.id = m.book_id
+            LEFT JOIN categories c ON b.category_id = c.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY m.shared DESC, length(b.title) + length(b.author), b.id
+            LIMIT ?
+        """, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def filter_books(self, sort: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                     after: Optional[Tuple] = None, **filters) -> List[Dict]:
+        """
+        Get books matching a combination of structured filters.
+
+        Supported filters are the keys of BOOK_FILTERS plus ``lent``
+        (True for books currently lent out, False for available ones).
+        Filters that are None or empty are ignored, and all given filters
+        must match.
+
+        Args:
+            sort: Keys from BOOK_SORT_KEYS, prefixed with '-' for descending
+                order (e.g. ('-rating', 'title')). Defaults to title.
+            limit: Maximum number of books to return
+            after: Keyset cursor from book_sort_cursor() for the last book of
+                the previous page; only books ordered after it are returned
+            **filters: Structured filter values
+
+        Returns:
+            List[Dict]: Matching books in the requested order
+        """
+        unknown = set(filters) - set(BOOK_FILTERS) - {'lent'}
+        if unknown:
+            raise ValueError(f"Unknown book filter(s): {', '.join(sorted(unknown))}")
+
+        sort_spec = self._parse_sort(sort)
+        active = {key: value for key, value in filters.items()
+                  if value is not None and value != ''}
+        names = tuple(key for key in BOOK_FILTERS if key in active)
+        lent = bool(active['lent']) if 'lent' in active else None
+
+        params = []
+        for name in names:
+            if name == 'query':
+                params.extend([f"%{active[name]}%"] * 4)
+            elif name in NAME_FILTERS:
+                params.append(name_key(active[name]))
+            elif name in DATE_FILTERS:
+                params.append(epoch_seconds(active[name], DATE_FILTERS[name]))
+            else:
+                params.append(active[name])
+
+        if after is not None:
+            if len(after) != len(sort_spec) + 1:
+                raise ValueError("Cursor does not match the sort keys")
+            params.extend(self._keyset_params(sort_spec, after))
+        if limit is not None:
+            params.append(limit)
+
+        query = self._build_filter_query(names, lent, sort_spec, after is not None, limit is not None)
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def book_sort_cursor(self, book: Dict, sort: Optional[Sequence[str]] = None) -> Tuple:
+        """Build the keyset cursor for a book returned by filter_books()"""
+        values = []
+        for key, _ in self._parse_sort(sort):
+            _, null_value, column = BOOK_SORT_KEYS[key]
+            value = book.get(column)
+            values.append(null_value if value is None else value)
+        values.append(book['id'])
+        return tuple(values)
+
+    def _parse_sort(self, sort: Optional[Sequence[str]]) -> Tuple[Tuple[str, bool], ...]:
+        """Turn a sort specification into (key, descending) pairs"""
+        if isinstance(sort, str):
+            sort = (sort,)
+        spec = []
+        for item in sort or DEFAULT_BOOK_SORT:
+            key = item.lstrip('-')
+            if key not in BOOK_SORT_KEYS:
+                raise ValueError(f"Unknown sort key: {key}")
+            spec.append((key, item.startswith('-')))
+        return tuple(spec)
+
+    def _keyset_params(self, sort_spec: Tuple[Tuple[str, bool], ...], after: Tuple) -> List:
+        """Parameters for the keyset condition built by _keyset_condition()"""
+        # The leading key bound comes first, then the row-value or expanded form
+        params = [after[0]]
+        descending = {desc for _, desc in sort_spec}
+        if len(descending) == 1:
+            return params + list(after)
+        for i in range(len(after)):
+            params.extend(after[:i + 1])
+        return params
+
+    def _keyset_condition(self, sort_spec: Tuple[Tuple[str, bool], ...]) -> str:
+        """SQL condition selecting rows ordered after a keyset cursor"""
+        expressions = [BOOK_SORT_KEYS[key][0] for key, _ in sort_spec] + ["b.id"]
+        directions = [desc for _, desc in sort_spec]
+        directions.append(directions[-1])
+
+        # A plain bound on the leading key lets SQLite seek into the sort
+        # index, which it will not do from a row value over an expression
+        bound = f"{expressions[0]} {'<=' if directions[0] else '>='} ?"
+
+        if len(set(directions)) == 1:
+            op = "<" if directions[0] else ">"
+            placeholders = ", ".join("?" * len(expressions))
+            return f"{bound} AND ({', '.join(expressions)}) {op} ({placeholders})"
+
+        clauses = []
+        for i, expression in enumerate(expressions):
+            equal = [f"{expr} = ?" for expr in expressions[:i]]
+            op = "<" if directions[i] else ">"
+            clauses.append("(" + " AND ".join(equal + [f"{expression} {op} ?"]) + ")")
+        return f"{bound} AND (" + " OR ".join(clauses) + ")"
+
+    def _build_filter_query(self, names: Tuple[str, ...], lent: Optional[bool],
+                            sort_spec: Tuple[Tuple[str, bool], ...],
+                            keyset: bool, limited: bool) -> str:
+        """Compile a filter shape to SQL, reusing the text for repeated shapes"""
+        shape = (names, lent, sort_spec, keyset, limited)
+        query = self._filter_sql_cache.get(shape)
+        if query is None:
+            conditions = ["b.deleted_at IS NULL"] + [BOOK_FILTERS[name] for name in names]
+            if lent is not None:
+                conditions.append(LENT_FILTERS[lent])
+            if keyset:
+                conditions.append(self._keyset_condition(sort_spec))
+            where = f"WHERE {' AND '.join(conditions)}"
+
+            # The id tiebreaker follows the last key so single-key sorts can
+            # walk their (expression, id) index in either direction
+            order = [f"{BOOK_SORT_KEYS[key][0]} {'DESC' if desc else 'ASC'}"
+                     for key, desc in sort_spec]
+            order.append(f"b.id {'DESC' if sort_spec[-1][1] else 'ASC'}")
+
+            # Identical text lets sqlite3's statement cache reuse the prepared statement
+            query = f"""
                 SELECT b.*, c.name as category_name, c.color as category_color
                 FROM books b
                 LEFT JOIN categories c ON b.category_id = c.id
-                WHERE b.title LIKE ? OR b.author LIKE ? OR b.isbn LIKE ? OR b.description LIKE ?
-                ORDER BY b.title
-            """, (search_term, search_term, search_term, search_term))
-
-        return [dict(row) for row in cursor.fetchall()]
+                {where}
+                ORDER BY {', '.join(order)}
+                {'LIMIT ?' if limited else ''}
+            """
+            self._filter_sql_cache[shape] = query
+        return query
 
     # ==================== CATEGORY OPERATIONS ====================
 
@@ -217,109 +621,841 @@ class Database:
 
     def add_category(self, name: str, description: str = '', color: str = '#3498db') -> int:
         """Add a new category"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "INSERT INTO categories (name, description, color) VALUES (?, ?, ?)",
-            (name, description, color)
-        )
-        self.conn.commit()
+        with self.write() as cursor:
+            cursor.execute(
+                "INSERT INTO categories (name, description, color) VALUES (?, ?, ?)",
+                (name, description, color)
+            )
         return cursor.lastrowid
 
     def get_category_stats(self) -> List[Dict]:
-        """Get statistics for each category"""
+        """Get book count and share of all categorized books for each category"""
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT c.id, c.name, c.color, COUNT(b.id) as book_count
+            SELECT c.id, c.name, c.color, COUNT(b.id) as book_count,
+                   SUM(COUNT(b.id)) OVER () as total_books,
+                   IFNULL(ROUND(100.0 * COUNT(b.id) / NULLIF(SUM(COUNT(b.id)) OVER (), 0), 1), 0) as percentage
             FROM categories c
-            LEFT JOIN books b ON c.id = b.category_id
+            LEFT JOIN books b ON c.id = b.category_id AND b.deleted_at IS NULL
             GROUP BY c.id, c.name, c.color
             ORDER BY book_count DESC, c.name
         """)
         return [dict(row) for row in cursor.fetchall()]
 
+    # ==================== MEDIA OPERATIONS ====================
+
+    def register_media(self, media_hash: str, path: str, size: int):
+        """Record a stored media blob; its reference count comes from the books using it"""
+        with self.write() as cursor:
+            cursor.execute("""
+                INSERT INTO media (hash, path, size, ref_count, date_added)
+                VALUES (?, ?, ?, (SELECT COUNT(*) FROM books WHERE cover_image_path = ?), ?)
+                ON CONFLICT(hash) DO UPDATE SET date_added = excluded.date_added
+            """, (media_hash, path, size, path, datetime.now().isoformat()))
+
+    def get_media(self, media_hash: str) -> Optional[Dict]:
+        """Get a media blob by content hash"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM media WHERE hash = ?", (media_hash,))
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+    def get_unreferenced_media(self, added_before: str) -> List[Dict]:
+        """Get media blobs no book references, registered before the given ISO timestamp"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT * FROM media WHERE ref_count <= 0 AND date_added < ?",
+            (added_before,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_media_paths(self) -> set:
+        """Get the store paths of all registered media blobs"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT path FROM media")
+        return {row['path'] for row in cursor.fetchall()}
+
+    def get_external_cover_paths(self, store_prefix: str) -> List[str]:
+        """Get the distinct cover paths of books (deleted ones included) that point outside the store"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT cover_image_path FROM books
+            WHERE cover_image_path IS NOT NULL AND cover_image_path != ''
+            AND substr(cover_image_path, 1, ?) != ?
+        """, (len(store_prefix), store_prefix))
+        return [row['cover_image_path'] for row in cursor.fetchall()]
+
+    def replace_cover_path(self, old_path: str, new_path: str) -> int:
+        """
+        Point every book using one cover path at another.
+
+        Returns:
+            int: Number of books changed
+        """
+        with self.write() as cursor:
+            cursor.execute(
+                "UPDATE books SET cover_image_path = ? WHERE cover_image_path = ?",
+                (new_path, old_path)
+            )
+            return cursor.rowcount
+
+    def delete_media(self, media_hash: str):
+        """Forget a media blob"""
+        with self.write() as cursor:
+            cursor.execute("DELETE FROM media WHERE hash = ?", (media_hash,))
+
     # ==================== LENDING OPERATIONS ====================
 
     def lend_book(self, book_id: int, borrower_name: str, borrower_contact: str = '',
                   expected_return_date: str = '', notes: str = '') -> int:
         """Record a book being lent out"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO lending (book_id, borrower_name, borrower_contact,
-                               lend_date, expected_return_date, notes, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'borrowed')
-        """, (book_id, borrower_name, borrower_contact, datetime.now().isoformat(),
-              expected_return_date, notes))
-        self.conn.commit()
+        with self.write() as cursor:
+            cursor.execute("""
+                INSERT INTO lending (book_id, borrower_name, borrower_contact,
+                                   lend_date, expected_return_date, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?, 'borrowed')
+            """, (book_id, borrower_name, borrower_contact, datetime.now().isoformat(),
+                  normalize_date(expected_return_date), notes))
         return cursor.lastrowid
 
     def return_book(self, lending_id: int):
         """Mark a book as returned"""
+        with self.write() as cursor:
+            cursor.execute("""
+                UPDATE lending
+                SET actual_return_date = ?, status = 'returned'
+                WHERE id = ?
+            """, (datetime.now().isoformat(), lending_id))
+
+    def get_borrowed_books(self, as_of: Optional[date] = None) -> List[Dict]:
+        """
+        Get all currently borrowed books.
+
+        Each row includes ``lend_day`` (the lend date as YYYY-MM-DD) and
+        ``days_until_due`` relative to as_of (today by default), negative
+        when overdue and None when there is no expected return date.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT l.*, b.title, b.author, date(l.lend_date) as lend_day,
+                   CAST(julianday(l.expected_return_date) - julianday(?) AS INTEGER) as days_until_due
+            FROM lending l
+            JOIN books b ON l.book_id = b.id
+            WHERE l.status = 'borrowed' AND b.deleted_at IS NULL
+            ORDER BY l.lend_date_epoch DESC
+        """, (normalize_date(as_of or date.today()),))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_overdue(self, as_of: Optional[date] = None) -> List[Dict]:
+        """Get borrowed books whose expected return date is before as_of (default today)"""
+        as_of = normalize_date(as_of or date.today())
         cursor = self.conn.cursor()
         cursor.execute("""
-            UPDATE lending
-            SET actual_return_date = ?, status = 'returned'
-            WHERE id = ?
-        """, (datetime.now().isoformat(), lending_id))
-        self.conn.commit()
+            SELECT l.*, b.title, b.author,
+                   CAST(julianday(l.expected_return_date) - julianday(?) AS INTEGER) as days_until_due
+            FROM lending l
+            JOIN books b ON l.book_id = b.id
+            WHERE l.status = 'borrowed' AND l.expected_return_date < ? AND b.deleted_at IS NULL
+            ORDER BY l.expected_return_date
+        """, (as_of, as_of))
+        return [dict(row) for row in cursor.fetchall()]
 
-    def get_borrowed_books(self) -> List[Dict]:
-        """Get all currently borrowed books"""
+    def get_due_within(self, days: int, as_of: Optional[date] = None) -> List[Dict]:
+        """Get borrowed books due between as_of (default today) and the given number of days later"""
+        start = as_of or date.today()
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT l.*, b.title, b.author
+            SELECT l.*, b.title, b.author,
+                   CAST(julianday(l.expected_return_date) - julianday(?) AS INTEGER) as days_until_due
             FROM lending l
             JOIN books b ON l.book_id = b.id
-            WHERE l.status = 'borrowed'
-            ORDER BY l.lend_date DESC
-        """)
+            WHERE l.status = 'borrowed' AND l.expected_return_date BETWEEN ? AND ?
+            AND b.deleted_at IS NULL
+            ORDER BY l.expected_return_date
+        """, (normalize_date(start), normalize_date(start),
+              normalize_date(start + timedelta(days=days))))
         return [dict(row) for row in cursor.fetchall()]
 
-    def get_lending_history(self, book_id: Optional[int] = None) -> List[Dict]:
-        """Get lending history for all books or a specific book"""
+    def get_due_status(self, as_of: Optional[date] = None) -> Dict[int, int]:
+        """Get days until due (negative when overdue) for each borrowed book with a due date"""
         cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT id, CAST(julianday(expected_return_date) - julianday(?) AS INTEGER) as days_until_due
+            FROM lending
+            WHERE status = 'borrowed' AND expected_return_date IS NOT NULL
+            AND book_id NOT IN {DELETED_BOOK_IDS}
+        """, (normalize_date(as_of or date.today()),))
+        return {row['id']: row['days_until_due'] for row in cursor.fetchall()}
+
+    def has_due_dates(self) -> bool:
+        """Check whether any borrowed book has an expected return date"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT 1 FROM lending
+            WHERE status = 'borrowed' AND expected_return_date IS NOT NULL
+            AND book_id NOT IN {DELETED_BOOK_IDS}
+            LIMIT 1
+        """)
+        return cursor.fetchone() is not None
+
+    def get_lending_history(self, book_id: Optional[int] = None, status: Optional[str] = None,
+                            borrower: Optional[str] = None, date_from=None, date_to=None,
+                            limit: Optional[int] = None, offset: int = 0,
+                            before: Optional[Tuple[int, int]] = None) -> List[Dict]:
+        """
+        Get lending history, newest first, optionally filtered.
+
+        Args:
+            book_id: Only loans of this book
+            status: Only loans with this status ('borrowed' or 'returned')
+            borrower: Only loans to this borrower (exact name)
+            date_from: Only loans lent on or after this date
+            date_to: Only loans lent on or before this date
+            limit: Maximum number of loans to return
+            offset: Number of loans to skip, for paging with limit
+            before: (lend_date_epoch, id) of the last loan of the previous
+                page; only older loans are returned (keyset paging, which
+                stays fast on deep pages unlike offset)
+
+        Returns:
+            List[Dict]: Loans with book title/author and ``return_day``
+            (the actual return date as YYYY-MM-DD)
+        """
+        conditions = ["b.deleted_at IS NULL"]
+        params = []
         if book_id:
-            cursor.execute("""
-                SELECT l.*, b.title, b.author
-                FROM lending l
-                JOIN books b ON l.book_id = b.id
-                WHERE l.book_id = ?
-                ORDER BY l.lend_date DESC
-            """, (book_id,))
-        else:
-            cursor.execute("""
-                SELECT l.*, b.title, b.author
-                FROM lending l
-                JOIN books b ON l.book_id = b.id
-                ORDER BY l.lend_date DESC
-            """)
+            conditions.append("l.book_id = ?")
+            params.append(book_id)
+        if status:
+            conditions.append("l.status = ?")
+            params.append(status)
+        if borrower:
+            conditions.append("l.borrower_name = ?")
+            params.append(borrower)
+        if date_from:
+            conditions.append("l.lend_date_epoch >= ?")
+            params.append(epoch_seconds(date_from))
+        if date_to:
+            # lend_date carries a time part, so compare against the next day
+            conditions.append("l.lend_date_epoch < ?")
+            params.append(epoch_seconds(date_to, days=1))
+        if before:
+            conditions.append("(l.lend_date_epoch, l.id) < (?, ?)")
+            params.extend(before)
+
+        query = """
+            SELECT l.*, b.title, b.author, date(l.actual_return_date) as return_day
+            FROM lending l
+            JOIN books b ON l.book_id = b.id
+        """
+        query += f" WHERE {' AND '.join(conditions)}"
+        query += " ORDER BY l.lend_date_epoch DESC, l.id DESC"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
     # ==================== NOTES OPERATIONS ====================
 
     def add_note(self, book_id: int, note_text: str) -> int:
         """Add a note/review for a book"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "INSERT INTO notes (book_id, note_text) VALUES (?, ?)",
-            (book_id, note_text)
-        )
-        self.conn.commit()
+        with self.write() as cursor:
+            cursor.execute(
+                "INSERT INTO notes (book_id, note_text) VALUES (?, ?)",
+                (book_id, note_text)
+            )
         return cursor.lastrowid
 
-    def get_book_notes(self, book_id: int) -> List[Dict]:
-        """Get all notes for a specific book"""
+    def get_book_notes(self, book_id: int, limit: Optional[int] = None,
+                       before: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """
+        Get notes for a specific book, newest first.
+
+        Args:
+            book_id: Book whose notes to get
+            limit: Maximum number of notes to return (all when None)
+            before: (date_created, id) of the last note of the previous page;
+                only older notes are returned
+
+        Returns:
+            List[Dict]: Notes for the book
+        """
+        query = "SELECT * FROM notes WHERE book_id = ?"
+        params: List = [book_id]
+        if before:
+            query += " AND (date_created, id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY date_created DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
         cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT * FROM notes WHERE book_id = ? ORDER BY date_created DESC",
-            (book_id,)
-        )
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def count_book_notes(self, book_id: int) -> int:
+        """Get the number of notes for a book"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) as count FROM notes WHERE book_id = ?", (book_id,))
+        return cursor.fetchone()['count']
+
+    def search_notes(self, query: str, limit: int = 20, offset: int = 0,
+                     highlight: Tuple[str, str] = ('[', ']')) -> List[Dict]:
+        """
+        Search the text of all notes and reviews.
+
+        Every word must match, and the last word also matches as a prefix
+        so results update while typing. Results are ranked by relevance
+        and include a ``snippet`` with matches wrapped in highlight markers.
+
+        Returns:
+            List[Dict]: Matching notes with book title and author
+        """
+        words = query.split()
+        if not words:
+            return []
+
+        cursor = self.conn.cursor()
+        if self.has_fts:
+            terms = ['"' + word.replace('"', '""') + '"' for word in words]
+            terms[-1] += '*'
+            cursor.execute("""
+                SELECT n.id, n.book_id, n.date_created, b.title, b.author,
+                       snippet(notes_fts, 0, ?, ?, '…', 12) as snippet
+                FROM notes_fts
+                JOIN notes n ON n.id = notes_fts.rowid
+                JOIN books b ON b.id = n.book_id
+                WHERE notes_fts MATCH ? AND b.deleted_at IS NULL
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            """, (highlight[0], highlight[1], ' '.join(terms), limit, offset))
+        else:
+            conditions = " AND ".join(["n.note_text LIKE ?"] * len(words))
+            cursor.execute(f"""
+                SELECT n.id, n.book_id, n.date_created, b.title, b.author,
+                       substr(n.note_text, 1, 120) as snippet
+                FROM notes n
+                JOIN books b ON b.id = n.book_id
+                WHERE {conditions} AND b.deleted_at IS NULL
+                ORDER BY n.date_created DESC
+                LIMIT ? OFFSET ?
+            """, [f"%{word}%" for word in words] + [limit, offset])
         return [dict(row) for row in cursor.fetchall()]
 
     def delete_note(self, note_id: int):
         """Delete a note"""
+        with self.write() as cursor:
+            cursor.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+
+    # ==================== CHANGE LOG ====================
+
+    def changes_since(self, seq: int = 0, limit: int = 1000) -> List[Dict]:
+        """
+        Get row changes to books, lending and notes recorded after a sequence number.
+
+        Consumers keep the ``seq`` of the last change they processed and pass
+        it back to get the next batch. ``operation`` is 'insert', 'update' or
+        'delete'; soft deletes and restores of books are reported as delete
+        and insert. ``changed_columns`` lists the columns an update changed,
+        or is None when the whole row may have changed (inserts, deletes and
+        entries merged by compact_changes()).
+
+        Returns:
+            List[Dict]: Up to limit changes in sequence order
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT seq, table_name, row_id, operation, changed_columns, changed_at
+            FROM changes
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (seq, limit))
+        changes = [dict(row) for row in cursor.fetchall()]
+        for change in changes:
+            if change['changed_columns'] is not None:
+                change['changed_columns'] = change['changed_columns'].split(',')
+        return changes
+
+    def get_change_seq(self, before: Optional[str] = None) -> int:
+        """Get the sequence number of the latest change, or the latest one before an ISO timestamp (0 if none)"""
+        cursor = self.conn.cursor()
+        if before is None:
+            cursor.execute("SELECT IFNULL(MAX(seq), 0) FROM changes")
+        else:
+            cursor.execute("SELECT IFNULL(MAX(seq), 0) FROM changes WHERE changed_at < ?", (before,))
+        return cursor.fetchone()[0]
+
+    def compact_changes(self, up_to_seq: Optional[int] = None) -> int:
+        """
+        Shrink the change log by keeping only the latest change per row.
+
+        Changes up to up_to_seq (default: all) that a later change to the
+        same row supersedes are removed, and that later change is widened to
+        "whole row changed". A consumer resuming from any sequence number
+        still ends up with the current state of every row.
+
+        Returns:
+            int: Number of changes removed
+        """
+        if up_to_seq is None:
+            up_to_seq = self.get_change_seq()
+        with self.write() as cursor:
+            cursor.execute("""
+                UPDATE changes SET changed_columns = NULL
+                WHERE changed_columns IS NOT NULL
+                AND seq IN (
+                    SELECT MAX(seq) FROM changes
+                    GROUP BY table_name, row_id
+                    HAVING MIN(seq) <= ? AND COUNT(*) > 1
+                )
+            """, (up_to_seq,))
+            cursor.execute("""
+                DELETE FROM changes
+                WHERE seq <= ?
+                AND EXISTS (
+                    SELECT 1 FROM changes later
+                    WHERE later.table_name = changes.table_name
+                    AND later.row_id = changes.row_id
+                    AND later.seq > changes.seq
+                )
+            """, (up_to_seq,))
+        return cursor.rowcount
+
+    def get_book_changes(self, since_seq: Optional[int] = None) -> Tuple[List[Dict], List[int], int]:
+        """
+        Get books changed after a change sequence number, for incremental exports.
+
+        Args:
+            since_seq: Sequence number of the last export, or None for a
+                full snapshot of all books
+
+        Returns:
+            Tuple[List[Dict], List[int], int]: Books inserted or updated (as
+            returned by filter_books()), ids of books deleted, and the change
+            sequence number the result is current to
+        """
+        # Read the sequence number and the rows from one snapshot
+        with self._snapshot() as cursor:
+            seq = self.get_change_seq()
+            if since_seq is None:
+                return self.get_all_books(), [], seq
+
+            cursor.execute("""
+                SELECT DISTINCT row_id FROM changes
+                WHERE table_name = 'books' AND seq > ? AND seq <= ?
+            """, (since_seq, seq))
+            changed_ids = [row['row_id'] for row in cursor.fetchall()]
+
+            books = []
+            for start in range(0, len(changed_ids), 500):
+                chunk = changed_ids[start:start + 500]
+                cursor.execute(f"""
+                    SELECT b.*, c.name as category_name, c.color as category_color
+                    FROM books b
+                    LEFT JOIN categories c ON b.category_id = c.id
+                    WHERE b.id IN ({', '.join('?' * len(chunk))}) AND b.deleted_at IS NULL
+                """, chunk)
+                books.extend(dict(row) for row in cursor.fetchall())
+
+            # Changed books that are gone or tombstoned now were deleted
+            live_ids = {book['id'] for book in books}
+            deleted_ids = sorted(set(changed_ids) - live_ids)
+            books.sort(key=lambda book: book['id'])
+            return books, deleted_ids, seq
+
+    def get_export_watermark(self, destination: str) -> Optional[int]:
+        """Get the change sequence number last exported to a destination, None if never"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT seq FROM export_watermarks WHERE destination = ?", (destination,))
+        result = cursor.fetchone()
+        return result['seq'] if result else None
+
+    def set_export_watermark(self, destination: str, seq: int):
+        """Record the change sequence number exported to a destination"""
+        with self.write() as cursor:
+            cursor.execute("""
+                INSERT INTO export_watermarks (destination, seq, exported_at) VALUES (?, ?, ?)
+                ON CONFLICT(destination) DO UPDATE SET seq = excluded.seq, exported_at = excluded.exported_at
+            """, (destination, seq, datetime.now().isoformat()))
+
+    # ==================== DUPLICATES ====================
+
+    def add_duplicate_candidates(self, candidates: Iterable[Tuple[int, int, float, str]]) -> int:
+        """
+        Queue (book_id, duplicate_id, score, reason) pairs for review.
+
+        Pairs already queued, including dismissed ones, are left as they are.
+
+        Returns:
+            int: Number of pairs newly queued
+        """
+        found_at = datetime.now().isoformat()
+        with self.write() as cursor:
+            cursor.executemany("""
+                INSERT OR IGNORE INTO duplicate_candidates (book_id, duplicate_id, score, reason, found_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(*candidate, found_at) for candidate in candidates])
+        return max(cursor.rowcount, 0)
+
+    def get_duplicate_candidates(self, limit: int = 50) -> List[Dict]:
+        """
+        Get queued duplicate pairs awaiting review, most likely first.
+
+        Returns:
+            List[Dict]: Pairs with ``score``, ``reason`` and the ``book`` and
+            ``duplicate`` (id, title, author, isbn, year, loan and note counts)
+        """
+        fields = "id, title, author, isbn, year"
         cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM notes WHERE id = ?", (note_id,))
-        self.conn.commit()
+        cursor.execute("""
+            SELECT d.id, d.book_id, d.duplicate_id, d.score, d.reason
+            FROM duplicate_candidates d
+            JOIN books a ON a.id = d.book_id
+            JOIN books b ON b.id = d.duplicate_id
+            WHERE d.status = 'pending' AND a.deleted_at IS NULL AND b.deleted_at IS NULL
+            ORDER BY d.score DESC, d.id
+            LIMIT ?
+        """, (limit,))
+        pairs = [dict(row) for row in cursor.fetchall()]
+        for pair in pairs:
+            for role, book_id in (('book', pair['book_id']), ('duplicate', pair['duplicate_id'])):
+                cursor.execute(f"""
+                    SELECT {fields},
+                           (SELECT COUNT(*) FROM lending WHERE book_id = books.id) as loan_count,
+                           (SELECT COUNT(*) FROM notes WHERE book_id = books.id) as note_count
+                    FROM books WHERE id = ?
+                """, (book_id,))
+                pair[role] = dict(cursor.fetchone())
+        return pairs
+
+    def dismiss_duplicate(self, candidate_id: int):
+        """Mark a queued pair as not duplicates, so later scans don't queue it again"""
+        with self.write() as cursor:
+            cursor.execute(
+                "UPDATE duplicate_candidates SET status = 'dismissed' WHERE id = ?", (candidate_id,)
+            )
+
+    def merge_books(self, keep_id: int, duplicate_id: int):
+        """
+        Merge a duplicate book into the book kept.
+
+        Loans and notes of the duplicate move to the kept book, details the
+        kept book lacks (see MERGE_FIELDS) are copied from the duplicate, and
+        the duplicate is deleted with delete_book(), so restore_book() can
+        bring it back (without the loans and notes) during the undo window.
+
+        Raises:
+            ValueError: If the books are the same, or either does not exist
+                or is deleted
+        """
+        if keep_id == duplicate_id:
+            raise ValueError("Cannot merge a book into itself")
+        with self.write() as cursor:
+            cursor.execute(
+                "SELECT * FROM books WHERE id IN (?, ?) AND deleted_at IS NULL", (keep_id, duplicate_id)
+            )
+            books = {row['id']: dict(row) for row in cursor.fetchall()}
+            if len(books) < 2:
+                raise ValueError("Both books must exist and not be deleted to be merged")
+            keep, duplicate = books[keep_id], books[duplicate_id]
+
+            cursor.execute("UPDATE lending SET book_id = ? WHERE book_id = ?", (keep_id, duplicate_id))
+            cursor.execute("UPDATE notes SET book_id = ? WHERE book_id = ?", (keep_id, duplicate_id))
+            cursor.execute("""
+                UPDATE duplicate_candidates SET status = 'merged'
+                WHERE (book_id = ? AND duplicate_id = ?) OR (book_id = ? AND duplicate_id = ?)
+            """, (keep_id, duplicate_id, duplicate_id, keep_id))
+            self.delete_book(duplicate_id)
+
+            # update_book() clears the ISBN from the deleted duplicate if it moves over
+            fills = {field: duplicate[field] for field in MERGE_FIELDS
+                     if not keep[field] and duplicate[field]}
+            if fills:
+                self.update_book(keep_id, **fills)
+
+    # ==================== SIMILAR BOOKS ====================
+
+    def get_similar_books(self, book_id: int, limit: int = SIMILAR_BOOKS) -> List[Dict]:
+        """Get the precomputed books most like a book, most similar first"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT b.id, b.title, b.author, s.score
+            FROM similar_books s
+            JOIN books b ON b.id = s.similar_id
+            WHERE s.book_id = ? AND b.deleted_at IS NULL
+            ORDER BY s.score DESC
+            LIMIT ?
+        """, (book_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_term_doc_counts(self, terms: Iterable[str]) -> Dict[str, int]:
+        """Get how many indexed books contain each of the given terms (terms no book has are left out)"""
+        terms = list(terms)
+        cursor = self.conn.cursor()
+        counts = {}
+        for start in range(0, len(terms), 500):
+            chunk = terms[start:start + 500]
+            cursor.execute(f"""
+                SELECT term, doc_count FROM term_stats WHERE term IN ({', '.join('?' * len(chunk))})
+            """, chunk)
+            counts.update((row['term'], row['doc_count']) for row in cursor.fetchall())
+        return counts
+
+    def get_indexed_terms(self, book_ids: Iterable[int]) -> Dict[int, Set[str]]:
+        """Get the terms stored for each of the given books (books not in the index are left out)"""
+        book_ids = list(book_ids)
+        cursor = self.conn.cursor()
+        terms: Dict[int, Set[str]] = {}
+        for start in range(0, len(book_ids), 500):
+            chunk = book_ids[start:start + 500]
+            cursor.execute(f"""
+                SELECT book_id, term FROM book_terms WHERE book_id IN ({', '.join('?' * len(chunk))})
+            """, chunk)
+            for row in cursor.fetchall():
+                terms.setdefault(row['book_id'], set()).add(row['term'])
+        return terms
+
+    def count_books(self) -> int:
+        """Get the number of books in the library, leaving out deleted ones"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM books WHERE deleted_at IS NULL")
+        return cursor.fetchone()[0]
+
+    def replace_similarity_index(self, vectors: Dict[int, Dict[str, float]],
+                                 neighbours: Dict[int, List[Tuple[int, float]]], batch_size: int = 500):
+        """
+        Replace the whole similarity index.
+
+        Books are replaced batch_size at a time, each batch in its own short
+        transaction so other writes get their turn; every book's terms and
+        neighbours change together.
+
+        Args:
+            vectors: Weighted terms of each book
+            neighbours: (similar book id, score) pairs of each book
+        """
+        doc_counts: Dict[str, int] = {}
+        for vector in vectors.values():
+            for term in vector:
+                doc_counts[term] = doc_counts.get(term, 0) + 1
+
+        book_ids = list(vectors)
+        for start in range(0, len(book_ids), batch_size):
+            chunk = book_ids[start:start + batch_size]
+            marks = ', '.join('?' * len(chunk))
+            with self.write() as cursor:
+                cursor.execute(f"DELETE FROM book_terms WHERE book_id IN ({marks})", chunk)
+                cursor.execute(f"DELETE FROM similar_books WHERE book_id IN ({marks})", chunk)
+                cursor.executemany(
+                    "INSERT INTO book_terms (book_id, term, weight) VALUES (?, ?, ?)",
+                    [(book_id, term, weight) for book_id in chunk
+                     for term, weight in vectors[book_id].items()]
+                )
+                cursor.executemany(
+                    "INSERT INTO similar_books (book_id, similar_id, score) VALUES (?, ?, ?)",
+                    [(book_id, similar_id, score) for book_id in chunk
+                     for similar_id, score in neighbours.get(book_id, ())]
+                )
+
+        with self.write() as cursor:
+            # Books deleted since they were indexed
+            cursor.execute("DELETE FROM book_terms WHERE book_id NOT IN (SELECT id FROM books WHERE deleted_at IS NULL)")
+            cursor.execute("""
+                DELETE FROM similar_books
+                WHERE book_id NOT IN (SELECT id FROM books WHERE deleted_at IS NULL)
+                OR similar_id NOT IN (SELECT id FROM books WHERE deleted_at IS NULL)
+            """)
+            cursor.execute("DELETE FROM term_stats")
+            cursor.executemany("INSERT INTO term_stats (term, doc_count) VALUES (?, ?)", doc_counts.items())
+
+    def update_book_similarity(self, book_id: int, vector: Optional[Dict[str, float]],
+                               size: int = SIMILAR_BOOKS, min_score: float = SIMILAR_MIN_SCORE):
+        """
+        Replace one book's weighted terms and bring the neighbour lists up to date.
+
+        The book's own list is recomputed, along with the lists it enters or
+        drops out of; all other lists stay as they are. A vector of None
+        takes the book out of the index.
+        """
+        with self.write() as cursor:
+            cursor.execute("SELECT term FROM book_terms WHERE book_id = ?", (book_id,))
+            old_terms = [(row['term'],) for row in cursor.fetchall()]
+            cursor.executemany("UPDATE term_stats SET doc_count = doc_count - 1 WHERE term = ?", old_terms)
+            cursor.executemany("DELETE FROM term_stats WHERE term = ? AND doc_count <= 0", old_terms)
+            cursor.execute("DELETE FROM book_terms WHERE book_id = ?", (book_id,))
+            if vector:
+                cursor.executemany(
+                    "INSERT INTO book_terms (book_id, term, weight) VALUES (?, ?, ?)",
+                    [(book_id, term, weight) for term, weight in vector.items()]
+                )
+                cursor.executemany("""
+                    INSERT INTO term_stats (term, doc_count) VALUES (?, 1)
+                    ON CONFLICT(term) DO UPDATE SET doc_count = doc_count + 1
+                """, [(term,) for term in vector])
+
+            scores = self._similarity_scores(cursor, book_id, min_score)
+            self._set_neighbours(cursor, book_id, scores, size)
+
+            # Lists that held the book: update its score, or recompute them if it dropped out
+            cursor.execute("SELECT book_id FROM similar_books WHERE similar_id = ?", (book_id,))
+            listed_by = {row['book_id'] for row in cursor.fetchall()}
+            for other_id in listed_by:
+                if other_id in scores:
+                    cursor.execute(
+                        "UPDATE similar_books SET score = ? WHERE book_id = ? AND similar_id = ?",
+                        (scores[other_id], other_id, book_id)
+                    )
+                else:
+                    self._set_neighbours(cursor, other_id,
+                                         self._similarity_scores(cursor, other_id, min_score), size)
+
+            # Lists the book now enters, pushing out their least similar entry when full
+            candidates = [other_id for other_id in scores if other_id not in listed_by]
+            lists = {}
+            for start in range(0, len(candidates), 500):
+                chunk = candidates[start:start + 500]
+                cursor.execute(f"""
+                    SELECT book_id, COUNT(*) AS size, MIN(score) AS lowest
+                    FROM similar_books
+                    WHERE book_id IN ({', '.join('?' * len(chunk))})
+                    GROUP BY book_id
+                """, chunk)
+                lists.update((row['book_id'], (row['size'], row['lowest'])) for row in cursor.fetchall())
+            for other_id in candidates:
+                count, lowest = lists.get(other_id, (0, None))
+                if count >= size and scores[other_id] <= lowest:
+                    continue
+                cursor.execute(
+                    "INSERT INTO similar_books (book_id, similar_id, score) VALUES (?, ?, ?)",
+                    (other_id, book_id, scores[other_id])
+                )
+                if count >= size:
+                    cursor.execute("""
+                        DELETE FROM similar_books WHERE book_id = ? AND similar_id = (
+                            SELECT similar_id FROM similar_books WHERE book_id = ?
+                            ORDER BY score, similar_id DESC LIMIT 1
+                        )
+                    """, (other_id, other_id))
+
+    def _similarity_scores(self, cursor: sqlite3.Cursor, book_id: int, min_score: float) -> Dict[int, float]:
+        """Score other books against a book's stored terms (dot products over the term index)"""
+        cursor.execute("""
+            SELECT t.book_id, SUM(q.weight * t.weight) AS score
+            FROM book_terms q
+            JOIN book_terms t ON t.term = q.term AND t.book_id != q.book_id
+            WHERE q.book_id = ?
+            GROUP BY t.book_id
+            HAVING score >= ?
+        """, (book_id, min_score))
+        return {row['book_id']: row['score'] for row in cursor.fetchall()}
+
+    def _set_neighbours(self, cursor: sqlite3.Cursor, book_id: int, scores: Dict[int, float], size: int):
+        """Replace a book's neighbour list with its best-scoring books"""
+        best = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))[:size]
+        cursor.execute("DELETE FROM similar_books WHERE book_id = ?", (book_id,))
+        cursor.executemany(
+            "INSERT INTO similar_books (book_id, similar_id, score) VALUES (?, ?, ?)",
+            [(book_id, similar_id, score) for similar_id, score in best]
+        )
+
+    # ==================== MAINTENANCE ====================
+
+    def purge_deleted_books(self, deleted_before: str, batch_size: int = 500) -> int:
+        """
+        Permanently remove books deleted before the given ISO timestamp.
+
+        Books are removed in batches, each in its own transaction, and their
+        loans, notes and author links go with them.
+
+        Returns:
+            int: Number of books purged
+        """
+        purged = 0
+        while True:
+            with self.write() as cursor:
+                cursor.execute("""
+                    DELETE FROM books WHERE id IN (
+                        SELECT id FROM books
+                        WHERE deleted_at IS NOT NULL AND deleted_at < ?
+                        LIMIT ?
+                    )
+                """, (deleted_before, batch_size))
+            purged += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return purged
+
+    def clean_orphans(self) -> int:
+        """
+        Delete rows left pointing at books that no longer exist, and
+        authors and publishers no book refers to.
+
+        Such rows were left behind by deletes made before foreign keys
+        were enforced.
+
+        Returns:
+            int: Number of rows removed
+        """
+        statements = [
+            "DELETE FROM lending WHERE book_id NOT IN (SELECT id FROM books)",
+            "DELETE FROM notes WHERE book_id NOT IN (SELECT id FROM books)",
+            "DELETE FROM book_authors WHERE book_id NOT IN (SELECT id FROM books)",
+            "DELETE FROM book_trigrams WHERE book_id NOT IN (SELECT id FROM books)",
+            "DELETE FROM book_terms WHERE book_id NOT IN (SELECT id FROM books)",
+            """DELETE FROM similar_books WHERE book_id NOT IN (SELECT id FROM books)
+                   OR similar_id NOT IN (SELECT id FROM books)""",
+            "DELETE FROM authors WHERE id NOT IN (SELECT author_id FROM book_authors)",
+            """DELETE FROM publishers WHERE id NOT IN (
+                   SELECT publisher_id FROM books WHERE publisher_id IS NOT NULL)""",
+        ]
+        removed = 0
+        with self.write() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+                removed += cursor.rowcount
+        return removed
+
+    def get_file_size(self) -> int:
+        """Get the size of the database file in bytes, including free pages"""
+        cursor = self.conn.cursor()
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def compact(self, pages_per_step: int = COMPACT_PAGES):
+        """
+        Return free pages to the file system and refresh query planner statistics.
+
+        Free pages are released pages_per_step at a time, each step in its
+        own short transaction, so other writes get their turn in between.
+        Databases created before incremental auto-vacuum was enabled are
+        converted by one full VACUUM, which cannot be split; writes waiting
+        on it fail with DatabaseBusyError after the timeout instead of
+        blocking until it ends.
+        """
+        cursor = self.conn.cursor()
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            while True:
+                with self.write() as cursor:
+                    if not cursor.execute("PRAGMA freelist_count").fetchone()[0]:
+                        break
+                    # The pragma frees one page per step; fetchall() runs it to completion
+                    cursor.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+        else:
+            with self._holding_write_lock():
+                self.conn.commit()
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+
+        with self.write() as cursor:
+            # Sample indexes instead of reading them whole, to keep this step short
+            cursor.execute(f"PRAGMA analysis_limit = {int(ANALYSIS_LIMIT)}")
+            cursor.execute("ANALYZE")
+            cursor.execute("PRAGMA optimize")
 
     # ==================== STATISTICS ====================
 
@@ -330,7 +1466,7 @@ class Database:
         stats = {}
 
         # Total books
-        cursor.execute("SELECT COUNT(*) as count FROM books")
+        cursor.execute("SELECT COUNT(*) as count FROM books WHERE deleted_at IS NULL")
         stats['total_books'] = cursor.fetchone()['count']
 
         # Total categories
@@ -338,21 +1474,29 @@ class Database:
         stats['total_categories'] = cursor.fetchone()['count']
 
         # Currently borrowed
-        cursor.execute("SELECT COUNT(*) as count FROM lending WHERE status = 'borrowed'")
+        cursor.execute(f"""
+            SELECT COUNT(*) as count FROM lending
+            WHERE status = 'borrowed' AND book_id NOT IN {DELETED_BOOK_IDS}
+        """)
         stats['books_borrowed'] = cursor.fetchone()['count']
 
         # Average rating
-        cursor.execute("SELECT AVG(rating) as avg FROM books WHERE rating > 0")
+        cursor.execute("SELECT AVG(rating) as avg FROM books WHERE rating > 0 AND deleted_at IS NULL")
         result = cursor.fetchone()
         stats['average_rating'] = round(result['avg'], 2) if result['avg'] else 0
 
-        # Most read author
-        cursor.execute("""
-            SELECT author, COUNT(*) as count
-            FROM books
-            GROUP BY author
-            ORDER BY count DESC
-            LIMIT 1
+        # Most read author, counting each co-author of a book
+        cursor.execute(f"""
+            SELECT a.name as author, t.count
+            FROM (
+                SELECT author_id, COUNT(*) as count
+                FROM book_authors
+                WHERE book_id NOT IN {DELETED_BOOK_IDS}
+                GROUP BY author_id
+                ORDER BY count DESC
+                LIMIT 1
+            ) t
+            JOIN authors a ON a.id = t.author_id
         """)
         result = cursor.fetchone()
         stats['top_author'] = result['author'] if result else 'N/A'
@@ -362,8 +1506,198 @@ class Database:
         cursor.execute("""
             SELECT COUNT(*) as count
             FROM books
-            WHERE date_added >= date('now', '-30 days')
-        """)
+            WHERE IFNULL(date_added_epoch, 0) >= ? AND deleted_at IS NULL
+        """, (epoch_seconds(datetime.now(), days=-30),))
         stats['recent_additions'] = cursor.fetchone()['count']
 
         return stats
+
+    def get_table_version(self, *tables: str) -> Tuple[int, ...]:
+        """Get the change counters of the given tables (bumped on every write)"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT table_name, version FROM table_versions "
+            f"WHERE table_name IN ({', '.join('?' * len(tables))})",
+            tables
+        )
+        versions = {row['table_name']: row['version'] for row in cursor.fetchall()}
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def get_data_version(self) -> int:
+        """Get a counter that changes whenever another connection commits to the database"""
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+
+    def _cached_stat(self, key: str, tables: Tuple[str, ...], compute):
+        """Return a cached aggregate, recomputing it only when one of its tables changed"""
+        version = self.get_table_version(*tables)
+        cached = self._stats_cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        result = compute()
+        self._stats_cache[key] = (version, result)
+        return result
+
+    # ==================== LENDING ANALYTICS ====================
+
+    def get_borrower_leaderboard(self, limit: int = 10) -> List[Dict]:
+        """Get borrowers ranked by number of loans, with their active and overdue counts"""
+        today = date.today().isoformat()
+
+        def compute():
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                SELECT borrower_name,
+                       COUNT(*) as loan_count,
+                       SUM(status = 'borrowed') as active_count,
+                       SUM(status = 'borrowed' AND expected_return_date < ?) as overdue_count,
+                       RANK() OVER (ORDER BY COUNT(*) DESC) as rank
+                FROM lending
+                WHERE book_id NOT IN {DELETED_BOOK_IDS}
+                GROUP BY borrower_name
+                ORDER BY loan_count DESC, borrower_name
+                LIMIT ?
+            """, (today, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+        return self._cached_stat(f'borrower_leaderboard:{limit}:{today}', ('lending', 'books'), compute)
+
+    def get_loan_duration_stats(self) -> Dict:
+        """Get average, median, 90th percentile and longest loan durations in days"""
+        def compute():
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                WITH durations AS (
+                    SELECT julianday(actual_return_date) - julianday(lend_date) as days
+                    FROM lending
+                    WHERE status = 'returned' AND actual_return_date IS NOT NULL
+                    AND book_id NOT IN {DELETED_BOOK_IDS}
+                ),
+                ranked AS (
+                    SELECT days, CUME_DIST() OVER (ORDER BY days) as cume
+                    FROM durations
+                )
+                SELECT COUNT(*) as returned_count,
+                       AVG(days) as average_days,
+                       MIN(CASE WHEN cume >= 0.5 THEN days END) as median_days,
+                       MIN(CASE WHEN cume >= 0.9 THEN days END) as p90_days,
+                       MAX(days) as max_days
+                FROM ranked
+            """)
+            row = dict(cursor.fetchone())
+            for key in ('average_days', 'median_days', 'p90_days', 'max_days'):
+                row[key] = round(row[key], 1) if row[key] is not None else 0
+            return row
+
+        return self._cached_stat('loan_durations', ('lending', 'books'), compute)
+
+    def get_most_circulated_books(self, limit: int = 10) -> List[Dict]:
+        """Get the books lent out most often"""
+        def compute():
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT b.id, b.title, b.author, c.loan_count,
+                       DENSE_RANK() OVER (ORDER BY c.loan_count DESC) as rank
+                FROM (
+                    SELECT book_id, COUNT(*) as loan_count
+                    FROM lending
+                    GROUP BY book_id
+                ) c
+                JOIN books b ON b.id = c.book_id
+                WHERE b.deleted_at IS NULL
+                ORDER BY c.loan_count DESC, b.sort_title
+                LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+
+        return self._cached_stat(f'most_circulated:{limit}', ('lending', 'books'), compute)
+
+    def get_overdue_rate_by_month(self, months: int = 12) -> List[Dict]:
+        """
+        Get the share of loans with a due date that were returned late or are
+        still out past due, per month lent, with the cumulative rate to date.
+        """
+        today = date.today().isoformat()
+
+        def compute():
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                WITH monthly AS (
+                    SELECT strftime('%Y-%m', lend_date) as month,
+                           COUNT(*) as loan_count,
+                           SUM(CASE
+                               WHEN status = 'returned' THEN date(actual_return_date) > expected_return_date
+                               ELSE expected_return_date < ?
+                           END) as overdue_count
+                    FROM lending
+                    WHERE expected_return_date IS NOT NULL
+                    AND book_id NOT IN {DELETED_BOOK_IDS}
+                    GROUP BY month
+                )
+                SELECT month, loan_count, overdue_count,
+                       ROUND(100.0 * overdue_count / loan_count, 1) as overdue_rate,
+                       ROUND(100.0 * SUM(overdue_count) OVER (ORDER BY month)
+                             / SUM(loan_count) OVER (ORDER BY month), 1) as cumulative_rate
+                FROM monthly
+                ORDER BY month DESC
+                LIMIT ?
+            """, (today, months))
+            return [dict(row) for row in reversed(cursor.fetchall())]
+
+        return self._cached_stat(f'overdue_rate:{months}:{today}', ('lending', 'books'), compute)
+
+    # ==================== CHART SERIES ====================
+
+    def _monthly_counts(self, table: str, date_column: str, live: str) -> List[Tuple[str, int]]:
+        """Count live rows per month of a date column, including empty months in between"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            WITH RECURSIVE counts AS (
+                SELECT strftime('%Y-%m', {date_column}) as month, COUNT(*) as count
+                FROM {table}
+                WHERE {date_column} IS NOT NULL AND {live}
+                GROUP BY month
+            ),
+            months(month) AS (
+                SELECT MIN(month) FROM counts
+                UNION ALL
+                SELECT strftime('%Y-%m', month || '-01', '+1 month') FROM months
+                WHERE month < (SELECT MAX(month) FROM counts)
+            )
+            SELECT months.month, IFNULL(counts.count, 0) as count
+            FROM months
+            LEFT JOIN counts ON counts.month = months.month
+            WHERE months.month IS NOT NULL
+            ORDER BY months.month
+        """)
+        return [(row['month'], row['count']) for row in cursor.fetchall()]
+
+    def get_books_added_per_month(self) -> List[Tuple[str, int]]:
+        """Get (YYYY-MM, count) pairs of books added per month"""
+        return self._cached_stat(
+            'books_added_per_month', ('books',),
+            lambda: self._monthly_counts('books', 'date_added', "deleted_at IS NULL")
+        )
+
+    def get_loans_per_month(self) -> List[Tuple[str, int]]:
+        """Get (YYYY-MM, count) pairs of loans made per month"""
+        return self._cached_stat(
+            'loans_per_month', ('lending', 'books'),
+            lambda: self._monthly_counts('lending', 'lend_date', f"book_id NOT IN {DELETED_BOOK_IDS}")
+        )
+
+    def get_rating_distribution(self) -> List[Tuple[str, int]]:
+        """Get the number of books per star rating, 0 (unrated) to 5"""
+        def compute():
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT CAST(ROUND(IFNULL(rating, 0)) AS INTEGER) as stars, COUNT(*) as count
+                FROM books
+                WHERE deleted_at IS NULL
+                GROUP BY stars
+            """)
+            counts = {row['stars']: row['count'] for row in cursor.fetchall()}
+            return [(f"{stars}★", counts.get(stars, 0)) for stars in range(6)]
+
+        return self._cached_stat('rating_distribution', ('books',), compute)
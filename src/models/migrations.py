@@ -0,0 +1,658 @@
+"""
+Schema migrations for the BookKeeper database
+
+The schema version of a database file is kept in ``PRAGMA user_version``.
+Each migration upgrades it by one step, and databases already at the latest
+version skip all DDL on startup.
+
+Migrations must be idempotent: a step interrupted before its version is
+recorded runs again on the next start. Large data rewrites go through
+backfill(), which commits in small batches so other connections are never
+locked out for long.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+from .names import author_sort_key, get_or_create_name, link_book_authors, title_sort_key
+from .trigrams import index_book_trigrams
+
+# Rows updated per transaction by backfill()
+BATCH_SIZE = 500
+
+# Tables whose writes bump a counter in table_versions, used to invalidate caches
+VERSIONED_TABLES = ('books', 'categories', 'lending', 'notes')
+
+# Tables whose row changes are recorded in the changes log
+CHANGE_LOGGED_TABLES = ('books', 'lending', 'notes')
+
+# Columns derived from others in their row, left out of change records
+UNLOGGED_COLUMNS = {'books': ('sort_title', 'sort_author')}
+
+# Date columns with an integer <column>_epoch twin (seconds since 1970)
+EPOCH_COLUMNS = (('books', 'date_added'), ('books', 'purchase_date'), ('lending', 'lend_date'))
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """Run a block in a write transaction, rolling back on errors"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def backfill(conn: sqlite3.Connection, table: str, assignments: str, condition: str,
+             batch_size: int = BATCH_SIZE) -> int:
+    """
+    Update rows matching condition in batches, committing after each batch.
+
+    The assignments must make the condition false for updated rows,
+    otherwise the same rows would be picked up again.
+
+    Returns:
+        int: Number of rows updated
+    """
+    total = 0
+    while True:
+        with transaction(conn):
+            cursor = conn.execute(f"""
+                UPDATE {table} SET {assignments}
+                WHERE rowid IN (SELECT rowid FROM {table} WHERE {condition} LIMIT ?)
+            """, (batch_size,))
+        total += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return total
+
+
+def backfill_rows(conn: sqlite3.Connection, table: str, columns: str,
+                  process: Callable[[sqlite3.Connection, tuple], None],
+                  batch_size: int = BATCH_SIZE) -> int:
+    """
+    Run process(conn, row) for every row of a table in id order, committing in batches.
+
+    For rewrites that need Python, such as name normalization. Rows are
+    (id, *columns) tuples; process must be safe to repeat for a row.
+
+    Returns:
+        int: Number of rows processed
+    """
+    total, last_id = 0, 0
+    while True:
+        with transaction(conn):
+            rows = [tuple(row) for row in conn.execute(
+                f"SELECT id, {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )]
+            for row in rows:
+                process(conn, row)
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+        last_id = rows[-1][0]
+
+
+def has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """Check whether a table has a column, including generated columns"""
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_xinfo({table})"))
+
+
+def create_change_triggers(conn: sqlite3.Connection):
+    """
+    (Re)create the triggers recording row changes in the changes log.
+
+    Update triggers list the columns whose value changed, so they are
+    generated from the current table columns; migrations that add columns
+    to a logged table must call this again.
+    """
+    for table in CHANGE_LOGGED_TABLES:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")
+                   if row[1] not in UNLOGGED_COLUMNS.get(table, ())]
+        changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+        changed_list = " || ".join(
+            f"CASE WHEN OLD.{column} IS NOT NEW.{column} THEN '{column},' ELSE '' END"
+            for column in columns
+        )
+        operation = "'update'"
+        if table == 'books':
+            # Soft deletes and restores look like a delete and an insert downstream
+            operation = """CASE
+                WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL THEN 'delete'
+                WHEN OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL THEN 'insert'
+                ELSE 'update'
+            END"""
+
+        for event in ('insert', 'update', 'delete'):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_changes_{event}")
+        conn.execute(f"""
+            CREATE TRIGGER trg_{table}_changes_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO changes (table_name, row_id, operation)
+                VALUES ('{table}', NEW.id, 'insert');
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER trg_{table}_changes_update AFTER UPDATE ON {table}
+            WHEN {changed}
+            BEGIN
+                INSERT INTO changes (table_name, row_id, operation, changed_columns)
+                VALUES ('{table}', NEW.id, {operation}, rtrim({changed_list}, ','));
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER trg_{table}_changes_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO changes (table_name, row_id, operation)
+                VALUES ('{table}', OLD.id, 'delete');
+            END
+        """)
+
+
+# ==================== MIGRATION STEPS ====================
+
+def initial_schema(conn: sqlite3.Connection):
+    """Books, categories, lending and notes tables with the default categories"""
+    with transaction(conn):
+        # Books table with extended fields
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS books (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                isbn TEXT UNIQUE,
+                year INTEGER,
+                publisher TEXT,
+                pages INTEGER,
+                language TEXT DEFAULT 'English',
+                description TEXT,
+                rating REAL DEFAULT 0,
+                category_id INTEGER,
+                purchase_date TEXT,
+                purchase_price REAL,
+                purchase_store TEXT,
+                cover_image_path TEXT,
+                date_added TEXT DEFAULT CURRENT_TIMESTAMP,
+                last_modified TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (category_id) REFERENCES categories(id)
+            )
+        """)
+
+        # Categories table
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS categories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                description TEXT,
+                color TEXT DEFAULT '#3498db'
+            )
+        """)
+
+        # Lending table to track who borrowed books
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS lending (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                book_id INTEGER NOT NULL,
+                borrower_name TEXT NOT NULL,
+                borrower_contact TEXT,
+                lend_date TEXT NOT NULL,
+                expected_return_date TEXT,
+                actual_return_date TEXT,
+                notes TEXT,
+                status TEXT DEFAULT 'borrowed',
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Notes/Reviews table
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                book_id INTEGER NOT NULL,
+                note_text TEXT NOT NULL,
+                date_created TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+            )
+        """)
+
+        # Add some default categories
+        default_categories = [
+            ('Fiction', 'Fictional literature', '#e74c3c'),
+            ('Non-Fiction', 'Non-fictional works', '#3498db'),
+            ('Science', 'Scientific literature', '#2ecc71'),
+            ('Technology', 'Technology and computing', '#9b59b6'),
+            ('Biography', 'Biographies and memoirs', '#f39c12'),
+            ('History', 'Historical works', '#1abc9c'),
+            ('Self-Help', 'Self-improvement books', '#e67e22'),
+            ('Children', 'Children literature', '#f1c40f'),
+            ('Reference', 'Reference materials', '#34495e'),
+            ('Other', 'Miscellaneous', '#95a5a6')
+        ]
+        conn.executemany(
+            "INSERT OR IGNORE INTO categories (name, description, color) VALUES (?, ?, ?)",
+            default_categories
+        )
+
+
+def book_and_lending_indexes(conn: sqlite3.Connection):
+    """Indexes backing book filters, sort keys and lending queries"""
+    indexes = [
+        "CREATE INDEX IF NOT EXISTS idx_books_author ON books(author COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_books_year ON books(year)",
+        "CREATE INDEX IF NOT EXISTS idx_books_rating ON books(rating)",
+        "CREATE INDEX IF NOT EXISTS idx_books_language ON books(language COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_books_publisher ON books(publisher COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_books_price ON books(purchase_price)",
+        "CREATE INDEX IF NOT EXISTS idx_books_category ON books(category_id)",
+        "CREATE INDEX IF NOT EXISTS idx_lending_book_status ON lending(book_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_lending_due ON lending(expected_return_date) WHERE status = 'borrowed'",
+        "CREATE INDEX IF NOT EXISTS idx_lending_borrower ON lending(borrower_name)",
+        "CREATE INDEX IF NOT EXISTS idx_lending_status_date ON lending(status, lend_date)",
+        # Sort indexes, one per BOOK_SORT_KEYS expression with the id tiebreaker
+        "CREATE INDEX IF NOT EXISTS idx_books_title_sort ON books(title, id)",
+        "CREATE INDEX IF NOT EXISTS idx_books_author_sort ON books(author, id)",
+        "CREATE INDEX IF NOT EXISTS idx_books_year_sort ON books(IFNULL(year, 0), id)",
+        "CREATE INDEX IF NOT EXISTS idx_books_rating_sort ON books(IFNULL(rating, 0), id)",
+        "CREATE INDEX IF NOT EXISTS idx_books_added_sort ON books(IFNULL(date_added, ''), id)",
+    ]
+    with transaction(conn):
+        for statement in indexes:
+            conn.execute(statement)
+
+
+def normalize_due_dates(conn: sqlite3.Connection):
+    """Rewrite legacy free-text due dates as YYYY-MM-DD (empty strings become NULL)"""
+    backfill(
+        conn, 'lending',
+        "expected_return_date = date(expected_return_date)",
+        """expected_return_date = ''
+           OR (date(expected_return_date) IS NOT NULL
+               AND expected_return_date != date(expected_return_date))"""
+    )
+
+
+def table_versions(conn: sqlite3.Connection):
+    """Per-table change counters bumped by triggers on every write"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        for table in VERSIONED_TABLES:
+            conn.execute(
+                "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)",
+                (table,)
+            )
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1
+                        WHERE table_name = '{table}';
+                    END
+                """)
+
+
+def media_store(conn: sqlite3.Connection):
+    """Media blob table and triggers counting book references to each blob"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS media (
+                hash TEXT PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                size INTEGER NOT NULL,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                date_added TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_books_cover ON books(cover_image_path)")
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_books_media_insert
+            AFTER INSERT ON books WHEN NEW.cover_image_path IS NOT NULL
+            BEGIN
+                UPDATE media SET ref_count = ref_count + 1 WHERE path = NEW.cover_image_path;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_books_media_update
+            AFTER UPDATE OF cover_image_path ON books
+            WHEN OLD.cover_image_path IS NOT NEW.cover_image_path
+            BEGIN
+                UPDATE media SET ref_count = ref_count - 1 WHERE path = OLD.cover_image_path;
+                UPDATE media SET ref_count = ref_count + 1 WHERE path = NEW.cover_image_path;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_books_media_delete
+            AFTER DELETE ON books WHEN OLD.cover_image_path IS NOT NULL
+            BEGIN
+                UPDATE media SET ref_count = ref_count - 1 WHERE path = OLD.cover_image_path;
+            END
+        """)
+
+
+def notes_search(conn: sqlite3.Connection):
+    """Notes (book_id, date_created) index and FTS5 full-text index, when FTS5 is available"""
+    with transaction(conn):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_book_date ON notes(book_id, date_created)")
+
+    try:
+        with transaction(conn):
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts
+                USING fts5(note_text, content='notes', content_rowid='id')
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_notes_fts_insert AFTER INSERT ON notes
+                BEGIN
+                    INSERT INTO notes_fts (rowid, note_text) VALUES (NEW.id, NEW.note_text);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_notes_fts_delete AFTER DELETE ON notes
+                BEGIN
+                    INSERT INTO notes_fts (notes_fts, rowid, note_text) VALUES ('delete', OLD.id, OLD.note_text);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_notes_fts_update AFTER UPDATE OF note_text ON notes
+                BEGIN
+                    INSERT INTO notes_fts (notes_fts, rowid, note_text) VALUES ('delete', OLD.id, OLD.note_text);
+                    INSERT INTO notes_fts (rowid, note_text) VALUES (NEW.id, NEW.note_text);
+                END
+            """)
+            # Index existing notes; rebuild is safe to repeat if this step reruns
+            conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        if 'fts5' not in str(e):
+            raise
+        # SQLite built without FTS5: notes search falls back to LIKE
+
+
+def authors_and_publishers(conn: sqlite3.Connection):
+    """Normalized authors and publishers linked from books"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS authors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                name_key TEXT UNIQUE NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS publishers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                name_key TEXT UNIQUE NOT NULL
+            )
+        """)
+        # Co-authored books link to several authors, in credit order
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS book_authors (
+                book_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (book_id, author_id),
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE,
+                FOREIGN KEY (author_id) REFERENCES authors(id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_book_authors_author ON book_authors(author_id, book_id)")
+        if not has_column(conn, 'books', 'publisher_id'):
+            conn.execute("ALTER TABLE books ADD COLUMN publisher_id INTEGER REFERENCES publishers(id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_books_publisher_id ON books(publisher_id)")
+        # Author and publisher filters now go through the id columns
+        conn.execute("DROP INDEX IF EXISTS idx_books_author")
+        conn.execute("DROP INDEX IF EXISTS idx_books_publisher")
+
+    def link_names(conn: sqlite3.Connection, row: tuple):
+        book_id, author, publisher = row
+        link_book_authors(conn, book_id, author)
+        conn.execute("UPDATE books SET publisher_id = ? WHERE id = ?",
+                     (get_or_create_name(conn, 'publishers', publisher), book_id))
+
+    backfill_rows(conn, 'books', 'author, publisher', link_names)
+
+
+def soft_delete(conn: sqlite3.Connection):
+    """Tombstone column on books, with book indexes limited to live rows"""
+    partial_indexes = {
+        'idx_books_year': "books(year)",
+        'idx_books_rating': "books(rating)",
+        'idx_books_language': "books(language COLLATE NOCASE)",
+        'idx_books_price': "books(purchase_price)",
+        'idx_books_category': "books(category_id)",
+        'idx_books_publisher_id': "books(publisher_id)",
+        'idx_books_title_sort': "books(title, id)",
+        'idx_books_author_sort': "books(author, id)",
+        'idx_books_year_sort': "books(IFNULL(year, 0), id)",
+        'idx_books_rating_sort': "books(IFNULL(rating, 0), id)",
+        'idx_books_added_sort': "books(IFNULL(date_added, ''), id)",
+    }
+    with transaction(conn):
+        if not has_column(conn, 'books', 'deleted_at'):
+            conn.execute("ALTER TABLE books ADD COLUMN deleted_at TEXT")
+        for name, columns in partial_indexes.items():
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute(f"CREATE INDEX {name} ON {columns} WHERE deleted_at IS NULL")
+        # Tombstones are few, so this stays small; used to exclude and purge them
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_books_deleted ON books(deleted_at)
+            WHERE deleted_at IS NOT NULL
+        """)
+
+
+def change_log(conn: sqlite3.Connection):
+    """Append-only log of row changes to books, lending and notes"""
+    with transaction(conn):
+        # AUTOINCREMENT keeps sequence numbers increasing even after compaction
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                operation TEXT NOT NULL,
+                changed_columns TEXT,
+                changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_row ON changes(table_name, row_id, seq)")
+        create_change_triggers(conn)
+
+
+def export_watermarks(conn: sqlite3.Connection):
+    """Last change sequence number exported to each export destination"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS export_watermarks (
+                destination TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                exported_at TEXT NOT NULL
+            )
+        """)
+
+
+def epoch_dates(conn: sqlite3.Connection):
+    """Integer epoch-second columns for book and loan dates, indexed for range queries"""
+    # Free-text purchase dates become YYYY-MM-DD where they parse (empty strings become NULL)
+    backfill(
+        conn, 'books',
+        "purchase_date = date(purchase_date)",
+        """purchase_date = ''
+           OR (date(purchase_date) IS NOT NULL AND purchase_date != date(purchase_date))"""
+    )
+    with transaction(conn):
+        # Generated from the text column, so every writer keeps them current.
+        # Local wall-clock times are counted as if UTC; queries compute their
+        # bounds the same way (Database's epoch_seconds()).
+        for table, column in EPOCH_COLUMNS:
+            if not has_column(conn, table, f"{column}_epoch"):
+                conn.execute(f"""
+                    ALTER TABLE {table} ADD COLUMN {column}_epoch INTEGER
+                    GENERATED ALWAYS AS (CAST(strftime('%s', {column}) AS INTEGER)) VIRTUAL
+                """)
+        conn.execute("DROP INDEX IF EXISTS idx_books_added_sort")
+        conn.execute("""
+            CREATE INDEX idx_books_added_sort ON books(IFNULL(date_added_epoch, 0), id)
+            WHERE deleted_at IS NULL
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_books_purchased ON books(purchase_date_epoch)
+            WHERE deleted_at IS NULL
+        """)
+        conn.execute("DROP INDEX IF EXISTS idx_lending_status_date")
+        conn.execute("CREATE INDEX idx_lending_status_date ON lending(status, lend_date_epoch)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lending_lent ON lending(lend_date_epoch, id)")
+
+
+def fuzzy_search(conn: sqlite3.Connection):
+    """Trigram index over book titles and authors for typo-tolerant search"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS book_trigrams (
+                trigram TEXT NOT NULL,
+                book_id INTEGER NOT NULL,
+                PRIMARY KEY (trigram, book_id),
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_book_trigrams_book ON book_trigrams(book_id)")
+
+    def index_trigrams(conn: sqlite3.Connection, row: tuple):
+        book_id, title, author = row
+        index_book_trigrams(conn, book_id, title, author)
+
+    backfill_rows(conn, 'books', 'title, author', index_trigrams)
+
+
+def duplicate_queue(conn: sqlite3.Connection):
+    """Queue of likely duplicate books awaiting review"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS duplicate_candidates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                book_id INTEGER NOT NULL,
+                duplicate_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                reason TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                found_at TEXT NOT NULL,
+                UNIQUE (book_id, duplicate_id),
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE,
+                FOREIGN KEY (duplicate_id) REFERENCES books(id) ON DELETE CASCADE
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_status ON duplicate_candidates(status, score)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_duplicate ON duplicate_candidates(duplicate_id)")
+
+
+def similar_books(conn: sqlite3.Connection):
+    """Weighted book terms and the precomputed neighbours shown as similar books"""
+    with transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS book_terms (
+                book_id INTEGER NOT NULL,
+                term TEXT NOT NULL,
+                weight REAL NOT NULL,
+                PRIMARY KEY (book_id, term),
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_book_terms_term ON book_terms(term, book_id, weight)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS term_stats (
+                term TEXT PRIMARY KEY,
+                doc_count INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS similar_books (
+                book_id INTEGER NOT NULL,
+                similar_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (book_id, similar_id),
+                FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE,
+                FOREIGN KEY (similar_id) REFERENCES books(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_similar_books_similar ON similar_books(similar_id)")
+
+
+def sort_keys(conn: sqlite3.Connection):
+    """Folded title and author sort keys, kept up to date by Database on write"""
+    with transaction(conn):
+        for column in ('sort_title', 'sort_author'):
+            if not has_column(conn, 'books', column):
+                conn.execute(f"ALTER TABLE books ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+
+    def set_sort_keys(conn: sqlite3.Connection, row: tuple):
+        book_id, title, author = row
+        conn.execute(
+            "UPDATE books SET sort_title = ?, sort_author = ? WHERE id = ?",
+            (title_sort_key(title), author_sort_key(author), book_id)
+        )
+
+    backfill_rows(conn, 'books', 'title, author', set_sort_keys)
+
+    with transaction(conn):
+        for name, column in (('idx_books_title_sort', 'sort_title'), ('idx_books_author_sort', 'sort_author')):
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute(f"CREATE INDEX {name} ON books({column}, id) WHERE deleted_at IS NULL")
+
+
+# Ordered (version, step) pairs; append new steps with the next version number
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, initial_schema),
+    (2, book_and_lending_indexes),
+    (3, normalize_due_dates),
+    (4, table_versions),
+    (5, media_store),
+    (6, notes_search),
+    (7, authors_and_publishers),
+    (8, soft_delete),
+    (9, change_log),
+    (10, export_watermarks),
+    (11, epoch_dates),
+    (12, fuzzy_search),
+    (13, duplicate_queue),
+    (14, similar_books),
+    (15, sort_keys),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version recorded in the database file"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring a database up to the latest schema version.
+
+    Returns:
+        int: The schema version the database is now at
+    """
+    version = get_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+    if version == 0:
+        # Only takes effect on a new, empty file; lets maintenance free pages incrementally
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    for step_version, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+        step(conn)
+        # PRAGMA values cannot be bound as parameters
+        with transaction(conn):
+            conn.execute(f"PRAGMA user_version = {int(step_version)}")
+        version = step_version
+
+    return version
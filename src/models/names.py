@@ -0,0 +1,103 @@
+"""
+Author and publisher names for BookKeeper
+
+Books keep the author and publisher text as entered for display, and link
+to rows in the ``authors`` and ``publishers`` tables for filtering and
+aggregates. Names are matched on a key that ignores case and whitespace,
+and co-authors are split on ';' and '&' (e.g. "Good Omens" by
+"Terry Pratchett & Neil Gaiman").
+"""
+
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, List, Optional
+
+AUTHOR_SEPARATORS = re.compile(r"[;&]")
+
+# Words a title may start with that sorting skips, so "The Hobbit" sorts under H
+LEADING_ARTICLES = ('the', 'a', 'an')
+
+# Tables holding normalized names; both have (id, name, name_key) columns
+NAME_TABLES = ('authors', 'publishers')
+
+
+def clean_name(name: str) -> str:
+    """Trim a name and collapse runs of whitespace"""
+    return ' '.join(str(name).split())
+
+
+def name_key(name: str) -> str:
+    """Matching key for a name, ignoring case and whitespace differences"""
+    return clean_name(name).casefold()
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Text for matching and sorting: case-folded, accents removed, whitespace collapsed"""
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    return clean_name(''.join(char for char in decomposed if not unicodedata.combining(char))).casefold()
+
+
+def title_sort_key(title: Optional[str]) -> str:
+    """Sort key for a title: folded (see fold_text()), without leading punctuation or article"""
+    key = re.sub(r"^[\W_]+", "", fold_text(title))
+    article, _, rest = key.partition(' ')
+    return rest if article in LEADING_ARTICLES and rest else key
+
+
+def author_sort_key(author: Optional[str]) -> str:
+    """Sort key for an author credit: folded (see fold_text()), without leading punctuation"""
+    return re.sub(r"^[\W_]+", "", fold_text(author))
+
+
+def split_authors(text: Optional[str]) -> List[str]:
+    """Split an author credit into individual names, dropping blanks and repeats"""
+    names, seen = [], set()
+    for part in AUTHOR_SEPARATORS.split(text or ''):
+        name = clean_name(part)
+        if name and name_key(name) not in seen:
+            seen.add(name_key(name))
+            names.append(name)
+    return names
+
+
+def get_or_create_name(conn: sqlite3.Connection, table: str, name: Optional[str]) -> Optional[int]:
+    """Get the id of a name in authors/publishers, adding it if new; None for blank names"""
+    if table not in NAME_TABLES:
+        raise ValueError(f"Unknown name table: {table}")
+    name = clean_name(name or '')
+    if not name:
+        return None
+    key = name_key(name)
+    conn.execute(f"INSERT OR IGNORE INTO {table} (name, name_key) VALUES (?, ?)", (name, key))
+    return conn.execute(f"SELECT id FROM {table} WHERE name_key = ?", (key,)).fetchone()[0]
+
+
+def link_book_authors(conn: sqlite3.Connection, book_id: int, author_text: Optional[str]):
+    """Replace a book's author links with the names in its author credit"""
+    old_ids = [row[0] for row in conn.execute(
+        "SELECT author_id FROM book_authors WHERE book_id = ?", (book_id,)
+    )]
+    conn.execute("DELETE FROM book_authors WHERE book_id = ?", (book_id,))
+    for position, name in enumerate(split_authors(author_text)):
+        conn.execute(
+            "INSERT OR IGNORE INTO book_authors (book_id, author_id, position) VALUES (?, ?, ?)",
+            (book_id, get_or_create_name(conn, 'authors', name), position)
+        )
+    prune_authors(conn, old_ids)
+
+
+def prune_authors(conn: sqlite3.Connection, author_ids: Iterable[int]):
+    """Delete the given authors if no book links to them any more"""
+    conn.executemany("""
+        DELETE FROM authors WHERE id = ?
+        AND NOT EXISTS (SELECT 1 FROM book_authors WHERE author_id = authors.id)
+    """, [(author_id,) for author_id in author_ids])
+
+
+def prune_publishers(conn: sqlite3.Connection, publisher_ids: Iterable[int]):
+    """Delete the given publishers if no book refers to them any more"""
+    conn.executemany("""
+        DELETE FROM publishers WHERE id = ?
+        AND NOT EXISTS (SELECT 1 FROM books WHERE publisher_id = publishers.id)
+    """, [(publisher_id,) for publisher_id in publisher_ids if publisher_id is not None])
@@ -0,0 +1,36 @@
+"""
+Trigram index for fuzzy book search
+
+Each book's title and author are broken into trigrams (three-character
+slices of every word, padded at the edges like PostgreSQL's pg_trgm) and
+stored in ``book_trigrams``. A fuzzy query looks up its own trigrams
+there, so cost depends on how many books share them rather than on the
+catalog size, and books are ranked by the share of query trigrams they
+contain: "Gatsbi" still finds "The Great Gatsby".
+"""
+
+import re
+import sqlite3
+from typing import Optional, Set
+from .names import fold_text
+
+WORD = re.compile(r"\w+")
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """Get the distinct trigrams of the words in a text"""
+    grams = set()
+    for word in WORD.findall(fold_text(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def index_book_trigrams(conn: sqlite3.Connection, book_id: int, title: Optional[str],
+                        author: Optional[str]):
+    """Replace a book's trigrams with those of its title and author"""
+    conn.execute("DELETE FROM book_trigrams WHERE book_id = ?", (book_id,))
+    conn.executemany(
+        "INSERT INTO book_trigrams (trigram, book_id) VALUES (?, ?)",
+        [(gram, book_id) for gram in trigrams(f"{title or ''} {author or ''}")]
+    )
@@ -0,0 +1,47 @@
+"""
+External change detection for BookKeeper
+
+Polls ``PRAGMA data_version``, which only changes when another connection
+(another process, an import script, the API server) commits to the
+database, so idle polling costs one cheap pragma per interval.
+"""
+
+from typing import Callable, Optional
+from ..models.database import Database
+
+
+class ChangeMonitor:
+    """Calls back on the Tk main loop when another connection has modified the database"""
+
+    POLL_INTERVAL_MS = 2000
+
+    def __init__(self, db: Database, callback: Callable[[], None],
+                 interval_ms: int = POLL_INTERVAL_MS):
+        self.db = db
+        self.callback = callback
+        self.interval_ms = interval_ms
+        self.widget = None
+        self.job: Optional[str] = None
+        self.data_version = db.get_data_version()
+
+    def start(self, widget):
+        """Start polling on the Tk main loop of the given widget"""
+        self.widget = widget
+        self.job = self.widget.after(self.interval_ms, self.poll)
+
+    def stop(self):
+        """Stop polling"""
+        if self.job:
+            self.widget.after_cancel(self.job)
+            self.job = None
+
+    def poll(self):
+        """Check for external commits since the last poll"""
+        try:
+            version = self.db.get_data_version()
+            if version != self.data_version:
+                self.data_version = version
+                self.callback()
+        except Exception as e:
+            print(f"Error checking for database changes: {e}")
+        self.job = self.widget.after(self.interval_ms, self.poll)
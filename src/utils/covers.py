@@ -0,0 +1,132 @@
+"""
+Cover image loading for BookKeeper
+
+Covers are decoded and shrunk to thumbnails on worker threads, stored in an
+on-disk thumbnail cache keyed by source path and modification time, and kept
+as CTkImage objects in a bounded in-memory LRU.
+"""
+
+import hashlib
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import customtkinter as ctk
+from PIL import Image, ImageOps
+
+# Thumbnail sizes used by the views
+CARD_COVER_SIZE = (45, 68)
+DETAIL_COVER_SIZE = (200, 300)
+
+CoverCallback = Callable[[Optional[ctk.CTkImage]], None]
+
+
+class CoverCache:
+    """Asynchronous, cached loader of book cover thumbnails"""
+
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, cache_dir: str = "data/thumbnails", max_images: int = 200, workers: int = 2):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_images = max_images
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cover")
+        self.images: "OrderedDict[Tuple[str, Tuple[int, int]], Optional[ctk.CTkImage]]" = OrderedDict()
+        self.pending: Dict[Tuple[str, Tuple[int, int]], List[CoverCallback]] = {}
+        self.results: "queue.Queue[Tuple[Tuple[str, Tuple[int, int]], Optional[Image.Image]]]" = queue.Queue()
+        self.widget = None
+
+    def start(self, widget):
+        """Start delivering loaded covers on the Tk main loop of the given widget"""
+        self.widget = widget
+        self.widget.after(self.POLL_INTERVAL_MS, self.poll)
+
+    def close(self):
+        """Stop the worker threads, dropping queued loads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def request(self, path: str, size: Tuple[int, int], callback: CoverCallback):
+        """
+        Request the cover at path as a thumbnail of the given size.
+
+        The callback runs on the Tk main loop with the CTkImage, or with
+        None when the file is missing or not a readable image. Covers
+        already in memory are delivered immediately.
+        """
+        key = (os.path.abspath(path), tuple(size))
+        if key in self.images:
+            self.images.move_to_end(key)
+            callback(self.images[key])
+            return
+
+        if key in self.pending:
+            self.pending[key].append(callback)
+            return
+
+        self.pending[key] = [callback]
+        self.executor.submit(self._load, key)
+
+    def poll(self):
+        """Turn decoded thumbnails into CTkImages and run their callbacks (main thread)"""
+        try:
+            while True:
+                key, thumbnail = self.results.get_nowait()
+                image = None
+                if thumbnail is not None:
+                    image = ctk.CTkImage(light_image=thumbnail, dark_image=thumbnail, size=thumbnail.size)
+                self._remember(key, image)
+                for callback in self.pending.pop(key, []):
+                    try:
+                        callback(image)
+                    except Exception as e:
+                        print(f"Error showing cover '{key[0]}': {e}")
+        except queue.Empty:
+            pass
+
+        if self.widget is not None:
+            self.widget.after(self.POLL_INTERVAL_MS, self.poll)
+
+    def _remember(self, key: Tuple[str, Tuple[int, int]], image: Optional[ctk.CTkImage]):
+        """Add an image to the LRU, evicting the least recently used beyond max_images"""
+        self.images[key] = image
+        self.images.move_to_end(key)
+        while len(self.images) > self.max_images:
+            self.images.popitem(last=False)
+
+    def _load(self, key: Tuple[str, Tuple[int, int]]):
+        """Load a thumbnail from the disk cache or decode the source (worker thread)"""
+        path, size = key
+        try:
+            self.results.put((key, self._load_thumbnail(path, size)))
+        except Exception as e:
+            print(f"Error loading cover '{path}': {e}")
+            self.results.put((key, None))
+
+    def _load_thumbnail(self, path: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+        """Get the thumbnail for path, creating the cached copy if needed"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        digest = hashlib.sha1(f"{path}:{stat.st_mtime_ns}:{stat.st_size}:{size}".encode()).hexdigest()
+        cached = self.cache_dir / f"{digest}.png"
+        if cached.exists():
+            with Image.open(cached) as image:
+                image.load()
+                return image.copy()
+
+        with Image.open(path) as image:
+            # Let JPEG decode at reduced scale instead of full resolution
+            image.draft("RGB", size)
+            thumbnail = ImageOps.exif_transpose(image).convert("RGBA")
+        thumbnail.thumbnail(size)
+
+        # Write atomically so a concurrent reader never sees a partial file
+        temp = cached.with_suffix(f".{os.getpid()}.tmp")
+        thumbnail.save(temp, format="PNG")
+        os.replace(temp, cached)
+        return thumbnail
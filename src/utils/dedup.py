@@ -0,0 +1,196 @@
+"""
+Duplicate book detection for BookKeeper
+
+Comparing every pair of books is quadratic, so books are first grouped into
+blocks that share a cheap key: the normalized ISBN, the sorted title words,
+or the first author's surname. Only books within a block are scored
+against each other, and pairs scoring above a threshold go to the
+``duplicate_candidates`` merge queue for review. Large catalogs are scored
+on a process pool.
+"""
+
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from ..models.database import Database
+from ..models.names import fold_text, split_authors
+from ..models.trigrams import trigrams
+
+# Pairs scoring at least this are queued for review
+DUPLICATE_THRESHOLD = 0.8
+
+# Blocks larger than this are not scored (e.g. a surname shared by hundreds
+# of books); their books still meet in their ISBN and title blocks
+MAX_BLOCK_SIZE = 200
+
+# Catalogs with more books than this are scored on a process pool; below it,
+# sending blocks to workers costs more than scoring them
+PARALLEL_MIN_BOOKS = 50000
+
+# Blocks sent to a worker process at a time
+BLOCKS_PER_TASK = 500
+
+# Words left out of title keys, so "Great Gatsby, The" matches "The Great Gatsby"
+TITLE_STOPWORDS = {'the', 'a', 'an'}
+
+WORD = re.compile(r"\w+")
+
+# A candidate pair: (book id, duplicate book id, score, reason)
+Candidate = Tuple[int, int, float, str]
+
+
+def normalize_isbn(isbn: Optional[str]) -> Optional[str]:
+    """Get the ISBN-13 form of an ISBN-10 or ISBN-13 in any formatting, None if invalid"""
+    digits = re.sub(r"[^0-9Xx]", "", isbn or '').upper()
+    if len(digits) == 10 and digits[:9].isdigit():
+        core = "978" + digits[:9]
+    elif len(digits) == 13 and digits.isdigit():
+        return digits
+    else:
+        return None
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(core)) % 10) % 10
+    return core + str(check)
+
+
+def title_words(title: Optional[str]) -> List[str]:
+    """Folded title words without articles"""
+    return [word for word in WORD.findall(fold_text(title)) if word not in TITLE_STOPWORDS]
+
+
+def author_surname(author: Optional[str]) -> Optional[str]:
+    """Folded surname of the first credited author ("Fitzgerald, F. Scott" or "F. Scott Fitzgerald")"""
+    names = split_authors(author)
+    if not names:
+        return None
+    name = names[0]
+    words = WORD.findall(fold_text(name.split(',')[0] if ',' in name else name))
+    if not words:
+        return None
+    return words[0] if ',' in name else words[-1]
+
+
+def prepare_book(book: Dict) -> Dict:
+    """Compute the normalized fields blocking and scoring use, once per book"""
+    words = title_words(book.get('title'))
+    return {
+        'id': book['id'],
+        'year': book.get('year'),
+        'isbn13': normalize_isbn(book.get('isbn')),
+        'title_key': ' '.join(sorted(set(words))),
+        'title_grams': trigrams(' '.join(words)),
+        'author_grams': trigrams(book.get('author')),
+        'surname': author_surname(book.get('author')),
+    }
+
+
+def blocking_keys(book: Dict) -> Set[Tuple[str, str]]:
+    """Keys of the blocks a prepared book is compared within"""
+    keys = set()
+    if book['isbn13']:
+        keys.add(('isbn', book['isbn13']))
+    if book['title_key']:
+        keys.add(('title', book['title_key']))
+    if book['surname']:
+        keys.add(('surname', book['surname']))
+    return keys
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    """Share of trigrams two sets have in common"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def score_pair(a: Dict, b: Dict) -> Tuple[float, str]:
+    """
+    Score how likely two prepared books (see prepare_book()) are the same, between 0 and 1.
+
+    Returns:
+        Tuple[float, str]: The score and a short reason for reviewers
+    """
+    if a['isbn13'] and b['isbn13']:
+        if a['isbn13'] == b['isbn13']:
+            return 1.0, "Same ISBN"
+        # Different ISBNs are different editions at least
+        return 0.0, "Different ISBNs"
+
+    title = _jaccard(a['title_grams'], b['title_grams'])
+    author = _jaccard(a['author_grams'], b['author_grams'])
+    year_a, year_b = a['year'], b['year']
+    year = 1.0 if not year_a or not year_b or year_a == year_b else 0.0
+
+    score = round(0.6 * title + 0.3 * author + 0.1 * year, 3)
+    return score, f"Title {title:.0%} alike, author {author:.0%} alike"
+
+
+def _score_blocks(blocks: List[List[Dict]], threshold: float) -> List[Candidate]:
+    """Score all pairs within each block (runs in worker processes for large catalogs)"""
+    found = []
+    for block in blocks:
+        for a, b in combinations(sorted(block, key=lambda book: book['id']), 2):
+            score, reason = score_pair(a, b)
+            if score >= threshold:
+                found.append((a['id'], b['id'], score, reason))
+    return found
+
+
+def build_blocks(books: Iterable[Dict]) -> List[List[Dict]]:
+    """Group prepared books by blocking key, keeping blocks with two to MAX_BLOCK_SIZE books"""
+    blocks: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+    for book in books:
+        for key in blocking_keys(book):
+            blocks[key].append(book)
+    return [block for block in blocks.values() if 1 < len(block) <= MAX_BLOCK_SIZE]
+
+
+def find_duplicates(db: Database, threshold: float = DUPLICATE_THRESHOLD,
+                    workers: Optional[int] = None) -> List[Candidate]:
+    """
+    Find likely duplicate books in the catalog.
+
+    Args:
+        db: Database to scan
+        threshold: Minimum score of a reported pair
+        workers: Worker processes for scoring; by default a pool is used
+            only for catalogs over PARALLEL_MIN_BOOKS books
+
+    Returns:
+        List[Candidate]: Pairs (older id first), best scores first
+    """
+    books = [prepare_book(book) for book in db.get_all_books()]
+    blocks = build_blocks(books)
+
+    if workers is None:
+        workers = os.cpu_count() if len(books) > PARALLEL_MIN_BOOKS else 1
+    if workers > 1 and len(blocks) > BLOCKS_PER_TASK:
+        tasks = [blocks[i:i + BLOCKS_PER_TASK] for i in range(0, len(blocks), BLOCKS_PER_TASK)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_score_blocks, tasks, [threshold] * len(tasks))
+            found = [candidate for result in results for candidate in result]
+    else:
+        found = _score_blocks(blocks, threshold)
+
+    # A pair sharing several blocks is scored once per block
+    best: Dict[Tuple[int, int], Candidate] = {}
+    for candidate in found:
+        best[candidate[:2]] = candidate
+    return sorted(best.values(), key=lambda candidate: (-candidate[2], candidate[0], candidate[1]))
+
+
+def scan_duplicates(db_path: str, threshold: float = DUPLICATE_THRESHOLD) -> Dict[str, int]:
+    """
+    Find duplicates in the database at db_path and add new ones to the merge queue.
+
+    Returns:
+        Dict[str, int]: Pairs found and pairs newly queued
+    """
+    db = Database(db_path)
+    try:
+        candidates = find_duplicates(db, threshold)
+        return {'found': len(candidates), 'queued': db.add_duplicate_candidates(candidates)}
+    finally:
+        db.close()
@@ -4,15 +4,62 @@ Export and Import utilities for BookKeeper
 
 import csv
 import json
-import shutil
+import re
+import sqlite3
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Optional, TextIO, Tuple
 from ..models.database import Database
+from .media_store import MediaStore, STORE_DIR, sync_blobs
 
+# Books inserted per transaction by the JSON importers
+IMPORT_BATCH_SIZE = 500
 
-def export_books_to_csv(db: Database, filepath: str = None) -> str:
-    """Export all books to CSV file"""
+# Characters read at a time when streaming a JSON export
+READ_CHUNK_SIZE = 64 * 1024
+
+# File extensions imported as one JSON object per line
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+
+# Characters a JSON number may contain; a number is complete once another follows
+NUMBER_CHARS = re.compile(r"[-+0-9.eE]*")
+
+# Bare words the JSON decoder accepts; a prefix of one at the end of the buffer may be cut off
+JSON_LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+
+
+def collect_export(db: Database, destination: Optional[str] = None,
+                   full: bool = False) -> Tuple[List[Dict], Optional[List[int]], Optional[int], int]:
+    """
+    Get the books to export, incrementally when a destination is given.
+
+    A destination exports only books inserted, updated or deleted since its
+    last export. Its first export, or one with full=True, is a full
+    snapshot that later incremental exports continue from.
+
+    Returns:
+        Tuple: Books to write, ids of deleted books (None for full
+        snapshots), the watermark exported from (None for full snapshots)
+        and the watermark to record once the export is written
+    """
+    if destination is None:
+        books, _, seq = db.get_book_changes(None)
+        return books, None, None, seq
+    since = None if full else db.get_export_watermark(destination)
+    books, deleted_ids, seq = db.get_book_changes(since)
+    return books, (deleted_ids if since is not None else None), since, seq
+
+
+def export_books_to_csv(db: Database, filepath: str = None, destination: Optional[str] = None,
+                        full: bool = False) -> str:
+    """
+    Export books to CSV file.
+
+    Without a destination all books are exported. With one, only books
+    changed since that destination's last export are written, and ids of
+    deleted books go to a ``<name>_deleted.csv`` file next to it.
+    """
     if not filepath:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = f"exports/books_export_{timestamp}.csv"
@@ -20,7 +67,7 @@ def export_books_to_csv(db: Database, filepath: str = None) -> str:
     # Create exports directory if it doesn't exist
     Path(filepath).parent.mkdir(parents=True, exist_ok=True)
 
-    books = db.get_all_books()
+    books, deleted_ids, _, seq = collect_export(db, destination, full)
 
     # Define CSV columns
     fieldnames = [
@@ -29,13 +76,6 @@ def export_books_to_csv(db: Database, filepath: str = None) -> str:
         'purchase_date', 'purchase_price', 'purchase_store', 'date_added'
     ]
 
-    if not books:
-        # Create empty file with headers only
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-        return filepath
-
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
@@ -45,6 +85,16 @@ def export_books_to_csv(db: Database, filepath: str = None) -> str:
             row = {key: book.get(key, '') for key in fieldnames}
             writer.writerow(row)
 
+    if deleted_ids is not None:
+        deleted_path = Path(filepath).with_name(f"{Path(filepath).stem}_deleted.csv")
+        with open(deleted_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['id'])
+            writer.writerows([book_id] for book_id in deleted_ids)
+
+    if destination is not None:
+        db.set_export_watermark(destination, seq)
+
     return filepath
 
 
@@ -99,8 +149,15 @@ def import_books_from_csv(db: Database, filepath: str) -> int:
     return imported_count
 
 
-def export_books_to_json(db: Database, filepath: str = None) -> str:
-    """Export all books to JSON file"""
+def export_books_to_json(db: Database, filepath: str = None, destination: Optional[str] = None,
+                         full: bool = False) -> str:
+    """
+    Export books to JSON file.
+
+    Without a destination all books are exported. With one, only books
+    changed since that destination's last export are written, along with
+    ``deleted_ids``; ``mode`` tells a full snapshot from an incremental one.
+    """
     if not filepath:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = f"exports/books_export_{timestamp}.json"
@@ -108,10 +165,7 @@ def export_books_to_json(db: Database, filepath: str = None) -> str:
     # Create exports directory if it doesn't exist
     Path(filepath).parent.mkdir(parents=True, exist_ok=True)
 
-    books = db.get_all_books()
-
-    if not books:
-        books = []  # Export empty array instead of raising error
+    books, deleted_ids, since, seq = collect_export(db, destination, full)
 
     # Convert to JSON-serializable format
     export_data = {
@@ -119,67 +173,236 @@ def export_books_to_json(db: Database, filepath: str = None) -> str:
         'total_books': len(books),
         'books': books
     }
+    if destination is not None:
+        export_data.update({
+            'destination': destination,
+            'mode': 'full' if deleted_ids is None else 'incremental',
+            'since_seq': since,
+            'until_seq': seq,
+            'deleted_ids': deleted_ids or [],
+        })
 
     with open(filepath, 'w', encoding='utf-8') as jsonfile:
         json.dump(export_data, jsonfile, indent=2, ensure_ascii=False)
 
+    if destination is not None:
+        db.set_export_watermark(destination, seq)
+
     return filepath
 
 
-def import_books_from_json(db: Database, filepath: str) -> int:
-    """Import books from JSON file"""
-    if not Path(filepath).exists():
-        raise FileNotFoundError(f"File not found: {filepath}")
+def iter_json_lines(jsonfile: TextIO) -> Iterator[Dict]:
+    """Decode a JSON Lines file one line at a time, skipping blank lines"""
+    for line_number, line in enumerate(jsonfile, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+        if isinstance(record, dict):
+            yield record
+
+
+class _JSONStream:
+    """Incremental reader of JSON values from a text file, one chunk in memory at a time"""
+
+    def __init__(self, jsonfile: TextIO, chunk_size: int = READ_CHUNK_SIZE):
+        self.file = jsonfile
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Read another chunk, dropping the consumed part of the buffer; False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of file)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        """Consume the next character, which must be one of chars"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid JSON: expected one of {chars!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def _incomplete(self, error: json.JSONDecodeError) -> bool:
+        """Whether a decoding error comes from the value being cut off at the end of the buffer"""
+        rest = self.buffer[error.pos:]
+        if error.msg.startswith('Unterminated string') or NUMBER_CHARS.fullmatch(rest):
+            return True
+        if error.msg.startswith('Invalid \\uXXXX'):
+            # Also raised for a whole escape that ends the buffer
+            return len(rest) <= 5
+        return error.msg == 'Expecting value' and any(
+            literal.startswith(rest) and literal != rest for literal in JSON_LITERALS)
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as error:
+                # Read more only while the value runs past the buffer; bad JSON fails at once
+                if not self._incomplete(error) or not self._fill():
+                    raise
+                continue
+            # A number running to the end of the buffer (e.g. "1." or "1.5e")
+            # may continue in the next chunk, even where a prefix already decoded
+            if NUMBER_CHARS.match(self.buffer, self.pos).end() == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(jsonfile: TextIO, key: str = 'books',
+                    chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Decode the objects of one array in a top-level JSON object, one at a time.
+
+    Reads a file shaped like export_books_to_json() output, e.g.
+    ``{"export_date": ..., "books": [{...}, ...]}``, without loading it
+    whole: only the current chunk and the current object are in memory.
+    Other keys are decoded and skipped.
+    """
+    stream = _JSONStream(jsonfile, chunk_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        name = stream.value()
+        stream.expect(':')
+        if name == key:
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.expect(']')
+            else:
+                while True:
+                    record = stream.value()
+                    if isinstance(record, dict):
+                        yield record
+                    if stream.expect(',]') == ']':
+                        break
+        else:
+            stream.value()
+        if stream.expect(',}') == '}':
+            return
 
-    with open(filepath, 'r', encoding='utf-8') as jsonfile:
-        data = json.load(jsonfile)
 
-    books = data.get('books', [])
+def import_book_records(db: Database, records: Iterable[Dict],
+                        batch_size: int = IMPORT_BATCH_SIZE) -> int:
+    """
+    Import books from decoded export records, batch_size books per transaction.
+
+    Records missing a title or author are skipped, and a record that fails
+    to insert is rolled back on its own without losing the rest of its batch.
+
+    Returns:
+        int: Number of books imported
+    """
+    category_ids = {cat['name']: cat['id'] for cat in db.get_all_categories()}
     imported_count = 0
+    records = iter(records)
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return imported_count
+
+        with db.write() as cursor:
+            for book in batch:
+                # Skip if title or author is missing
+                if not book.get('title') or not book.get('author'):
+                    continue
+
+                # Prepare book data (excluding ID and timestamps)
+                book_data = {
+                    'title': book['title'],
+                    'author': book['author'],
+                    'isbn': book.get('isbn'),
+                    'year': book.get('year'),
+                    'publisher': book.get('publisher'),
+                    'pages': book.get('pages'),
+                    'language': book.get('language', 'English'),
+                    'description': book.get('description'),
+                    'rating': book.get('rating', 0),
+                    'category_id': category_ids.get(book.get('category_name')),
+                    'purchase_date': book.get('purchase_date'),
+                    'purchase_price': book.get('purchase_price'),
+                    'purchase_store': book.get('purchase_store'),
+                }
+
+                cursor.execute("SAVEPOINT import_book")
+                try:
+                    db.add_book(**book_data)
+                    imported_count += 1
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO import_book")
+                    print(f"Error importing book '{book.get('title', 'Unknown')}': {e}")
+                cursor.execute("RELEASE import_book")
 
-    for book in books:
-        # Skip if title or author is missing
-        if not book.get('title') or not book.get('author'):
-            continue
 
-        # Get category ID from category name
-        category_id = None
-        if book.get('category_name'):
-            categories = db.get_all_categories()
-            for cat in categories:
-                if cat['name'] == book['category_name']:
-                    category_id = cat['id']
-                    break
-
-        # Prepare book data (excluding ID and timestamps)
-        book_data = {
-            'title': book['title'],
-            'author': book['author'],
-            'isbn': book.get('isbn'),
-            'year': book.get('year'),
-            'publisher': book.get('publisher'),
-            'pages': book.get('pages'),
-            'language': book.get('language', 'English'),
-            'description': book.get('description'),
-            'rating': book.get('rating', 0),
-            'category_id': category_id,
-            'purchase_date': book.get('purchase_date'),
-            'purchase_price': book.get('purchase_price'),
-            'purchase_store': book.get('purchase_store'),
-        }
+def import_books_from_json(db: Database, filepath: str) -> int:
+    """
+    Import books from a JSON export or a JSON Lines file.
+
+    Files ending in .jsonl or .ndjson hold one book per line; any other
+    file is read as a ``{"books": [...]}`` export. Both are streamed, so
+    memory use does not grow with the file size.
+    """
+    if not Path(filepath).exists():
+        raise FileNotFoundError(f"File not found: {filepath}")
 
+    with open(filepath, 'r', encoding='utf-8') as jsonfile:
+        if Path(filepath).suffix.lower() in JSON_LINES_SUFFIXES:
+            records = iter_json_lines(jsonfile)
+        else:
+            records = iter_json_array(jsonfile, 'books')
+        return import_book_records(db, records)
+
+
+def copy_database(source_path: str, target_path: str):
+    """
+    Copy a database through SQLite's online backup, as one consistent snapshot.
+
+    Unlike copying the file, this includes commits still in a write-ahead
+    log and is safe while other connections are writing.
+    """
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(target_path)
         try:
-            db.add_book(**book_data)
-            imported_count += 1
-        except Exception as e:
-            print(f"Error importing book '{book.get('title', 'Unknown')}': {e}")
-            continue
-
-    return imported_count
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
 
 
 def backup_database(db: Database, backup_dir: str = "backups") -> str:
-    """Create a backup of the database"""
+    """
+    Create a backup of the database and its media store.
+
+    Media blobs are shared by all backups in backup_dir and only new ones
+    are copied, so repeated backups stay cheap.
+    """
     # Create backups directory if it doesn't exist
     Path(backup_dir).mkdir(parents=True, exist_ok=True)
 
@@ -187,8 +410,10 @@ def backup_database(db: Database, backup_dir: str = "backups") -> str:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_path = Path(backup_dir) / f"bookkeeper_backup_{timestamp}.db"
 
-    # Copy the database file
-    shutil.copy2(db.db_path, backup_path)
+    copy_database(db.db_path, str(backup_path))
+
+    # Add covers not yet in the backup's media store
+    MediaStore(db).sync_to(Path(backup_dir) / STORE_DIR)
 
     return str(backup_path)
 
@@ -202,9 +427,12 @@ def restore_database(backup_path: str, db_path: str = "data/bookkeeper.db") -> b
     if Path(db_path).exists():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         safety_backup = f"{db_path}.before_restore_{timestamp}.bak"
-        shutil.copy2(db_path, safety_backup)
+        copy_database(db_path, safety_backup)
 
     # Restore from backup
-    shutil.copy2(backup_path, db_path)
+    copy_database(backup_path, db_path)
+
+    # Bring back covers the restored database references
+    sync_blobs(Path(backup_path).parent / STORE_DIR, Path(db_path).parent / STORE_DIR)
 
     return True
@@ -0,0 +1,114 @@
+"""
+Database maintenance for BookKeeper
+
+Purges deleted books once their undo window has passed, removes orphaned
+rows and unused covers, moves covers saved before the media store existed
+into it, and compacts the database file. The work runs on a background
+thread with its own connection, so the window stays responsive.
+"""
+
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from ..models.database import Database
+from .media_store import MediaStore
+
+# How long deleted books can still be restored
+UNDO_WINDOW = timedelta(days=7)
+
+# How long the change log keeps every change; older history is compacted
+# to the latest change per row
+CHANGE_RETENTION = timedelta(days=30)
+
+JobCallback = Callable[[Optional[Dict[str, int]], Optional[Exception]], None]
+
+
+def run_maintenance(db_path: str, undo_window: timedelta = UNDO_WINDOW) -> Dict[str, int]:
+    """
+    Run all maintenance tasks on the database at db_path.
+
+    Returns:
+        Dict[str, int]: Books purged, orphaned rows removed, books moved to
+        the media store, covers and change log entries removed, and bytes
+        reclaimed from the database file and the media store
+    """
+    db = Database(db_path)
+    try:
+        size_before = db.get_file_size()
+        cutoff = (datetime.now() - undo_window).isoformat()
+        purged = db.purge_deleted_books(cutoff)
+        orphans = db.clean_orphans()
+        media = MediaStore(db)
+        covers_imported = media.import_external_covers()
+        covers_removed, cover_bytes = media.collect_garbage()
+        horizon = (datetime.now() - CHANGE_RETENTION).isoformat()
+        changes_compacted = db.compact_changes(db.get_change_seq(before=horizon))
+        db.compact()
+        return {
+            'books_purged': purged,
+            'orphans_removed': orphans,
+            'covers_imported': covers_imported,
+            'covers_removed': covers_removed,
+            'changes_compacted': changes_compacted,
+            'database_bytes_reclaimed': max(size_before - db.get_file_size(), 0),
+            'cover_bytes_reclaimed': cover_bytes,
+        }
+    finally:
+        db.close()
+
+
+class BackgroundJob:
+    """Runs a task returning a report dict on a worker thread and reports back on the Tk main loop"""
+
+    POLL_INTERVAL_MS = 200
+
+    def __init__(self, task: Callable[[], Dict[str, int]], name: str = "background-job"):
+        self.task = task
+        self.name = name
+        self.thread: Optional[threading.Thread] = None
+        self.results: "queue.Queue[tuple]" = queue.Queue()
+
+    @property
+    def running(self) -> bool:
+        """Whether a run is in progress"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, widget, callback: JobCallback) -> bool:
+        """
+        Start a run of the task; callback gets (report, None) or (None, error).
+
+        Returns:
+            bool: False if a run is already in progress
+        """
+        if self.running:
+            return False
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        widget.after(self.POLL_INTERVAL_MS, self._poll, widget, callback)
+        return True
+
+    def _run(self):
+        """Run the task and queue the outcome (worker thread)"""
+        try:
+            self.results.put((self.task(), None))
+        except Exception as e:
+            self.results.put((None, e))
+
+    def _poll(self, widget, callback: JobCallback):
+        """Deliver the outcome once the worker has finished (main thread)"""
+        try:
+            report, error = self.results.get_nowait()
+        except queue.Empty:
+            widget.after(self.POLL_INTERVAL_MS, self._poll, widget, callback)
+            return
+        callback(report, error)
+
+
+class MaintenanceJob(BackgroundJob):
+    """Runs run_maintenance() in the background"""
+
+    def __init__(self, db_path: str, undo_window: timedelta = UNDO_WINDOW):
+        super().__init__(lambda: run_maintenance(db_path, undo_window), name="maintenance")
+        self.db_path = db_path
+        self.undo_window = undo_window
@@ -0,0 +1,203 @@
+"""
+Content-addressed media store for BookKeeper
+
+Cover images are copied into a ``media`` directory next to the database,
+named by the SHA-256 of their content and sharded into two directory levels
+(``media/ab/cd/abcd....jpg``). Identical files are stored once; the ``media``
+table tracks how many books reference each blob.
+"""
+
+import hashlib
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Tuple
+from ..models.database import Database
+
+STORE_DIR = "media"
+CHUNK_SIZE = 1024 * 1024
+
+
+def copy_file(src: str, dst: str):
+    """Copy a file using in-kernel copying (copy_file_range/sendfile) where available"""
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        if _copy_in_kernel(fsrc.fileno(), fdst.fileno(), size):
+            return
+        fdst.seek(0)
+        fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+
+
+def _copy_in_kernel(src_fd: int, dst_fd: int, size: int) -> bool:
+    """Copy size bytes without a user-space buffer; False if the platform can't"""
+    methods = []
+    if hasattr(os, 'copy_file_range'):
+        methods.append(lambda offset, count: os.copy_file_range(
+            src_fd, dst_fd, count, offset_src=offset, offset_dst=offset))
+    if hasattr(os, 'sendfile'):
+        methods.append(lambda offset, count: os.sendfile(dst_fd, src_fd, offset, count))
+
+    for copy in methods:
+        offset = 0
+        try:
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            while offset < size:
+                copied = copy(offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            # Not supported for these files (e.g. across file systems on older kernels)
+            continue
+        if offset == size:
+            return True
+    return False
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_blobs(root: Path) -> Iterator[Tuple[str, Path]]:
+    """Yield (store path, file path) for every blob file under a store root"""
+    root = Path(root)
+    if not root.exists():
+        return
+    for file in root.glob("*/*/*"):
+        if file.is_file() and not file.name.endswith('.tmp'):
+            yield f"{STORE_DIR}/{file.relative_to(root).as_posix()}", file
+
+
+def sync_blobs(source_root: Path, target_root: Path) -> int:
+    """
+    Copy blobs missing from one store root into another (e.g. a backup's media directory).
+
+    Blobs are immutable and named by content, so existing files are never
+    copied again and each sync only transfers new covers.
+
+    Returns:
+        int: Number of blobs copied
+    """
+    source_root, target_root = Path(source_root), Path(target_root)
+    copied = 0
+    for _, file in iter_blobs(source_root):
+        target = target_root / file.relative_to(source_root)
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        copy_file(str(file), str(temp))
+        os.replace(temp, target)
+        copied += 1
+    return copied
+
+
+class MediaStore:
+    """Deduplicating, reference-counted file store kept next to the database"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.base_dir = Path(db.db_path).parent
+        self.root = self.base_dir / STORE_DIR
+
+    def is_stored(self, path: str) -> bool:
+        """Check whether a path refers to a blob in this store"""
+        return bool(path) and path.startswith(f"{STORE_DIR}/")
+
+    def resolve(self, path: str) -> str:
+        """Get the file system path for a stored blob or an external file"""
+        if self.is_stored(path):
+            return str(self.base_dir / path)
+        return path
+
+    def add_file(self, source: str) -> str:
+        """
+        Copy a file into the store unless identical content is already there.
+
+        Returns:
+            str: Store path to save in the database (e.g. media/ab/cd/<hash>.jpg)
+        """
+        if self.is_stored(source):
+            return source
+        if not Path(source).is_file():
+            raise FileNotFoundError(f"File not found: {source}")
+
+        digest = hash_file(source)
+        existing = self.db.get_media(digest)
+        if existing:
+            # Same content already stored, possibly under another extension
+            store_path = existing['path']
+        else:
+            extension = Path(source).suffix.lower()
+            store_path = f"{STORE_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+        target = self.base_dir / store_path
+
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+            copy_file(source, str(temp))
+            os.replace(temp, target)
+
+        self.db.register_media(digest, store_path, target.stat().st_size)
+        return store_path
+
+    def import_external_covers(self) -> int:
+        """
+        Move covers saved before the store existed into it.
+
+        Each cover file books still point at outside the store is hashed and
+        added, and the books are pointed at the stored copy. The original
+        files are left in place; paths whose file is gone are kept as they
+        are.
+
+        Returns:
+            int: Number of books now using a stored cover
+        """
+        moved = 0
+        for path in self.db.get_external_cover_paths(f"{STORE_DIR}/"):
+            if not Path(path).is_file():
+                continue
+            moved += self.db.replace_cover_path(path, self.add_file(path))
+        return moved
+
+    def collect_garbage(self, grace_period: timedelta = timedelta(hours=1)) -> Tuple[int, int]:
+        """
+        Delete blobs no book references any more.
+
+        Blobs registered within the grace period are kept, since a book
+        referencing them may be about to be saved.
+
+        Returns:
+            Tuple[int, int]: Number of files removed and bytes reclaimed
+        """
+        cutoff = (datetime.now() - grace_period).isoformat()
+        removed, reclaimed = 0, 0
+
+        for media in self.db.get_unreferenced_media(cutoff):
+            file = self.base_dir / media['path']
+            if file.exists():
+                reclaimed += file.stat().st_size
+                file.unlink()
+                removed += 1
+            self.db.delete_media(media['hash'])
+
+        # Files left behind without a media row (e.g. interrupted imports)
+        known = self.db.get_media_paths()
+        for store_path, file in iter_blobs(self.root):
+            if store_path not in known and datetime.fromtimestamp(file.stat().st_mtime).isoformat() < cutoff:
+                reclaimed += file.stat().st_size
+                file.unlink()
+                removed += 1
+
+        return removed, reclaimed
+
+    def sync_to(self, target_root: Path) -> int:
+        """Copy blobs missing from another store root into it"""
+        return sync_blobs(self.root, target_root)
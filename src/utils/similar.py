@@ -0,0 +1,213 @@
+"""
+"Similar books" recommendations for BookKeeper
+
+Each book is a sparse TF-IDF vector over the words of its title and
+description, plus feature terms for its authors and category. The vectors
+are L2-normalized, so the dot product of two is their cosine similarity.
+
+The whole index is built in one batch: vectors go into ``book_terms`` and
+every book's nearest neighbours into ``similar_books``, so showing them is a
+single indexed lookup. After that, only books changed since the last run
+(read from the change log) are re-weighted and re-ranked. Term weights of
+unchanged books drift a little as the catalog grows; the next full rebuild
+evens them out.
+
+NumPy is optional: when installed it scores the batch, otherwise a
+pure-Python loop gives the same neighbours more slowly.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from ..models.database import Database, SIMILAR_BOOKS, SIMILAR_MIN_SCORE
+from ..models.names import fold_text, name_key, split_authors
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Change log consumer name the incremental updates keep their position under
+WATERMARK = 'similar-books'
+
+# Rebuild the whole index instead of updating book by book when more than
+# this share of the catalog changed since the last run
+REBUILD_SHARE = 0.2
+
+# Words in more than this share of books say nothing about similarity and
+# would make every book a neighbour of every other
+MAX_DOC_SHARE = 0.5
+
+# Term counts added per title word, author and category (description words count once)
+TITLE_WEIGHT = 2
+AUTHOR_WEIGHT = 3
+CATEGORY_WEIGHT = 1
+
+STOPWORDS = {
+    'a', 'about', 'after', 'all', 'also', 'and', 'are', 'book', 'but', 'can', 'for', 'from',
+    'has', 'have', 'her', 'his', 'how', 'into', 'its', 'more', 'not', 'one', 'our', 'out',
+    'she', 'that', 'the', 'their', 'them', 'they', 'this', 'was', 'what', 'when', 'who',
+    'will', 'with', 'you', 'your',
+}
+
+WORD = re.compile(r"[^\W\d_]{3,}")
+
+# Weighted terms of one book
+Vector = Dict[str, float]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Folded words of at least three letters, without stopwords"""
+    return [word for word in WORD.findall(fold_text(text)) if word not in STOPWORDS]
+
+
+def book_terms(book: Dict) -> Counter:
+    """Count the terms of a book: title and description words, authors and category"""
+    terms = Counter(tokenize(book.get('description')))
+    for word in tokenize(book.get('title')):
+        terms[word] += TITLE_WEIGHT
+    for author in split_authors(book.get('author')):
+        terms[f"author:{name_key(author)}"] += AUTHOR_WEIGHT
+    if book.get('category_id'):
+        terms[f"category:{book['category_id']}"] += CATEGORY_WEIGHT
+    return terms
+
+
+def weigh(terms: Counter, doc_counts: Dict[str, int], total: int) -> Vector:
+    """
+    Turn term counts into an L2-normalized TF-IDF vector.
+
+    Args:
+        terms: Term counts of the book (see book_terms())
+        doc_counts: Number of books containing each term, this one included
+        total: Number of books in the catalog
+    """
+    vector = {}
+    for term, count in terms.items():
+        docs = max(doc_counts.get(term, 1), 1)
+        if total > 2 and docs > total * MAX_DOC_SHARE:
+            continue
+        vector[term] = (1 + math.log(count)) * (math.log((1 + total) / (1 + docs)) + 1)
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+
+def nearest_neighbours(vectors: Dict[int, Vector], size: int = SIMILAR_BOOKS,
+                       min_score: float = SIMILAR_MIN_SCORE) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    Find each book's most similar books.
+
+    The vectors are kept as a sparse matrix stored by term (postings of book
+    indexes and weights), so scoring a book only visits books sharing a term
+    with it.
+
+    Returns:
+        Dict[int, List[Tuple[int, float]]]: (book id, score) pairs of each
+        book, best first
+    """
+    ids = sorted(vectors)
+    postings: Dict[str, Tuple[List[int], List[float]]] = defaultdict(lambda: ([], []))
+    for index, book_id in enumerate(ids):
+        for term, weight in vectors[book_id].items():
+            postings[term][0].append(index)
+            postings[term][1].append(weight)
+
+    if np is not None:
+        return _numpy_neighbours(ids, vectors, postings, size, min_score)
+
+    neighbours = {}
+    for index, book_id in enumerate(ids):
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in vectors[book_id].items():
+            for other, other_weight in zip(*postings[term]):
+                scores[other] += weight * other_weight
+        scores.pop(index, None)
+        best = heapq.nsmallest(size, ((-score, ids[other]) for other, score in scores.items()
+                                      if score >= min_score))
+        neighbours[book_id] = [(other_id, -score) for score, other_id in best]
+    return neighbours
+
+
+def _numpy_neighbours(ids: List[int], vectors: Dict[int, Vector],
+                      postings: Dict[str, Tuple[List[int], List[float]]],
+                      size: int, min_score: float) -> Dict[int, List[Tuple[int, float]]]:
+    """nearest_neighbours() scoring with NumPy arrays"""
+    columns = {term: (np.array(rows, dtype=np.int64), np.array(weights))
+               for term, (rows, weights) in postings.items()}
+    book_ids = np.array(ids, dtype=np.int64)
+
+    neighbours = {}
+    for index, book_id in enumerate(ids):
+        vector = vectors[book_id]
+        if not vector:
+            neighbours[book_id] = []
+            continue
+        rows = np.concatenate([columns[term][0] for term in vector])
+        products = np.concatenate([columns[term][1] * weight for term, weight in vector.items()])
+        # Sum the products per book touched
+        touched, positions = np.unique(rows, return_inverse=True)
+        scores = np.bincount(positions, weights=products)
+        keep = (scores >= min_score) & (touched != index)
+        touched, scores = touched[keep], scores[keep]
+        # Best first, ties by id like the pure-Python path
+        order = np.lexsort((book_ids[touched], -scores))[:size]
+        neighbours[book_id] = [(int(book_ids[touched[i]]), float(scores[i])) for i in order]
+    return neighbours
+
+
+def rebuild_similar_books(db: Database) -> int:
+    """
+    Rebuild the whole similarity index from the current catalog.
+
+    Returns:
+        int: Number of books indexed
+    """
+    books, _, seq = db.get_book_changes()
+    terms = {book['id']: book_terms(book) for book in books}
+
+    doc_counts: Counter = Counter()
+    for counts in terms.values():
+        doc_counts.update(counts.keys())
+    vectors = {book_id: weigh(counts, doc_counts, len(books)) for book_id, counts in terms.items()}
+
+    db.replace_similarity_index(vectors, nearest_neighbours(vectors))
+    db.set_export_watermark(WATERMARK, seq)
+    return len(books)
+
+
+def update_similar_books(db_path: str) -> Dict[str, int]:
+    """
+    Bring the similarity index of the database at db_path up to date.
+
+    The index is rebuilt on the first run and when much of the catalog
+    changed; otherwise only the changed books are updated.
+
+    Returns:
+        Dict[str, int]: Books re-indexed ('updated') and whether the index
+        was rebuilt ('rebuilt', 0 or 1)
+    """
+    db = Database(db_path)
+    try:
+        since = db.get_export_watermark(WATERMARK)
+        total = db.count_books()
+        if since is not None:
+            books, deleted_ids, seq = db.get_book_changes(since)
+            if len(books) + len(deleted_ids) <= max(total * REBUILD_SHARE, 1):
+                terms = {book['id']: book_terms(book) for book in books}
+                doc_counts = db.get_term_doc_counts({term for counts in terms.values() for term in counts})
+                indexed = db.get_indexed_terms(terms)
+                for book_id, counts in terms.items():
+                    # The stored counts already include the book for terms it was indexed under
+                    own = indexed.get(book_id, set())
+                    vector = weigh(counts, {term: doc_counts.get(term, 0) + (term not in own)
+                                            for term in counts}, total)
+                    db.update_book_similarity(book_id, vector)
+                for book_id in deleted_ids:
+                    db.update_book_similarity(book_id, None)
+                db.set_export_watermark(WATERMARK, seq)
+                return {'updated': len(books) + len(deleted_ids), 'rebuilt': 0}
+        return {'updated': rebuild_similar_books(db), 'rebuilt': 1}
+    finally:
+        db.close()
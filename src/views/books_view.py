@@ -2,20 +2,74 @@
 Books View - Main book management interface
 """
 
+import os
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from typing import Optional, Dict
-from ..models.database import Database
+from typing import Callable, Optional, Dict, List, Tuple
+from ..models.database import Database, DatabaseBusyError
+from ..utils.covers import CoverCache, CARD_COVER_SIZE, DETAIL_COVER_SIZE
+from ..utils.maintenance import UNDO_WINDOW
+from ..utils.media_store import MediaStore
+
+
+# Sort options shown in the list header, mapped to Database sort keys
+SORT_OPTIONS = {
+    "Title": "title",
+    "Author": "author",
+    "Year": "year",
+    "Rating": "rating",
+    "Date Added": "date_added",
+}
+
+
+def watch_scrolling(frame: ctk.CTkScrollableFrame, callback: Callable[[], None]):
+    """
+    Call callback whenever a scrollable frame scrolls or its content resizes.
+
+    CTkScrollableFrame has no public scroll event, so this hooks its inner
+    canvas, which CustomTkinter keeps in private attributes.
+
+    Returns:
+        The canvas being watched, or None if this CustomTkinter version
+        does not expose it (callback is then never called)
+    """
+    canvas = getattr(frame, '_parent_canvas', None)
+    scrollbar = getattr(frame, '_scrollbar', None)
+    if canvas is None or scrollbar is None:
+        return None
+
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        callback()
+
+    canvas.configure(yscrollcommand=on_scroll)
+    return canvas
 
 
 class BooksView:
     """Books management view with add, edit, delete, search functionality"""
 
+    PAGE_SIZE = 100  # Books loaded per page in the list
+    NOTES_PAGE_SIZE = 10  # Notes loaded per page in the details panel
+    SIMILAR_BOOKS_SHOWN = 5  # Similar books listed in the details panel
+
     def __init__(self, parent, db: Database):
         self.parent = parent
         self.db = db
         self.selected_book_id: Optional[int] = None
         self.current_books = []
+        self.active_filters: Dict = {}
+        self.sort_descending = False
+        self.has_more_books = False
+        self.load_more_button = None
+        self.note_results_loaded = 0
+        # Cards whose cover has not been requested yet: (card, cover label, path)
+        self.pending_covers: List[Tuple[ctk.CTkFrame, ctk.CTkLabel, str]] = []
+        self.cover_check_job: Optional[str] = None
+
+        self.media = MediaStore(db)
+        self.covers = CoverCache(os.path.join(os.path.dirname(db.db_path), "thumbnails"))
+        self.covers.start(self.parent)
 
         self.setup_ui()
         self.refresh()
@@ -34,11 +88,23 @@ class BooksView:
         search_frame = ctk.CTkFrame(left_panel)
         search_frame.pack(fill="x", padx=10, pady=10)
 
+        search_header = ctk.CTkFrame(search_frame, fg_color="transparent")
+        search_header.pack(fill="x", padx=10, pady=(5, 10))
+
         ctk.CTkLabel(
-            search_frame,
+            search_header,
             text="🔍 Search Books",
             font=ctk.CTkFont(size=16, weight="bold")
-        ).pack(anchor="w", padx=10, pady=(5, 10))
+        ).pack(side="left")
+
+        # Search the catalog (exactly or tolerating typos) or the text of all notes
+        self.search_mode = ctk.CTkSegmentedButton(
+            search_header,
+            values=["Books", "Fuzzy", "Notes"],
+            command=lambda _: self.apply_filters()
+        )
+        self.search_mode.set("Books")
+        self.search_mode.pack(side="right")
 
         search_input_frame = ctk.CTkFrame(search_frame)
         search_input_frame.pack(fill="x", padx=10, pady=(0, 10))
@@ -79,20 +145,59 @@ class BooksView:
         )
         self.category_filter.pack(side="left")
 
+        ctk.CTkButton(
+            filter_frame,
+            text="⚙ Filters",
+            width=80,
+            command=self.toggle_filter_panel
+        ).pack(side="right")
+
+        # Structured filter panel (hidden until toggled)
+        self.filter_panel = ctk.CTkFrame(search_frame)
+        self.filter_fields = {}
+        self.filter_panel_visible = False
+        self.setup_filter_panel()
+
         # Books list
         list_frame = ctk.CTkFrame(left_panel)
         list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
+        list_header = ctk.CTkFrame(list_frame, fg_color="transparent")
+        list_header.pack(fill="x", padx=10, pady=(5, 10))
+
         ctk.CTkLabel(
-            list_frame,
+            list_header,
             text="📚 Book Collection",
             font=ctk.CTkFont(size=16, weight="bold")
-        ).pack(anchor="w", padx=10, pady=(5, 10))
+        ).pack(side="left")
+
+        # Sort controls
+        self.sort_direction_button = ctk.CTkButton(
+            list_header,
+            text="↑",
+            width=30,
+            command=self.toggle_sort_direction
+        )
+        self.sort_direction_button.pack(side="right")
+
+        self.sort_combo = ctk.CTkComboBox(
+            list_header,
+            values=list(SORT_OPTIONS),
+            command=lambda _: self.apply_filters(),
+            width=120
+        )
+        self.sort_combo.set("Title")
+        self.sort_combo.pack(side="right", padx=5)
+
+        ctk.CTkLabel(list_header, text="Sort by:").pack(side="right")
 
         # Create scrollable frame for books
         self.books_scroll = ctk.CTkScrollableFrame(list_frame, height=400)
         self.books_scroll.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
+        # Load covers for cards as they scroll into view
+        self.books_canvas = watch_scrolling(self.books_scroll, self.schedule_cover_check)
+
         # Action buttons
         action_frame = ctk.CTkFrame(left_panel)
         action_frame.pack(fill="x", padx=10, pady=(0, 10))
@@ -117,6 +222,273 @@ class BooksView:
 
         self.show_no_selection()
 
+    def setup_filter_panel(self):
+        """Setup the structured filter panel widgets"""
+        def add_entry(row, key: str, label: str, width: int):
+            ctk.CTkLabel(row, text=label).pack(side="left", padx=(0, 5))
+            self.filter_fields[key] = ctk.CTkEntry(row, width=width, height=28)
+            self.filter_fields[key].pack(side="left", padx=(0, 10))
+
+        row1 = ctk.CTkFrame(self.filter_panel, fg_color="transparent")
+        row1.pack(fill="x", padx=10, pady=(10, 5))
+        add_entry(row1, 'author', "Author:", 160)
+        add_entry(row1, 'publisher', "Publisher:", 140)
+
+        row2 = ctk.CTkFrame(self.filter_panel, fg_color="transparent")
+        row2.pack(fill="x", padx=10, pady=5)
+        add_entry(row2, 'year_min', "Year from:", 60)
+        add_entry(row2, 'year_max', "to:", 60)
+        add_entry(row2, 'language', "Language:", 100)
+
+        row3 = ctk.CTkFrame(self.filter_panel, fg_color="transparent")
+        row3.pack(fill="x", padx=10, pady=5)
+        add_entry(row3, 'price_min', "Price from:", 60)
+        add_entry(row3, 'price_max', "to:", 60)
+
+        ctk.CTkLabel(row3, text="Rating ≥").pack(side="left", padx=(0, 5))
+        self.filter_fields['min_rating'] = ctk.CTkComboBox(
+            row3,
+            values=["Any", "1", "2", "3", "4", "5"],
+            width=70
+        )
+        self.filter_fields['min_rating'].set("Any")
+        self.filter_fields['min_rating'].pack(side="left")
+
+        row4 = ctk.CTkFrame(self.filter_panel, fg_color="transparent")
+        row4.pack(fill="x", padx=10, pady=(5, 10))
+
+        ctk.CTkLabel(row4, text="Status:").pack(side="left", padx=(0, 5))
+        self.filter_fields['lent'] = ctk.CTkComboBox(
+            row4,
+            values=["Any", "Lent out", "Available"],
+            width=110
+        )
+        self.filter_fields['lent'].set("Any")
+        self.filter_fields['lent'].pack(side="left")
+
+        ctk.CTkButton(
+            row4,
+            text="Reset",
+            width=60,
+            command=self.reset_filters
+        ).pack(side="right")
+
+        ctk.CTkButton(
+            row4,
+            text="Apply",
+            width=60,
+            command=self.apply_filters
+        ).pack(side="right", padx=5)
+
+    def toggle_filter_panel(self):
+        """Show or hide the structured filter panel"""
+        if self.filter_panel_visible:
+            self.filter_panel.pack_forget()
+        else:
+            self.filter_panel.pack(fill="x", padx=10, pady=(0, 10))
+        self.filter_panel_visible = not self.filter_panel_visible
+
+    def get_active_filters(self) -> Dict:
+        """Collect filters from the search box, category and filter panel"""
+        filters = {'query': self.search_entry.get()}
+
+        category_name = self.category_filter.get()
+        if category_name != "All Categories":
+            for cat in self.db.get_all_categories():
+                if cat['name'] == category_name:
+                    filters['category_id'] = cat['id']
+                    break
+
+        for key in ('author', 'publisher', 'language'):
+            filters[key] = self.filter_fields[key].get().strip()
+
+        for key in ('year_min', 'year_max'):
+            value = self.filter_fields[key].get().strip()
+            filters[key] = int(value) if value else None
+
+        for key in ('price_min', 'price_max'):
+            value = self.filter_fields[key].get().strip()
+            filters[key] = float(value) if value else None
+
+        rating = self.filter_fields['min_rating'].get()
+        filters['min_rating'] = int(rating) if rating.isdigit() else None
+
+        lent = self.filter_fields['lent'].get()
+        filters['lent'] = {"Lent out": True, "Available": False}.get(lent)
+
+        return filters
+
+    def get_sort(self) -> tuple:
+        """Get the selected sort as Database sort keys"""
+        key = SORT_OPTIONS.get(self.sort_combo.get(), "title")
+        return (f"-{key}" if self.sort_descending else key,)
+
+    def toggle_sort_direction(self):
+        """Switch between ascending and descending order"""
+        self.sort_descending = not self.sort_descending
+        self.sort_direction_button.configure(text="↓" if self.sort_descending else "↑")
+        self.apply_filters()
+
+    def apply_filters(self):
+        """Reload the first page of books using all active filters and sort"""
+        if self.search_mode.get() == "Notes":
+            self.show_note_results()
+            return
+
+        try:
+            self.active_filters = self.get_active_filters()
+        except ValueError:
+            messagebox.showerror("Error", "Year and price filters must be numbers!")
+            return
+
+        if self.search_mode.get() == "Fuzzy" and self.active_filters['query'].strip():
+            # Ranked by similarity, so the best matches all fit on one page
+            self.current_books = self.db.fuzzy_search_books(
+                self.active_filters['query'], limit=self.PAGE_SIZE,
+                category_id=self.active_filters.get('category_id')
+            )
+            self.has_more_books = False
+            self.update_books_display()
+            return
+
+        self.current_books = self.db.filter_books(
+            sort=self.get_sort(), limit=self.PAGE_SIZE, **self.active_filters
+        )
+        self.has_more_books = len(self.current_books) == self.PAGE_SIZE
+        self.update_books_display()
+
+    def load_more_books(self):
+        """Append the next page of books after the last one shown"""
+        if not self.current_books:
+            return
+        sort = self.get_sort()
+        page = self.db.filter_books(
+            sort=sort,
+            limit=self.PAGE_SIZE,
+            after=self.db.book_sort_cursor(self.current_books[-1], sort),
+            **self.active_filters
+        )
+        self.current_books.extend(page)
+        self.has_more_books = len(page) == self.PAGE_SIZE
+
+        if self.load_more_button:
+            self.load_more_button.destroy()
+            self.load_more_button = None
+        for book in page:
+            self.create_book_card(book)
+        self.add_load_more_button()
+
+    def show_note_results(self):
+        """Show notes matching the search text instead of books"""
+        for widget in self.books_scroll.winfo_children():
+            widget.destroy()
+        self.load_more_button = None
+        self.pending_covers.clear()
+        self.note_results_loaded = 0
+
+        if not self.search_entry.get().strip():
+            ctk.CTkLabel(
+                self.books_scroll,
+                text="Type to search your notes and reviews",
+                text_color="gray"
+            ).pack(pady=20)
+            return
+
+        self.load_more_note_results()
+        if not self.note_results_loaded:
+            ctk.CTkLabel(
+                self.books_scroll,
+                text="No matching notes",
+                text_color="gray"
+            ).pack(pady=20)
+
+    def load_more_note_results(self):
+        """Append the next page of note search results"""
+        if self.load_more_button:
+            self.load_more_button.destroy()
+            self.load_more_button = None
+
+        results = self.db.search_notes(
+            self.search_entry.get(),
+            limit=self.PAGE_SIZE,
+            offset=self.note_results_loaded
+        )
+        for note in results:
+            self.create_note_result_card(note)
+        self.note_results_loaded += len(results)
+
+        if len(results) == self.PAGE_SIZE:
+            self.load_more_button = ctk.CTkButton(
+                self.books_scroll,
+                text="Load more",
+                command=self.load_more_note_results
+            )
+            self.load_more_button.pack(pady=10)
+
+    def create_note_result_card(self, note: Dict):
+        """Create a card for a note matching the search"""
+        card = ctk.CTkFrame(self.books_scroll, fg_color="#2b2b2b")
+        card.pack(fill="x", pady=5, padx=5)
+
+        ctk.CTkLabel(
+            card,
+            text=f"{note['title']} — {note['author']}",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            anchor="w"
+        ).pack(fill="x", padx=10, pady=(10, 2))
+
+        ctk.CTkLabel(
+            card,
+            text=note['snippet'],
+            font=ctk.CTkFont(size=12),
+            text_color="gray",
+            wraplength=500,
+            justify="left",
+            anchor="w"
+        ).pack(fill="x", padx=10)
+
+        ctk.CTkButton(
+            card,
+            text="View Book",
+            width=90,
+            height=25,
+            command=lambda book_id=note['book_id']: self.show_book_by_id(book_id)
+        ).pack(anchor="w", padx=10, pady=(5, 10))
+
+    def show_book_by_id(self, book_id: int):
+        """Show details for a book looked up by ID"""
+        book = self.db.get_book_by_id(book_id)
+        if book:
+            self.show_book_details(book)
+
+    def add_load_more_button(self):
+        """Add a button to load the next page when more books are available"""
+        if self.has_more_books:
+            self.load_more_button = ctk.CTkButton(
+                self.books_scroll,
+                text="Load more",
+                command=self.load_more_books
+            )
+            self.load_more_button.pack(pady=10)
+
+    def reset_filters(self):
+        """Clear the structured filter panel"""
+        for key, field in self.filter_fields.items():
+            if isinstance(field, ctk.CTkComboBox):
+                field.set("Any")
+            else:
+                field.delete(0, 'end')
+        self.apply_filters()
+
+    def filter_by_author(self, author_name: str):
+        """Show only books by the given author"""
+        self.search_entry.delete(0, 'end')
+        self.filter_fields['author'].delete(0, 'end')
+        self.filter_fields['author'].insert(0, author_name)
+        if not self.filter_panel_visible:
+            self.toggle_filter_panel()
+        self.apply_filters()
+
     def show_no_selection(self):
         """Show message when no book is selected"""
         for widget in self.details_container.winfo_children():
@@ -137,8 +509,7 @@ class BooksView:
 
     def refresh(self):
         """Refresh the books list"""
-        self.current_books = self.db.get_all_books()
-        self.update_books_display()
+        self.apply_filters()
         self.update_category_filter()
 
     def update_category_filter(self):
@@ -152,6 +523,8 @@ class BooksView:
         # Clear current display
         for widget in self.books_scroll.winfo_children():
             widget.destroy()
+        self.load_more_button = None
+        self.pending_covers.clear()
 
         if not self.current_books:
             ctk.CTkLabel(
@@ -164,12 +537,27 @@ class BooksView:
         # Display books
         for book in self.current_books:
             self.create_book_card(book)
+        self.add_load_more_button()
 
     def create_book_card(self, book: Dict):
         """Create a card for displaying a book"""
         card = ctk.CTkFrame(self.books_scroll, fg_color="#2b2b2b")
         card.pack(fill="x", pady=5, padx=5)
 
+        # Cover thumbnail, loaded once the card is scrolled into view
+        if book.get('cover_image_path'):
+            cover_label = ctk.CTkLabel(
+                card,
+                text="📕",
+                width=CARD_COVER_SIZE[0],
+                height=CARD_COVER_SIZE[1],
+                fg_color="#1e1e1e",
+                corner_radius=4
+            )
+            cover_label.pack(side="left", padx=(10, 0), pady=10)
+            self.pending_covers.append((card, cover_label, self.media.resolve(book['cover_image_path'])))
+            self.schedule_cover_check()
+
         # Book info
         info_frame = ctk.CTkFrame(card, fg_color="transparent")
         info_frame.pack(fill="x", padx=10, pady=10)
@@ -249,6 +637,47 @@ class BooksView:
             hover_color="#c0392b"
         ).pack(side="left", padx=2)
 
+    def schedule_cover_check(self):
+        """Check for newly visible covers once pending layout and scrolling settle"""
+        if self.cover_check_job is None:
+            self.cover_check_job = self.parent.after_idle(self.request_visible_covers)
+
+    def request_visible_covers(self):
+        """Request covers only for cards inside (or just beyond) the visible area"""
+        self.cover_check_job = None
+        if not self.pending_covers:
+            return
+
+        canvas = self.books_canvas
+        if canvas is None:
+            # Scrolling can't be watched, so load every cover now
+            for card, label, path in self.pending_covers:
+                if card.winfo_exists():
+                    self.covers.request(path, CARD_COVER_SIZE, lambda image, l=label: self.set_cover(l, image))
+            self.pending_covers = []
+            return
+
+        self.books_scroll.update_idletasks()
+        margin = canvas.winfo_height() // 2
+        top = canvas.canvasy(0) - margin
+        bottom = canvas.canvasy(canvas.winfo_height()) + margin
+
+        remaining = []
+        for card, label, path in self.pending_covers:
+            if not card.winfo_exists():
+                continue
+            y = card.winfo_y()
+            if y + card.winfo_height() >= top and y <= bottom:
+                self.covers.request(path, CARD_COVER_SIZE, lambda image, l=label: self.set_cover(l, image))
+            else:
+                remaining.append((card, label, path))
+        self.pending_covers = remaining
+
+    def set_cover(self, label: ctk.CTkLabel, image):
+        """Show a loaded cover in a label that may since have been destroyed"""
+        if image is not None and label.winfo_exists():
+            label.configure(image=image, text="")
+
     def show_book_details(self, book: Dict):
         """Show detailed information about a book"""
         self.selected_book_id = book['id']
@@ -257,6 +686,22 @@ class BooksView:
         for widget in self.details_container.winfo_children():
             widget.destroy()
 
+        # Cover
+        if book.get('cover_image_path'):
+            cover_label = ctk.CTkLabel(
+                self.details_container,
+                text="📕",
+                font=ctk.CTkFont(size=60),
+                width=DETAIL_COVER_SIZE[0],
+                height=DETAIL_COVER_SIZE[1]
+            )
+            cover_label.pack(pady=(10, 0))
+            self.covers.request(
+                self.media.resolve(book['cover_image_path']),
+                DETAIL_COVER_SIZE,
+                lambda image: self.set_cover(cover_label, image)
+            )
+
         # Title
         ctk.CTkLabel(
             self.details_container,
@@ -367,6 +812,135 @@ class BooksView:
                     anchor="w"
                 ).pack(padx=20, pady=(0, 10), anchor="w")
 
+        # Similar books and notes
+        self.create_similar_section(book['id'])
+        self.create_notes_section(book['id'])
+
+    def create_similar_section(self, book_id: int):
+        """Create the list of precomputed similar books, if the book has any"""
+        similar = self.db.get_similar_books(book_id, limit=self.SIMILAR_BOOKS_SHOWN)
+        if not similar:
+            return
+
+        similar_frame = ctk.CTkFrame(self.details_container)
+        similar_frame.pack(fill="x", pady=10)
+
+        ctk.CTkLabel(
+            similar_frame,
+            text="Similar Books:",
+            font=ctk.CTkFont(weight="bold"),
+            anchor="w"
+        ).pack(padx=10, pady=(10, 5), anchor="w")
+
+        for other in similar:
+            ctk.CTkButton(
+                similar_frame,
+                text=f"{other['title']} — {other['author']}",
+                height=25,
+                anchor="w",
+                fg_color="transparent",
+                text_color=("gray10", "gray90"),
+                hover_color=("gray75", "gray30"),
+                command=lambda other_id=other['id']: self.show_book_by_id(other_id)
+            ).pack(fill="x", padx=10, pady=1)
+
+        ctk.CTkFrame(similar_frame, height=8, fg_color="transparent").pack()
+
+    def create_notes_section(self, book_id: int):
+        """Create the notes panel for a book, showing the newest notes first"""
+        notes_frame = ctk.CTkFrame(self.details_container)
+        notes_frame.pack(fill="x", pady=10)
+
+        ctk.CTkLabel(
+            notes_frame,
+            text=f"Notes ({self.db.count_book_notes(book_id)}):",
+            font=ctk.CTkFont(weight="bold"),
+            anchor="w"
+        ).pack(padx=10, pady=(10, 5), anchor="w")
+
+        note_entry = ctk.CTkTextbox(notes_frame, height=60)
+        note_entry.pack(fill="x", padx=10)
+
+        def add_note():
+            text = note_entry.get("1.0", "end-1c").strip()
+            if not text:
+                return
+            try:
+                self.db.add_note(book_id, text)
+                notes_frame.destroy()
+                self.create_notes_section(book_id)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to add note: {str(e)}")
+
+        ctk.CTkButton(
+            notes_frame,
+            text="Add Note",
+            height=28,
+            command=add_note
+        ).pack(anchor="e", padx=10, pady=5)
+
+        notes_list = ctk.CTkFrame(notes_frame, fg_color="transparent")
+        notes_list.pack(fill="x", padx=10, pady=(0, 10))
+        self.load_more_notes(notes_frame, notes_list, book_id)
+
+    def load_more_notes(self, notes_frame, notes_list, book_id: int, before=None):
+        """Append the next page of a book's notes, older than before"""
+        notes = self.db.get_book_notes(book_id, limit=self.NOTES_PAGE_SIZE, before=before)
+
+        for note in notes:
+            row = ctk.CTkFrame(notes_list, fg_color="#2b2b2b")
+            row.pack(fill="x", pady=2)
+
+            header = ctk.CTkFrame(row, fg_color="transparent")
+            header.pack(fill="x", padx=8, pady=(5, 0))
+
+            ctk.CTkLabel(
+                header,
+                text=note['date_created'],
+                font=ctk.CTkFont(size=10),
+                text_color="gray"
+            ).pack(side="left")
+
+            def delete_note(note_id=note['id']):
+                if messagebox.askyesno("Confirm Delete", "Delete this note?"):
+                    self.db.delete_note(note_id)
+                    notes_frame.destroy()
+                    self.create_notes_section(book_id)
+
+            ctk.CTkButton(
+                header,
+                text="✕",
+                width=24,
+                height=20,
+                fg_color="#e74c3c",
+                hover_color="#c0392b",
+                command=delete_note
+            ).pack(side="right")
+
+            ctk.CTkLabel(
+                row,
+                text=note['note_text'],
+                wraplength=320,
+                justify="left",
+                anchor="w"
+            ).pack(fill="x", padx=8, pady=(0, 5))
+
+        if len(notes) == self.NOTES_PAGE_SIZE:
+            last = notes[-1]
+
+            def show_older():
+                more_button.destroy()
+                self.load_more_notes(notes_frame, notes_list, book_id,
+                                     (last['date_created'], last['id']))
+
+            more_button = ctk.CTkButton(
+                notes_list,
+                text="Show older notes",
+                height=25,
+                command=show_older
+            )
+            more_button.pack(pady=5)
+
     def show_add_dialog(self):
         """Show dialog to add a new book"""
         self.show_book_dialog()
@@ -465,6 +1039,25 @@ class BooksView:
         fields['purchase_store'] = ctk.CTkEntry(form_scroll, height=35)
         fields['purchase_store'].pack(fill="x", pady=(0, 10))
 
+        # Cover image
+        ctk.CTkLabel(form_scroll, text="Cover Image", anchor="w").pack(fill="x", pady=(0, 5))
+        cover_frame = ctk.CTkFrame(form_scroll, fg_color="transparent")
+        cover_frame.pack(fill="x", pady=(0, 10))
+
+        fields['cover_image_path'] = ctk.CTkEntry(cover_frame, height=35)
+        fields['cover_image_path'].pack(side="left", fill="x", expand=True, padx=(0, 5))
+
+        def browse_cover():
+            path = filedialog.askopenfilename(
+                title="Select cover image",
+                filetypes=[("Images", "*.png *.jpg *.jpeg *.gif *.webp *.bmp"), ("All files", "*.*")]
+            )
+            if path:
+                fields['cover_image_path'].delete(0, 'end')
+                fields['cover_image_path'].insert(0, path)
+
+        ctk.CTkButton(cover_frame, text="Browse", width=80, command=browse_cover).pack(side="left")
+
         # If editing, populate fields
         if book:
             fields['title'].insert(0, book['title'])
@@ -491,6 +1084,8 @@ class BooksView:
                 fields['purchase_price'].insert(0, str(book['purchase_price']))
             if book.get('purchase_store'):
                 fields['purchase_store'].insert(0, book['purchase_store'])
+            if book.get('cover_image_path'):
+                fields['cover_image_path'].insert(0, book['cover_image_path'])
 
         # Buttons
         btn_frame = ctk.CTkFrame(dialog)
@@ -524,9 +1119,14 @@ class BooksView:
                 'description': fields['description'].get("1.0", "end-1c") or None,
                 'purchase_price': float(fields['purchase_price'].get()) if fields['purchase_price'].get() else None,
                 'purchase_store': fields['purchase_store'].get() or None,
+                'cover_image_path': fields['cover_image_path'].get() or None,
             }
 
             try:
+                # Keep a deduplicated copy of the cover next to the database
+                if book_data['cover_image_path']:
+                    book_data['cover_image_path'] = self.media.add_file(book_data['cover_image_path'])
+
                 if book:
                     # Update existing book
                     self.db.update_book(book['id'], **book_data)
@@ -536,6 +1136,9 @@ class BooksView:
 
                 self.refresh()
                 dialog.destroy()
+            except DatabaseBusyError as e:
+                # Keep the dialog open so the user can simply press Save again
+                messagebox.showwarning("Database Busy", str(e))
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save book: {str(e)}")
 
@@ -558,23 +1161,60 @@ class BooksView:
         ).pack(side="left", fill="x", expand=True, padx=(5, 0))
 
     def delete_book(self, book_id: int):
-        """Delete a book"""
-        if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this book?"):
-            try:
-                self.db.delete_book(book_id)
-                self.refresh()
-                self.show_no_selection()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete book: {str(e)}")
+        """Delete a book, offering to undo it"""
+        book = self.db.get_book_by_id(book_id)
+        try:
+            self.db.delete_book(book_id)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to delete book: {str(e)}")
+            return
+        self.refresh()
+        self.show_deleted_notice(book_id, book['title'] if book else "Book")
+
+    def show_deleted_notice(self, book_id: int, title: str):
+        """Show an undo prompt for a deleted book in the details panel"""
+        for widget in self.details_container.winfo_children():
+            widget.destroy()
+
+        ctk.CTkLabel(
+            self.details_container,
+            text="🗑️",
+            font=ctk.CTkFont(size=60)
+        ).pack(pady=(50, 10))
+
+        ctk.CTkLabel(
+            self.details_container,
+            text=f"\"{title}\" was deleted",
+            font=ctk.CTkFont(size=16),
+            wraplength=350
+        ).pack()
+
+        ctk.CTkLabel(
+            self.details_container,
+            text=f"It can be restored for {UNDO_WINDOW.days} days.",
+            font=ctk.CTkFont(size=12),
+            text_color="gray"
+        ).pack(pady=(5, 15))
+
+        ctk.CTkButton(
+            self.details_container,
+            text="↩️ Undo",
+            command=lambda: self.undo_delete(book_id),
+            width=120
+        ).pack()
+
+    def undo_delete(self, book_id: int):
+        """Restore a book deleted with delete_book()"""
+        if self.db.restore_book(book_id):
+            self.refresh()
+            self.show_book_by_id(book_id)
+        else:
+            messagebox.showerror("Error", "This book can no longer be restored.")
+            self.show_no_selection()
 
     def search_books(self):
         """Search books"""
-        query = self.search_entry.get()
-        if query:
-            self.current_books = self.db.search_books(query)
-        else:
-            self.current_books = self.db.get_all_books()
-        self.update_books_display()
+        self.apply_filters()
 
     def clear_search(self):
         """Clear search and show all books"""
@@ -584,18 +1224,4 @@ class BooksView:
 
     def filter_by_category(self, category_name: str):
         """Filter books by category"""
-        if category_name == "All Categories":
-            self.current_books = self.db.get_all_books()
-        else:
-            categories = self.db.get_all_categories()
-            category_id = None
-            for cat in categories:
-                if cat['name'] == category_name:
-                    category_id = cat['id']
-                    break
-
-            if category_id:
-                query = self.search_entry.get()
-                self.current_books = self.db.search_books(query if query else "", category_id)
-
-        self.update_books_display()
+        self.apply_filters()
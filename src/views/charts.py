@@ -0,0 +1,289 @@
+"""
+Charts - Lightweight Tk Canvas charts for the statistics dashboard
+"""
+
+import math
+import tkinter
+import customtkinter as ctk
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# A drawing operation: canvas method name, coordinates, options
+DrawOp = Tuple[str, tuple, dict]
+
+CHART_BG = "#2b2b2b"
+AXIS_COLOR = "#555555"
+TEXT_COLOR = "#aaaaaa"
+PALETTE = ["#3498db", "#e74c3c", "#2ecc71", "#9b59b6", "#f39c12",
+           "#1abc9c", "#e67e22", "#f1c40f", "#34495e", "#95a5a6"]
+
+
+def downsample(points: Sequence[Tuple[str, float]], max_points: int) -> List[Tuple[str, float]]:
+    """
+    Reduce a series to at most max_points points for display.
+
+    Consecutive points are grouped into equal buckets and each bucket keeps
+    its lowest and highest point in order, so peaks and dips stay visible
+    however long the series is.
+    """
+    if len(points) <= max_points or max_points < 4:
+        return list(points)
+
+    buckets = max_points // 2
+    size = len(points) / buckets
+    result = []
+    for i in range(buckets):
+        bucket = points[int(i * size):int((i + 1) * size)]
+        if not bucket:
+            continue
+        low = min(range(len(bucket)), key=lambda j: bucket[j][1])
+        high = max(range(len(bucket)), key=lambda j: bucket[j][1])
+        for j in sorted({low, high}):
+            result.append(bucket[j])
+    return result
+
+
+class Chart:
+    """
+    Base class for a titled chart drawn on a single Tk Canvas.
+
+    Data is set together with a key (e.g. the table version it came from).
+    The computed drawing operations are cached per (key, width, height), so
+    resizing or re-showing the same data only replays cached geometry.
+    """
+
+    MAX_CACHED_LAYOUTS = 8
+
+    def __init__(self, parent, title: str, height: int = 250):
+        self.frame = ctk.CTkFrame(parent, height=height)
+        self.frame.pack_propagate(False)
+
+        ctk.CTkLabel(
+            self.frame,
+            text=title,
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(anchor="w", padx=15, pady=(10, 5))
+
+        self.canvas = tkinter.Canvas(self.frame, bg=CHART_BG, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+
+        self.data_key: Optional[Hashable] = None
+        self.series: List[tuple] = []
+        self.colors: List[str] = []
+        self.layout_cache: Dict[Tuple, List[DrawOp]] = {}
+        self.redraw_job: Optional[str] = None
+
+    def set_data(self, key: Hashable, series: Sequence[tuple],
+                 colors: Optional[Sequence[str]] = None):
+        """Set the series to draw; unchanged keys keep the cached geometry"""
+        if key == self.data_key:
+            return
+        self.data_key = key
+        self.series = list(series)
+        self.colors = list(colors) if colors else []
+        self.layout_cache.clear()
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """Coalesce bursts of resize events into a single redraw"""
+        if self.redraw_job:
+            self.canvas.after_cancel(self.redraw_job)
+        self.redraw_job = self.canvas.after(30, self.redraw)
+
+    def redraw(self):
+        """Draw the chart at the canvas' current size"""
+        self.redraw_job = None
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if width < 20 or height < 20:
+            return
+
+        cache_key = (self.data_key, width, height)
+        ops = self.layout_cache.get(cache_key)
+        if ops is None:
+            ops = self.layout(width, height) if self.series else self.empty_layout(width, height)
+            if len(self.layout_cache) >= self.MAX_CACHED_LAYOUTS:
+                self.layout_cache.pop(next(iter(self.layout_cache)))
+            self.layout_cache[cache_key] = ops
+
+        self.canvas.delete("all")
+        for method, coords, options in ops:
+            getattr(self.canvas, method)(*coords, **options)
+
+    def empty_layout(self, width: int, height: int) -> List[DrawOp]:
+        """Geometry shown when there is no data"""
+        return [("create_text", (width / 2, height / 2),
+                 {"text": "No data yet", "fill": TEXT_COLOR})]
+
+    def layout(self, width: int, height: int) -> List[DrawOp]:
+        """Compute the drawing operations for the given size"""
+        raise NotImplementedError
+
+    def axes(self, width: int, height: int, max_value: float,
+             margin: Tuple[int, int, int, int]) -> List[DrawOp]:
+        """Axis lines and max-value label for the plot area inside margin (left, top, right, bottom)"""
+        left, top, right, bottom = margin
+        return [
+            ("create_line", (left, height - bottom, width - right, height - bottom), {"fill": AXIS_COLOR}),
+            ("create_line", (left, top, left, height - bottom), {"fill": AXIS_COLOR}),
+            ("create_text", (left - 5, top), {"text": f"{max_value:g}", "fill": TEXT_COLOR, "anchor": "e"}),
+            ("create_text", (left - 5, height - bottom), {"text": "0", "fill": TEXT_COLOR, "anchor": "e"}),
+        ]
+
+    def x_labels(self, points: Sequence[Tuple[str, float]], xs: Sequence[float],
+                 y: float, plot_width: float) -> List[DrawOp]:
+        """Category labels under the x axis, thinned so they do not overlap"""
+        step = max(1, math.ceil(len(points) * 60 / max(plot_width, 1)))
+        return [("create_text", (xs[i], y), {"text": points[i][0], "fill": TEXT_COLOR, "anchor": "n"})
+                for i in range(0, len(points), step)]
+
+
+class BarChart(Chart):
+    """Vertical bar chart of (label, value) points"""
+
+    MIN_BAR_WIDTH = 6
+
+    def layout(self, width: int, height: int) -> List[DrawOp]:
+        margin = (40, 10, 10, 25)
+        left, top, right, bottom = margin
+        plot_width = width - left - right
+        plot_height = height - top - bottom
+
+        points = downsample(self.series, max(1, int(plot_width // self.MIN_BAR_WIDTH)))
+        max_value = max((value for _, value in points), default=0) or 1
+        slot = plot_width / len(points)
+
+        ops = self.axes(width, height, max_value, margin)
+        centers = []
+        for i, (label, value) in enumerate(points):
+            x0 = left + i * slot + slot * 0.15
+            x1 = left + (i + 1) * slot - slot * 0.15
+            y0 = height - bottom - plot_height * value / max_value
+            color = self.colors[i % len(self.colors)] if self.colors else PALETTE[0]
+            ops.append(("create_rectangle", (x0, y0, x1, height - bottom), {"fill": color, "width": 0}))
+            centers.append((x0 + x1) / 2)
+
+        ops.extend(self.x_labels(points, centers, height - bottom + 4, plot_width))
+        return ops
+
+
+class LineChart(Chart):
+    """Line chart of (label, value) points over time"""
+
+    MIN_POINT_SPACING = 3
+
+    def layout(self, width: int, height: int) -> List[DrawOp]:
+        margin = (40, 10, 10, 25)
+        left, top, right, bottom = margin
+        plot_width = width - left - right
+        plot_height = height - top - bottom
+
+        points = downsample(self.series, max(2, int(plot_width // self.MIN_POINT_SPACING)))
+        max_value = max((value for _, value in points), default=0) or 1
+        step = plot_width / max(len(points) - 1, 1)
+
+        ops = self.axes(width, height, max_value, margin)
+        xs = [left + i * step for i in range(len(points))]
+        coords = []
+        for x, (_, value) in zip(xs, points):
+            coords.extend((x, height - bottom - plot_height * value / max_value))
+
+        color = self.colors[0] if self.colors else PALETTE[0]
+        if len(points) > 1:
+            ops.append(("create_line", tuple(coords), {"fill": color, "width": 2}))
+        else:
+            x, y = coords
+            ops.append(("create_oval", (x - 3, y - 3, x + 3, y + 3), {"fill": color, "width": 0}))
+
+        ops.extend(self.x_labels(points, xs, height - bottom + 4, plot_width))
+        return ops
+
+
+class PieChart(Chart):
+    """Pie chart of (label, value) slices with a legend"""
+
+    MAX_SLICES = 8  # Smaller slices are merged into "Other"
+
+    def layout(self, width: int, height: int) -> List[DrawOp]:
+        slices = [(label, value) for label, value in self.series if value > 0]
+        colors = self.colors or PALETTE
+        if len(slices) > self.MAX_SLICES:
+            rest = sum(value for _, value in slices[self.MAX_SLICES - 1:])
+            slices = slices[:self.MAX_SLICES - 1] + [("Other", rest)]
+            colors = colors[:self.MAX_SLICES - 1] + [PALETTE[-1]]
+        total = sum(value for _, value in slices)
+        if not total:
+            return self.empty_layout(width, height)
+
+        size = min(height - 20, width / 2)
+        x0, y0 = 10, (height - size) / 2
+        ops = []
+        start = 90.0
+        for i, (label, value) in enumerate(slices):
+            extent = -360.0 * value / total
+            color = colors[i % len(colors)]
+            # A full circle cannot be drawn as a single arc
+            if len(slices) == 1:
+                ops.append(("create_oval", (x0, y0, x0 + size, y0 + size), {"fill": color, "width": 0}))
+            else:
+                ops.append(("create_arc", (x0, y0, x0 + size, y0 + size),
+                            {"start": start, "extent": extent, "fill": color, "outline": CHART_BG}))
+            start += extent
+
+            legend_y = 15 + i * 20
+            legend_x = x0 + size + 20
+            ops.append(("create_rectangle", (legend_x, legend_y - 6, legend_x + 12, legend_y + 6),
+                        {"fill": color, "width": 0}))
+            ops.append(("create_text", (legend_x + 20, legend_y),
+                        {"text": f"{label} ({value / total * 100:.0f}%)", "fill": TEXT_COLOR, "anchor": "w"}))
+        return ops
+
+
+class HorizontalBarChart(Chart):
+    """
+    One labelled horizontal bar per (label, count, percentage) row.
+
+    Clicks are hit-tested against the row layout and reported through
+    on_click with the row label, so the whole breakdown is one widget.
+    """
+
+    ROW_HEIGHT = 50
+    HEADER_HEIGHT = 60  # Title label and padding around the canvas
+
+    def __init__(self, parent, title: str, on_click: Optional[Callable[[str], None]] = None):
+        super().__init__(parent, title, height=self.HEADER_HEIGHT + self.ROW_HEIGHT)
+        self.on_click = on_click
+        if on_click:
+            self.canvas.configure(cursor="hand2")
+            self.canvas.bind("<Button-1>", self.handle_click)
+
+    def set_data(self, key: Hashable, series: Sequence[tuple],
+                 colors: Optional[Sequence[str]] = None):
+        """Set the rows and grow the chart to fit them"""
+        rows = max(len(series), 1)
+        self.frame.configure(height=self.HEADER_HEIGHT + rows * self.ROW_HEIGHT)
+        super().set_data(key, series, colors)
+
+    def handle_click(self, event):
+        """Map a click to the row under the pointer"""
+        row = int(event.y // self.ROW_HEIGHT)
+        if 0 <= row < len(self.series):
+            self.on_click(self.series[row][0])
+
+    def layout(self, width: int, height: int) -> List[DrawOp]:
+        ops = []
+        for i, (label, count, percentage) in enumerate(self.series):
+            color = self.colors[i % len(self.colors)] if self.colors else PALETTE[i % len(PALETTE)]
+            top = i * self.ROW_HEIGHT
+            ops.append(("create_text", (5, top + 10),
+                        {"text": label, "fill": "white", "anchor": "w", "font": ("", 12, "bold")}))
+            ops.append(("create_text", (165, top + 10),
+                        {"text": f"{count} books", "fill": TEXT_COLOR, "anchor": "w"}))
+            ops.append(("create_text", (width - 5, top + 10),
+                        {"text": f"{percentage:.1f}%", "fill": color, "anchor": "e", "font": ("", 11, "bold")}))
+            ops.append(("create_rectangle", (5, top + 22, width - 5, top + 42),
+                        {"fill": "#3a3a3a", "width": 0}))
+            if percentage > 0:
+                bar_end = 5 + (width - 10) * percentage / 100
+                ops.append(("create_rectangle", (5, top + 22, bar_end, top + 42),
+                            {"fill": color, "width": 0}))
+        return ops
@@ -0,0 +1,141 @@
+"""
+Duplicates View - Review and merge likely duplicate books
+"""
+
+import customtkinter as ctk
+from tkinter import messagebox
+from typing import Callable, Dict, Optional
+from ..models.database import Database
+from ..utils.maintenance import UNDO_WINDOW
+
+
+class DuplicatesDialog:
+    """Dialog listing queued duplicate pairs, to merge or dismiss one at a time"""
+
+    PAGE_SIZE = 50  # Pairs shown at once
+
+    def __init__(self, parent, db: Database, on_change: Optional[Callable[[], None]] = None):
+        self.db = db
+        self.on_change = on_change
+
+        self.dialog = ctk.CTkToplevel(parent)
+        self.dialog.title("Review Duplicates")
+        self.dialog.geometry("900x650")
+        self.dialog.transient(parent)
+        self.dialog.update_idletasks()
+        self.dialog.after(10, self.dialog.grab_set)
+
+        ctk.CTkLabel(
+            self.dialog,
+            text="🔎 Possible Duplicate Books",
+            font=ctk.CTkFont(size=20, weight="bold")
+        ).pack(pady=(20, 5))
+
+        ctk.CTkLabel(
+            self.dialog,
+            text="Keep one book of each pair; loans and notes of the other move to it.",
+            font=ctk.CTkFont(size=12),
+            text_color="gray"
+        ).pack(pady=(0, 10))
+
+        self.pairs_scroll = ctk.CTkScrollableFrame(self.dialog)
+        self.pairs_scroll.pack(fill="both", expand=True, padx=20, pady=(0, 10))
+
+        ctk.CTkButton(
+            self.dialog,
+            text="Close",
+            command=self.dialog.destroy,
+            height=35
+        ).pack(pady=(0, 20))
+
+        self.refresh()
+
+    def refresh(self):
+        """Reload the queued pairs"""
+        for widget in self.pairs_scroll.winfo_children():
+            widget.destroy()
+
+        pairs = self.db.get_duplicate_candidates(limit=self.PAGE_SIZE)
+        if not pairs:
+            ctk.CTkLabel(
+                self.pairs_scroll,
+                text="No duplicates waiting for review",
+                font=ctk.CTkFont(size=14),
+                text_color="gray"
+            ).pack(pady=40)
+            return
+
+        for pair in pairs:
+            self.create_pair_card(pair)
+
+    def create_pair_card(self, pair: Dict):
+        """Create a card showing both books of a pair side by side"""
+        card = ctk.CTkFrame(self.pairs_scroll)
+        card.pack(fill="x", padx=5, pady=5)
+
+        ctk.CTkLabel(
+            card,
+            text=f"{pair['score']:.0%} match · {pair['reason']}",
+            font=ctk.CTkFont(size=12, weight="bold")
+        ).pack(anchor="w", padx=10, pady=(8, 4))
+
+        books_frame = ctk.CTkFrame(card, fg_color="transparent")
+        books_frame.pack(fill="x", padx=10)
+
+        for column, (keep, other) in enumerate(((pair['book'], pair['duplicate']),
+                                                (pair['duplicate'], pair['book']))):
+            side = ctk.CTkFrame(books_frame)
+            side.grid(row=0, column=column, sticky="nsew", padx=5, pady=5)
+            books_frame.grid_columnconfigure(column, weight=1)
+
+            details = [keep['title'], f"by {keep['author']}"]
+            details.append(f"ISBN: {keep['isbn'] or '—'} · Year: {keep['year'] or '—'}")
+            details.append(f"{keep['loan_count']} loan(s) · {keep['note_count']} note(s)")
+            ctk.CTkLabel(
+                side,
+                text="\n".join(details),
+                font=ctk.CTkFont(size=12),
+                justify="left",
+                wraplength=350
+            ).pack(anchor="w", padx=10, pady=(8, 4))
+
+            ctk.CTkButton(
+                side,
+                text="Keep This",
+                command=lambda k=keep, o=other: self.merge(k, o),
+                fg_color="#2ecc71",
+                hover_color="#27ae60",
+                height=30
+            ).pack(anchor="w", padx=10, pady=(0, 8))
+
+        ctk.CTkButton(
+            card,
+            text="Not Duplicates",
+            command=lambda: self.dismiss(pair['id']),
+            fg_color="gray",
+            height=30
+        ).pack(anchor="e", padx=15, pady=(0, 8))
+
+    def merge(self, keep: Dict, duplicate: Dict):
+        """Merge one book of a pair into the other, after confirmation"""
+        confirmed = messagebox.askyesno(
+            "Merge Books",
+            f"Keep \"{keep['title']}\" and move the loans and notes of the other copy to it?\n\n"
+            f"The other copy is deleted and can be restored for {UNDO_WINDOW.days} days.",
+            parent=self.dialog
+        )
+        if not confirmed:
+            return
+        try:
+            self.db.merge_books(keep['id'], duplicate['id'])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to merge books: {str(e)}")
+            return
+        self.refresh()
+        if self.on_change:
+            self.on_change()
+
+    def dismiss(self, candidate_id: int):
+        """Drop a pair from the queue for good"""
+        self.db.dismiss_duplicate(candidate_id)
+        self.refresh()
@@ -5,18 +5,34 @@ Lending View - Track borrowed books
 import customtkinter as ctk
 from tkinter import messagebox
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from ..models.database import Database
 
 
+def format_due_status(days_until_due: int) -> Tuple[str, str]:
+    """Get the badge text and color for a loan due in the given number of days"""
+    if days_until_due < 0:
+        return f"⚠️ Overdue by {abs(days_until_due)} days", "#e74c3c"
+    if days_until_due == 0:
+        return "⏰ Due today", "#f39c12"
+    return f"✓ Due in {days_until_due} days", "#2ecc71"
+
+
 class LendingView:
     """View for managing book lending"""
 
+    HISTORY_PAGE_SIZE = 20  # Returned loans loaded per page
+
     def __init__(self, parent, db: Database, books_view):
         self.parent = parent
         self.db = db
         self.books_view = books_view
         self.current_lendings = []
+        self.due_badges: Dict[int, ctk.CTkLabel] = {}  # lending id -> status badge
+        self.due_timer: Optional[str] = None
+        self.history_loaded = 0
+        self.history_has_more = False
+        self.history_more_button = None
 
         self.setup_ui()
         self.refresh()
@@ -78,12 +94,40 @@ class LendingView:
         self.current_lendings = self.db.get_borrowed_books()
         self.update_borrowed_display()
         self.update_history_display()
+        self.schedule_due_update()
+
+    def schedule_due_update(self):
+        """Wake up at the next midnight, when due-date badges change, if any are shown"""
+        if self.due_timer:
+            self.parent.after_cancel(self.due_timer)
+            self.due_timer = None
+
+        if not self.db.has_due_dates():
+            return
+
+        # Due dates are whole days, so badges can only change at midnight.
+        # Re-check at least hourly in case the clock jumps (e.g. after sleep).
+        now = datetime.now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        delay_ms = int((next_midnight - now).total_seconds() * 1000) + 1000
+        self.due_timer = self.parent.after(min(delay_ms, 3600 * 1000), self.update_due_badges)
+
+    def update_due_badges(self):
+        """Update overdue badges in place without rebuilding the cards"""
+        self.due_timer = None
+        for lending_id, days_until_due in self.db.get_due_status().items():
+            badge = self.due_badges.get(lending_id)
+            if badge is not None and badge.winfo_exists():
+                text, color = format_due_status(days_until_due)
+                badge.configure(text=text, text_color=color)
+        self.schedule_due_update()
 
     def update_borrowed_display(self):
         """Update the borrowed books display"""
         # Clear current display
         for widget in self.borrowed_scroll.winfo_children():
             widget.destroy()
+        self.due_badges.clear()
 
         if not self.current_lendings:
             ctk.CTkLabel(
@@ -151,35 +195,25 @@ class LendingView:
         date_frame = ctk.CTkFrame(content, fg_color="transparent")
         date_frame.pack(fill="x")
 
-        lend_date = datetime.fromisoformat(lending['lend_date'])
         ctk.CTkLabel(
             date_frame,
-            text=f"📅 Lent: {lend_date.strftime('%Y-%m-%d')}",
+            text=f"📅 Lent: {lending['lend_day']}",
             font=ctk.CTkFont(size=11),
             text_color="gray"
         ).pack(side="left")
 
-        # Check if overdue
-        if lending.get('expected_return_date'):
-            expected_date = datetime.fromisoformat(lending['expected_return_date'])
-            days_diff = (expected_date - datetime.now()).days
-
-            if days_diff < 0:
-                status_text = f"⚠️ Overdue by {abs(days_diff)} days"
-                status_color = "#e74c3c"
-            elif days_diff == 0:
-                status_text = "⏰ Due today"
-                status_color = "#f39c12"
-            else:
-                status_text = f"✓ Due in {days_diff} days"
-                status_color = "#2ecc71"
+        # Overdue status, computed by the database relative to today
+        if lending.get('days_until_due') is not None:
+            status_text, status_color = format_due_status(lending['days_until_due'])
 
-            ctk.CTkLabel(
+            badge = ctk.CTkLabel(
                 date_frame,
                 text=status_text,
                 font=ctk.CTkFont(size=11, weight="bold"),
                 text_color=status_color
-            ).pack(side="right")
+            )
+            badge.pack(side="right")
+            self.due_badges[lending['id']] = badge
 
         # Notes
         if lending.get('notes'):
@@ -206,27 +240,46 @@ class LendingView:
         ).pack(fill="x", pady=(10, 0))
 
     def update_history_display(self):
-        """Update the lending history display"""
+        """Update the lending history display with the first page of returned loans"""
         # Clear current display
         for widget in self.history_scroll.winfo_children():
             widget.destroy()
+        self.history_loaded = 0
+        self.history_more_button = None
+        self.load_more_history()
 
-        history = self.db.get_lending_history()
-
-        if not history:
+        if not self.history_loaded:
             ctk.CTkLabel(
                 self.history_scroll,
                 text="No lending history",
                 text_color="gray"
             ).pack(pady=20)
-            return
 
-        # Display only returned books (last 20)
-        returned_books = [h for h in history if h['status'] == 'returned'][:20]
+    def load_more_history(self):
+        """Append the next page of returned loans to the history list"""
+        if self.history_more_button:
+            self.history_more_button.destroy()
+            self.history_more_button = None
 
-        for lending in returned_books:
+        history = self.db.get_lending_history(
+            status='returned',
+            limit=self.HISTORY_PAGE_SIZE,
+            offset=self.history_loaded
+        )
+        for lending in history:
             self.create_history_card(lending)
 
+        self.history_loaded += len(history)
+        self.history_has_more = len(history) == self.HISTORY_PAGE_SIZE
+        if self.history_has_more:
+            self.history_more_button = ctk.CTkButton(
+                self.history_scroll,
+                text="Load more",
+                height=28,
+                command=self.load_more_history
+            )
+            self.history_more_button.pack(pady=10)
+
     def create_history_card(self, lending: Dict):
         """Create a card for lending history"""
         card = ctk.CTkFrame(self.history_scroll, fg_color="#2b2b2b")
@@ -245,9 +298,8 @@ class LendingView:
 
         # Borrower and dates
         info_text = f"👤 {lending['borrower_name']}"
-        if lending.get('actual_return_date'):
-            return_date = datetime.fromisoformat(lending['actual_return_date'])
-            info_text += f"\n✓ Returned: {return_date.strftime('%Y-%m-%d')}"
+        if lending.get('return_day'):
+            info_text += f"\n✓ Returned: {lending['return_day']}"
 
         ctk.CTkLabel(
             content,
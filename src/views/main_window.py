@@ -6,14 +6,33 @@ Modern UI using CustomTkinter
 import customtkinter as ctk
 from typing import Optional
 from .books_view import BooksView
+from .duplicates_view import DuplicatesDialog
 from .lending_view import LendingView
 from .statistics_view import StatisticsView
 from ..models.database import Database
+from ..utils.change_monitor import ChangeMonitor
+from ..utils.dedup import scan_duplicates
+from ..utils.maintenance import BackgroundJob, MaintenanceJob
+from ..utils.similar import update_similar_books
 
 
 class MainWindow:
     """Main application window with tabbed interface"""
 
+    # Delay before the first background maintenance run after startup
+    MAINTENANCE_DELAY_MS = 60 * 1000
+
+    # Delay before the first "similar books" update, and between later ones
+    SIMILAR_DELAY_MS = 10 * 1000
+    SIMILAR_INTERVAL_MS = 5 * 60 * 1000
+
+    # Tables each tab shows data from; a tab is only refreshed when one changed
+    TAB_TABLES = {
+        "Books": ('books', 'categories', 'lending', 'notes'),
+        "Lending": ('books', 'lending'),
+        "Statistics": ('books', 'categories', 'lending', 'notes'),
+    }
+
     def __init__(self):
         # Initialize database
         self.db = Database()
@@ -50,6 +69,14 @@ class MainWindow:
         self.stats_view = StatisticsView(self.stats_tab, self.db)
         # Pass reference to main window for statistics to access books view
         self.stats_view.main_window = self
+        self.tab_views = {
+            "Books": self.books_view,
+            "Lending": self.lending_view,
+            "Statistics": self.stats_view,
+        }
+        # Table versions each tab was last refreshed at
+        self.tab_versions = {name: self.db.get_table_version(*tables)
+                             for name, tables in self.TAB_TABLES.items()}
 
         # Create settings view
         self.create_settings_view()
@@ -57,6 +84,22 @@ class MainWindow:
         # Bind tab change event to refresh views
         self.tabview.configure(command=self.on_tab_change)
 
+        # Refresh the visible tab when another process writes to the database
+        self.change_monitor = ChangeMonitor(self.db, self.refresh_current_tab)
+        self.change_monitor.start(self.window)
+
+        # Purge expired deletions and compact the database in the background
+        self.maintenance = MaintenanceJob(self.db.db_path)
+        self.window.after(self.MAINTENANCE_DELAY_MS, self.run_background_maintenance)
+
+        # Duplicate scans can take a while on large catalogs
+        db_path = self.db.db_path
+        self.duplicate_scan = BackgroundJob(lambda: scan_duplicates(db_path), name="duplicate-scan")
+
+        # Keep the precomputed "similar books" up to date with catalog edits
+        self.similar_update = BackgroundJob(lambda: update_similar_books(db_path), name="similar-books")
+        self.window.after(self.SIMILAR_DELAY_MS, self.update_similar_books)
+
     def create_menu_bar(self):
         """Create top menu bar with quick actions"""
         menu_frame = ctk.CTkFrame(self.window, height=50)
@@ -149,6 +192,27 @@ class MainWindow:
             width=200
         ).pack(side="left", padx=5)
 
+        ctk.CTkButton(
+            btn_container,
+            text="🧹 Clean Up Covers",
+            command=self.clean_media,
+            width=200
+        ).pack(side="left", padx=5)
+
+        ctk.CTkButton(
+            btn_container,
+            text="🗜️ Compact Database",
+            command=self.compact_database,
+            width=200
+        ).pack(side="left", padx=5)
+
+        ctk.CTkButton(
+            btn_container,
+            text="🔎 Find Duplicates",
+            command=self.find_duplicates,
+            width=200
+        ).pack(side="left", padx=5)
+
         # About section
         about_frame = ctk.CTkFrame(settings_container)
         about_frame.pack(fill="x", pady=10)
@@ -223,6 +287,65 @@ class MainWindow:
         except Exception as e:
             self.show_message("Error", f"Backup failed: {str(e)}", error=True)
 
+    def clean_media(self):
+        """Delete stored cover images no book uses any more"""
+        from ..utils.media_store import MediaStore
+        try:
+            removed, reclaimed = MediaStore(self.db).collect_garbage()
+            self.show_message("Success", f"Removed {removed} unused cover(s), freeing {reclaimed / 1024:.0f} KB")
+        except Exception as e:
+            self.show_message("Error", f"Cleanup failed: {str(e)}", error=True)
+
+    def run_background_maintenance(self):
+        """Run maintenance quietly, logging failures instead of showing them"""
+        def done(report, error):
+            if error:
+                print(f"Background maintenance failed: {error}")
+
+        self.maintenance.start(self.window, done)
+
+    def update_similar_books(self):
+        """Update the "similar books" index in the background, then schedule the next update"""
+        def done(report, error):
+            if error:
+                print(f"Similar books update failed: {error}")
+            self.window.after(self.SIMILAR_INTERVAL_MS, self.update_similar_books)
+
+        if not self.similar_update.start(self.window, done):
+            self.window.after(self.SIMILAR_INTERVAL_MS, self.update_similar_books)
+
+    def compact_database(self):
+        """Purge expired deletions, remove orphaned data and compact the database"""
+        def done(report, error):
+            if error:
+                self.show_message("Error", f"Compaction failed: {str(error)}", error=True)
+                return
+            reclaimed = report['database_bytes_reclaimed'] + report['cover_bytes_reclaimed']
+            self.show_message(
+                "Success",
+                f"Purged {report['books_purged']} deleted book(s), removed "
+                f"{report['orphans_removed']} orphaned record(s) and {report['covers_removed']} "
+                f"unused cover(s), freeing {reclaimed / 1024:.0f} KB. Moved the covers of "
+                f"{report['covers_imported']} book(s) into the media store."
+            )
+
+        if not self.maintenance.start(self.window, done):
+            self.show_message("Busy", "Maintenance is already running, please try again shortly.")
+
+    def find_duplicates(self):
+        """Scan for duplicate books in the background, then open the review dialog"""
+        def done(report, error):
+            if error:
+                self.show_message("Error", f"Duplicate scan failed: {str(error)}", error=True)
+                return
+            if not self.db.get_duplicate_candidates(limit=1):
+                self.show_message("Success", "No duplicate books found")
+                return
+            DuplicatesDialog(self.window, self.db, on_change=self.books_view.refresh)
+
+        if not self.duplicate_scan.start(self.window, done):
+            self.show_message("Busy", "A duplicate scan is already running, please wait.")
+
     def show_message(self, title: str, message: str, error: bool = False):
         """Show a message dialog"""
         dialog = ctk.CTkToplevel(self.window)
@@ -249,13 +372,18 @@ class MainWindow:
 
     def on_tab_change(self):
         """Handle tab change events"""
+        self.refresh_current_tab()
+
+    def refresh_current_tab(self):
+        """Refresh the visible tab if the tables it shows changed since its last refresh"""
         current_tab = self.tabview.get()
-        if "Statistics" in current_tab:
-            self.stats_view.refresh()
-        elif "Lending" in current_tab:
-            self.lending_view.refresh()
-        elif "Books" in current_tab:
-            self.books_view.refresh()
+        for name, view in self.tab_views.items():
+            if name not in current_tab:
+                continue
+            versions = self.db.get_table_version(*self.TAB_TABLES[name])
+            if versions != self.tab_versions[name]:
+                self.tab_versions[name] = versions
+                view.refresh()
 
     def run(self):
         """Start the application"""
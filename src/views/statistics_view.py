@@ -4,6 +4,7 @@ Statistics View - Dashboard with analytics
 
 import customtkinter as ctk
 from ..models.database import Database
+from .charts import BarChart, HorizontalBarChart, LineChart, PieChart
 
 
 class StatisticsView:
@@ -44,14 +45,158 @@ class StatisticsView:
         self.stats_container = ctk.CTkFrame(main_container)
         self.stats_container.pack(fill="x", padx=20, pady=(0, 20))
 
-        # Category breakdown container
-        self.category_container = ctk.CTkFrame(main_container)
-        self.category_container.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        # Category breakdown, drawn on a single canvas
+        self.category_breakdown = HorizontalBarChart(
+            main_container,
+            "📑 Books by Category (click to filter)",
+            on_click=self.filter_by_category
+        )
+        self.category_breakdown.frame.pack(fill="x", padx=20, pady=(0, 20))
+
+        # Charts, two per row
+        charts_container = ctk.CTkFrame(main_container, fg_color="transparent")
+        charts_container.pack(fill="x", padx=15, pady=(0, 20))
+        charts_container.grid_columnconfigure((0, 1), weight=1)
+
+        self.added_chart = self.create_chart(charts_container, LineChart, "📈 Books Added per Month", 0, 0)
+        self.rating_chart = self.create_chart(charts_container, BarChart, "⭐ Rating Distribution", 0, 1)
+        self.category_chart = self.create_chart(charts_container, PieChart, "📑 Category Share", 1, 0)
+        self.loans_chart = self.create_chart(charts_container, LineChart, "🔄 Loans per Month", 1, 1)
+
+        # Lending insights container
+        self.lending_container = ctk.CTkFrame(main_container)
+        self.lending_container.pack(fill="both", expand=True, padx=20, pady=(0, 20))
 
     def refresh(self):
         """Refresh statistics"""
         self.update_stats_cards()
         self.update_category_breakdown()
+        self.update_charts()
+        self.update_lending_insights()
+
+    def update_charts(self):
+        """Feed the charts from cached SQL aggregates, keyed by table version"""
+        books_version = self.db.get_table_version('books')
+        lending_version = self.db.get_table_version('lending', 'books')
+        categories_version = self.db.get_table_version('books', 'categories')
+
+        self.added_chart.set_data(books_version, self.db.get_books_added_per_month())
+        self.rating_chart.set_data(books_version, self.db.get_rating_distribution(), ["#f1c40f"])
+        self.loans_chart.set_data(lending_version, self.db.get_loans_per_month(), ["#f39c12"])
+
+        categories = [cat for cat in self.db.get_category_stats() if cat['book_count'] > 0]
+        self.category_chart.set_data(
+            categories_version,
+            [(cat['name'], cat['book_count']) for cat in categories],
+            [cat['color'] for cat in categories]
+        )
+
+    def update_lending_insights(self):
+        """Update lending analytics: durations, top borrowers, circulation and overdue rate"""
+        for widget in self.lending_container.winfo_children():
+            widget.destroy()
+
+        ctk.CTkLabel(
+            self.lending_container,
+            text="🔄 Lending Insights",
+            font=ctk.CTkFont(size=20, weight="bold")
+        ).pack(anchor="w", padx=20, pady=(10, 15))
+
+        durations = self.db.get_loan_duration_stats()
+        if not durations['returned_count']:
+            ctk.CTkLabel(
+                self.lending_container,
+                text="No returned loans yet",
+                text_color="gray"
+            ).pack(pady=20)
+            return
+
+        # Loan duration summary
+        duration_row = ctk.CTkFrame(self.lending_container, fg_color="transparent")
+        duration_row.pack(fill="x", padx=15, pady=(0, 10))
+
+        for label, value in [
+            ("Average Loan", durations['average_days']),
+            ("Median Loan", durations['median_days']),
+            ("90% Returned Within", durations['p90_days']),
+            ("Longest Loan", durations['max_days']),
+        ]:
+            card = ctk.CTkFrame(duration_row, fg_color="#2b2b2b", corner_radius=10)
+            card.pack(side="left", fill="both", expand=True, padx=5)
+            ctk.CTkLabel(
+                card,
+                text=f"{value} days",
+                font=ctk.CTkFont(size=20, weight="bold")
+            ).pack(pady=(10, 0))
+            ctk.CTkLabel(
+                card,
+                text=label,
+                font=ctk.CTkFont(size=12),
+                text_color="gray"
+            ).pack(pady=(0, 10))
+
+        # Leaderboards side by side
+        lists_row = ctk.CTkFrame(self.lending_container, fg_color="transparent")
+        lists_row.pack(fill="x", padx=15, pady=(0, 10))
+
+        self.create_ranking_list(
+            lists_row,
+            "👤 Top Borrowers",
+            [(row['rank'], row['borrower_name'],
+              f"{row['loan_count']} loans" + (f", {row['overdue_count']} overdue" if row['overdue_count'] else ""))
+             for row in self.db.get_borrower_leaderboard(5)]
+        )
+        self.create_ranking_list(
+            lists_row,
+            "📖 Most Circulated",
+            [(row['rank'], row['title'], f"{row['loan_count']} loans")
+             for row in self.db.get_most_circulated_books(5)]
+        )
+
+        # Overdue rate by month
+        overdue_rates = self.db.get_overdue_rate_by_month(12)
+        if overdue_rates:
+            self.create_ranking_list(
+                self.lending_container,
+                "⚠️ Overdue Rate by Month",
+                [(row['month'], f"{row['overdue_rate']}% of {row['loan_count']} loans",
+                  f"{row['cumulative_rate']}% overall")
+                 for row in overdue_rates],
+                ranked=False
+            )
+
+    def create_ranking_list(self, parent, title: str, rows, ranked: bool = True):
+        """
+        Create a titled list of (rank, name, detail) rows.
+
+        With ranked=False the first column is a plain label (e.g. a month)
+        shown as given, without the rank's trailing period.
+        """
+        frame = ctk.CTkFrame(parent, fg_color="#2b2b2b", corner_radius=10)
+        frame.pack(side="left", fill="both", expand=True, padx=5, pady=(0, 10))
+
+        ctk.CTkLabel(
+            frame,
+            text=title,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            anchor="w"
+        ).pack(fill="x", padx=15, pady=(10, 5))
+
+        for rank, name, detail in rows:
+            row = ctk.CTkFrame(frame, fg_color="transparent")
+            row.pack(fill="x", padx=15, pady=1)
+
+            ctk.CTkLabel(row, text=f"{rank}." if ranked else str(rank), width=60, anchor="w").pack(side="left")
+            ctk.CTkLabel(row, text=name, anchor="w").pack(side="left", fill="x", expand=True)
+            ctk.CTkLabel(
+                row,
+                text=detail,
+                font=ctk.CTkFont(size=11),
+                text_color="gray",
+                anchor="e"
+            ).pack(side="right")
+
+        ctk.CTkFrame(frame, fg_color="transparent", height=10).pack()
 
     def update_stats_cards(self):
         """Update the statistics cards"""
@@ -140,117 +285,13 @@ class StatisticsView:
 
     def update_category_breakdown(self):
         """Update category breakdown"""
-        # Clear existing content
-        for widget in self.category_container.winfo_children():
-            widget.destroy()
-
-        # Title
-        ctk.CTkLabel(
-            self.category_container,
-            text="📑 Books by Category",
-            font=ctk.CTkFont(size=20, weight="bold")
-        ).pack(anchor="w", padx=20, pady=(10, 15))
-
-        # Get category stats
-        category_stats = self.db.get_category_stats()
-
-        if not category_stats:
-            ctk.CTkLabel(
-                self.category_container,
-                text="No categories found",
-                text_color="gray"
-            ).pack(pady=20)
-            return
-
-        # Calculate total books for percentage
-        total_books = sum(cat['book_count'] for cat in category_stats)
-
-        # Create category bars
-        for category in category_stats:
-            if category['book_count'] > 0:  # Only show categories with books
-                self.create_category_bar(
-                    category['name'],
-                    category['book_count'],
-                    total_books,
-                    category.get('color', '#3498db'),
-                    category['id']
-                )
-
-    def create_category_bar(self, name: str, count: int, total: int, color: str, category_id: int):
-        """Create a category bar chart item"""
-        container = ctk.CTkFrame(self.category_container, fg_color="transparent")
-        container.pack(fill="x", padx=20, pady=5)
-
-        # Make clickable
-        container.configure(cursor="hand2")
-        container.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        # Category name and count
-        info_frame = ctk.CTkFrame(container, fg_color="transparent")
-        info_frame.pack(fill="x")
-        info_frame.configure(cursor="hand2")
-        info_frame.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        name_label = ctk.CTkLabel(
-            info_frame,
-            text=name,
-            font=ctk.CTkFont(size=14, weight="bold"),
-            anchor="w",
-            width=150
-        )
-        name_label.pack(side="left")
-        name_label.configure(cursor="hand2")
-        name_label.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        count_label = ctk.CTkLabel(
-            info_frame,
-            text=f"{count} books",
-            font=ctk.CTkFont(size=12),
-            text_color="gray",
-            anchor="w",
-            width=80
+        # Totals and percentages come from the same query; only categories with books are shown
+        categories = [cat for cat in self.db.get_category_stats() if cat['book_count'] > 0]
+        self.category_breakdown.set_data(
+            self.db.get_table_version('books', 'categories'),
+            [(cat['name'], cat['book_count'], cat['percentage']) for cat in categories],
+            [cat['color'] or '#3498db' for cat in categories]
         )
-        count_label.pack(side="left")
-        count_label.configure(cursor="hand2")
-        count_label.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        # Percentage
-        percentage = (count / total * 100) if total > 0 else 0
-        percent_label = ctk.CTkLabel(
-            info_frame,
-            text=f"{percentage:.1f}%",
-            font=ctk.CTkFont(size=12, weight="bold"),
-            text_color=color,
-            anchor="e",
-            width=60
-        )
-        percent_label.pack(side="right")
-        percent_label.configure(cursor="hand2")
-        percent_label.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        # Progress bar
-        bar_frame = ctk.CTkFrame(container, fg_color="transparent")
-        bar_frame.pack(fill="x", pady=(3, 0))
-        bar_frame.configure(cursor="hand2")
-        bar_frame.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        # Background bar
-        bg_bar = ctk.CTkFrame(bar_frame, height=25, fg_color="#2b2b2b", corner_radius=10)
-        bg_bar.pack(fill="x")
-        bg_bar.configure(cursor="hand2")
-        bg_bar.bind("<Button-1>", lambda e: self.filter_by_category(name))
-
-        # Filled bar
-        if percentage > 0:
-            filled_bar = ctk.CTkFrame(
-                bg_bar,
-                height=25,
-                fg_color=color,
-                corner_radius=10
-            )
-            filled_bar.place(relx=0, rely=0, relwidth=percentage/100, relheight=1)
-            filled_bar.configure(cursor="hand2")
-            filled_bar.bind("<Button-1>", lambda e: self.filter_by_category(name))
 
     def filter_by_category(self, category_name: str):
         """Switch to Books tab and filter by category"""
@@ -267,27 +308,11 @@ class StatisticsView:
         if self.main_window:
             # Switch to Books tab
             self.main_window.tabview.set("📚 Books")
-            # Set the search text
-            self.main_window.books_view.search_entry.delete(0, 'end')
-            self.main_window.books_view.search_entry.insert(0, author_name)
-            # Trigger search
-            self.main_window.books_view.search_books()
-
-    def create_chart_placeholder(self, parent, title: str, height: int = 250):
-        """Create a placeholder for a chart"""
-        chart_frame = ctk.CTkFrame(parent, height=height)
-        chart_frame.pack(fill="x", padx=20, pady=10)
-        chart_frame.pack_propagate(False)
-
-        ctk.CTkLabel(
-            chart_frame,
-            text=title,
-            font=ctk.CTkFont(size=16, weight="bold")
-        ).pack(anchor="w", padx=15, pady=(10, 5))
-
-        ctk.CTkLabel(
-            chart_frame,
-            text="📊\nChart visualization placeholder",
-            font=ctk.CTkFont(size=40),
-            text_color="gray"
-        ).pack(expand=True)
+            # Apply an exact author filter
+            self.main_window.books_view.filter_by_author(author_name)
+
+    def create_chart(self, parent, chart_class, title: str, row: int, column: int, height: int = 250):
+        """Create a chart in the given grid cell"""
+        chart = chart_class(parent, title, height)
+        chart.frame.grid(row=row, column=column, sticky="nsew", padx=5, pady=5)
+        return chart